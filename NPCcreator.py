@@ -1,11 +1,12 @@
 import sqlite3
-import random
 from contextlib import closing
 import logging
 import os
 import json
 import sys
 
+from utils.dice import stream
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -21,16 +22,15 @@ def get_resource_path(relative_path):
 # Set the correct path for the database
 DB_PATH = get_resource_path(os.path.join('tables', 'game_database.db'))
 
-def roll_stat():
+STAT_NAMES = ["Strength", "Intelligence", "Wisdom", "Dexterity", "Constitution", "Charisma"]
+
+def roll_stat(size=None):
     """ Roll 5d4-2 for a stat. """
-    rolls = [random.randint(1, 4) for _ in range(5)]
-    return sum(rolls) - 2
+    return stream("chargen").roll(5, 4, size=size, bonus=-2)
 
 def calculate_stats():
     """ Calculate the NPC's stats. """
-    stats = { "Strength": roll_stat(), "Intelligence": roll_stat(), "Wisdom": roll_stat(), 
-              "Dexterity": roll_stat(), "Constitution": roll_stat(), "Charisma": roll_stat() }
-    return stats
+    return dict(zip(STAT_NAMES, roll_stat(len(STAT_NAMES)).tolist()))
 
 def fetch_class_details(class_name):
     """ Fetch class details from the database using the class name. """
@@ -48,12 +48,12 @@ def assign_primary_and_dump(stats, class_details):
     dump_stat = class_details[1]
     
     # 50% chance to assign highest stat to primary_stat
-    if random.random() < 0.5:
+    if stream("chargen").rng.random() < 0.5:
         highest_stat = max(stats, key=stats.get)
         stats[highest_stat], stats[primary_stat] = stats[primary_stat], stats[highest_stat]
 
     # 50% chance to assign lowest stat to dump_stat
-    if random.random() < 0.5:
+    if stream("chargen").rng.random() < 0.5:
         lowest_stat = min(stats, key=stats.get)
         stats[lowest_stat], stats[dump_stat] = stats[dump_stat], stats[lowest_stat]
 
@@ -0,0 +1,32 @@
+# benchmarks/combat.py
+# Simulated fights per second for tables/combat_sim.simulate, with a four
+# character party against a few groups of hesperia monsters
+# (target: 100k fights in a few seconds).
+#
+#   python benchmarks/combat.py
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from tables.combat_sim import load_party, realm_monsters, simulate
+
+PARTY = ["Kim.hesperia", "Alex.hesperia", "Kim.tier_1", "Drew.dungeon_t1"]
+GROUPS = [["Worg"], ["Wolf"] * 3, ["Bandit"] * 6, ["Ogre"], ["Knight", "Priest"]]
+FIGHTS = 100000
+
+def main():
+    party = load_party(PARTY)
+    for names in GROUPS:
+        monsters = realm_monsters("hesperia", names)
+        start = time.perf_counter()
+        summary = simulate(party, monsters, FIGHTS, seed=0).summary()
+        elapsed = time.perf_counter() - start
+        label = ", ".join(names) if len(set(names)) > 1 else f"{len(names)} x {names[0]}"
+        print(f"{label:>18}: {FIGHTS / elapsed:>10,.0f} fights/s  win {summary['win_rate']:.1%}  "
+              f"{summary['rounds_mean']:.1f} rounds  {summary['hp_lost_mean']:.0%} HP lost")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# benchmarks/dice.py
+# Odds of a worg's bite (1d20+5 vs AC 13, 2d6+3) taking down 13 HP in two
+# turns: estimated by rolling with roll_dice, and exact from utils.dice's
+# PMFs. Also compares roll_dice with sampling from a cached distribution,
+# and one-die-at-a-time 4d6-drop-lowest with a Roller batch.
+#
+#   python benchmarks/dice.py
+
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from utils.dice import Roller, attack_damage, distribution, roll_dice
+
+STATS = 200000
+TRIALS = 200000
+ROLLS = 1000000
+
+def simulated_two_turns(trials):
+    downed = 0
+    for _ in range(trials):
+        total = 0
+        for _ in range(2):
+            natural = random.randint(1, 20)
+            if natural == 20:
+                total += roll_dice(4, 6) + 3
+            elif natural != 1 and natural + 5 >= 13:
+                total += roll_dice(2, 6) + 3
+        downed += total >= 13
+    return downed / trials
+
+def legacy_roll_stat():
+    # creator.roll_stat before the Roller
+    rolls = [random.randint(1, 6) for _ in range(4)]
+    rolls.remove(min(rolls))
+    return sum(rolls)
+
+def main():
+    start = time.perf_counter()
+    estimate = simulated_two_turns(TRIALS)
+    simulated_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    exact = float((attack_damage("1d20+5 vs AC 13", "2d6+3") * 2).at_least(13))
+    exact_ms = (time.perf_counter() - start) * 1000
+    print("P(13+ damage in two bites)")
+    print(f"{'simulated':>12} {estimate:.4f}  {TRIALS:,} trials in {simulated_ms:.0f} ms")
+    print(f"{'exact':>12} {exact:.4f}  in {exact_ms:.2f} ms")
+    print()
+
+    start = time.perf_counter()
+    for _ in range(ROLLS // 10):
+        roll_dice(4, 10)
+    slow = ROLLS // 10 / (time.perf_counter() - start)
+    rolled = distribution("4d10+4")
+    rng = np.random.default_rng()
+    start = time.perf_counter()
+    rolled.sample(ROLLS, rng)
+    fast = ROLLS / (time.perf_counter() - start)
+    print(f"{'roll_dice':>12} {slow:>14,.0f} rolls/s of 4d10")
+    print(f"{'PMF sample':>12} {fast:>14,.0f} rolls/s of 4d10+4  {fast / slow:.0f}x")
+    print()
+
+    start = time.perf_counter()
+    for _ in range(STATS):
+        legacy_roll_stat()
+    slow = STATS / (time.perf_counter() - start)
+    roller = Roller(0)
+    start = time.perf_counter()
+    roller.roll(4, 6, size=STATS, drop_lowest=1)
+    fast = STATS / (time.perf_counter() - start)
+    print(f"{'randint':>12} {slow:>14,.0f} stats/s of 4d6 drop lowest")
+    print(f"{'Roller':>12} {fast:>14,.0f} stats/s of 4d6 drop lowest  {fast / slow:.0f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+# benchmarks/encounter_generation.py
+# Cost of picking monsters for encounters: the linear CR scans the generator
+# used to run for every pick against the bisect lookup on a MonsterIndex,
+# test_enc's whole-bestiary terrain/realm filter against the inverted
+# index over data/monsters_by_cr.json, and test_enc's one-at-a-time
+# encounters against utils.encounter_batch (target: 100k encounters/sec).
+#
+#   python benchmarks/encounter_generation.py [realms/<realm>.json]
+
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from utils.old.encounter_generation import (MonsterIndex, challenge_rating_list, find_highest_cr, generate_encounter,
+                                            load_json)
+from utils.encounter_batch import generate_encounters
+from utils.realm_repository import repository
+
+DEFAULT_REALM = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'realms', 'dungeon_t1.json')
+BUDGETS = [25, 50, 100, 200, 450, 700, 1100, 1800, 2900, 5900]
+PICKS = 20000
+FILTER_KEYS = [("arctic", "Dungeon"), ("arctic", "greyhawk"), ("forest", "greyhawk"), ("hills", "Flan")]
+FILTERS = 2000
+BATCH = 100000
+SINGLE = 2000
+TARGET_RATE = 100000
+
+def legacy_get_xp_from_cr(cr):
+    for cr_info in challenge_rating_list:
+        if cr_info['cr'] == cr:
+            return cr_info['xp']
+    return 0
+
+def legacy_find_highest_cr(xp_budget, monsters):
+    # What find_highest_cr did before the index
+    eligible_monsters = [monster for monster in monsters if legacy_get_xp_from_cr(monster['cr']) <= xp_budget]
+    if not eligible_monsters:
+        return None
+    highest_cr = max(monster['cr'] for monster in eligible_monsters)
+    highest_cr_monsters = [monster for monster in eligible_monsters if monster['cr'] == highest_cr]
+    return random.choice(highest_cr_monsters)
+
+def legacy_filter(monsters_by_cr, terrain, faction):
+    # What test_enc.filter_monsters_by_terrain_and_faction did before the index
+    filtered_monsters_by_cr = {}
+    for cr, monsters in monsters_by_cr.items():
+        filtered_monsters = [
+            monster for monster in monsters
+            if terrain in monster['terrain'] and (random.random() <= 0.75 and faction in monster['realm'])
+        ]
+        if filtered_monsters:
+            filtered_monsters_by_cr[cr] = filtered_monsters
+    return filtered_monsters_by_cr
+
+def filter_microseconds(filter_monsters, *args):
+    start = time.perf_counter()
+    for _ in range(FILTERS):
+        filter_monsters(*args)
+    return (time.perf_counter() - start) / FILTERS * 1e6
+
+def compare_filters():
+    monsters_by_cr = repository.monsters_by_cr()
+    index = repository.terrain_realm_index()
+    rng = np.random.default_rng()
+    print(f"{'terrain, realm':>24} {'candidates':>10} {'scan us':>9} {'index us':>9}")
+    for terrain, realm in FILTER_KEYS:
+        slow = filter_microseconds(legacy_filter, monsters_by_cr, terrain, realm)
+        fast = filter_microseconds(index.sample, terrain, realm, 0.75, rng)
+        candidates = len(index.candidates(terrain, realm)[0])
+        print(f"{terrain + ', ' + realm:>24} {candidates:>10} {slow:>9.1f} {fast:>9.1f} {slow / fast:>6.1f}x")
+
+def compare_batch():
+    import test_enc
+
+    print(f"{'terrain, realm':>24} {'single /s':>11} {'batch /s':>11} {'dicts /s':>11}")
+    for terrain, realm in FILTER_KEYS:
+        start = time.perf_counter()
+        for _ in range(SINGLE):
+            test_enc.generate_encounter_data(4, 1, "random", terrain, realm)
+        single = SINGLE / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        batch = generate_encounters(BATCH, 4, 1, "random", terrain, realm, seed=1)
+        columns = BATCH / (time.perf_counter() - start)
+        batch.to_dicts()
+        dicts = BATCH / (time.perf_counter() - start)
+        verdict = "ok" if columns >= TARGET_RATE else "BELOW TARGET"
+        print(f"{terrain + ', ' + realm:>24} {single:>11,.0f} {columns:>11,.0f} {dicts:>11,.0f} {verdict}")
+
+def picks_per_second(find, monsters):
+    start = time.perf_counter()
+    for i in range(PICKS):
+        find(BUDGETS[i % len(BUDGETS)], monsters)
+    return PICKS / (time.perf_counter() - start)
+
+def main():
+    realm_path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_REALM
+    monsters = load_json(realm_path).get('monster', [])
+
+    start = time.perf_counter()
+    index = MonsterIndex(monsters)
+    build_ms = (time.perf_counter() - start) * 1000
+    print(f"{os.path.basename(realm_path)}: {len(index)} monsters in {len(index.crs)} CR buckets, index built in {build_ms:.2f} ms")
+
+    slow = picks_per_second(legacy_find_highest_cr, monsters)
+    fast = picks_per_second(find_highest_cr, index)
+    print(f"{'linear scan':>16} {slow:>12,.0f} picks/s")
+    print(f"{'bisect':>16} {fast:>12,.0f} picks/s  {fast / slow:.0f}x")
+
+    start = time.perf_counter()
+    for i in range(PICKS):
+        generate_encounter(BUDGETS[i % len(BUDGETS)], index)
+    print(f"{'encounters':>16} {PICKS / (time.perf_counter() - start):>12,.0f} /s with the index")
+    print()
+    compare_filters()
+    print()
+    compare_batch()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# benchmarks/map_loading.py
+# Startup cost of reading a map: the stringified-key JSON files explorer.py
+# used to parse against the .hxm columnar format from utils.map_format.
+#
+#   python benchmarks/map_loading.py [maps/hex_map_*.json ...]
+
+import glob
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from utils.map_format import MAP_EXTENSION, convert_json_map, load_map
+from utils.terrain import TERRAIN_LEGEND, disk_coordinates, generate_terrain
+
+SYNTHETIC_RADII = [100, 300]
+TARGET_SPEEDUP = 50
+
+def legacy_load_hex_map(filename):
+    # What explorer.load_hex_map did before the binary format
+    with open(filename, 'r') as file:
+        hex_map_data = json.load(file)
+    return {tuple(json.loads(key)): value for key, value in hex_map_data.items()}
+
+def write_synthetic_json(path, radius):
+    cubes = disk_coordinates(radius)
+    terrain = generate_terrain(len(cubes), seed=radius)
+    cube_lists = cubes.astype(float).tolist()
+    data = {json.dumps(cube): {"cube": cube, "terrain": TERRAIN_LEGEND[code]} for cube, code in zip(cube_lists, terrain)}
+    with open(path, 'w') as file:
+        json.dump(data, file)
+
+def best_of(func, path, repeats):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func(path)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def compare(json_path, out_dir):
+    out_path = os.path.join(out_dir, os.path.splitext(os.path.basename(json_path))[0] + MAP_EXTENSION)
+    convert_json_map(json_path, out_path)
+    slow = best_of(legacy_load_hex_map, json_path, 3)
+    fast = best_of(load_map, out_path, 20)
+    count = len(load_map(out_path))
+    speedup = slow / fast
+    verdict = "ok" if speedup >= TARGET_SPEEDUP else "BELOW TARGET"
+    print(f"{os.path.basename(json_path):>32} {count:>9,} {os.path.getsize(json_path):>12,} {os.path.getsize(out_path):>10,} "
+          f"{slow * 1000:>9.2f} {fast * 1000:>8.3f} {speedup:>7.0f}x {verdict}")
+
+def main():
+    json_paths = sys.argv[1:] or sorted(glob.glob(os.path.join(os.path.dirname(__file__), '..', 'maps', 'hex_map_*.json')))[-1:]
+    print(f"{'map':>32} {'hexes':>9} {'json bytes':>12} {'hxm bytes':>10} {'json ms':>9} {'hxm ms':>8} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as out_dir:
+        for json_path in json_paths:
+            compare(json_path, out_dir)
+        for radius in SYNTHETIC_RADII:
+            json_path = os.path.join(out_dir, f"synthetic_radius_{radius}.json")
+            write_synthetic_json(json_path, radius)
+            compare(json_path, out_dir)
+
+if __name__ == "__main__":
+    main()
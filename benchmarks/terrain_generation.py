@@ -0,0 +1,94 @@
+# benchmarks/terrain_generation.py
+# Hexes/sec for overland terrain generation: the per-hex random.choices loop
+# that overland.py used to run against the vectorized utils.terrain engine,
+# plus the noise mode's radius-300 budget (under a second on one core).
+#
+#   python benchmarks/terrain_generation.py
+
+import os
+import random
+import sys
+import time
+
+import numpy as np
+import hexy as hx
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from utils.terrain import disk_coordinates, generate_noise_terrain, generate_terrain, noise_quantile_sample, terrain_probabilities, TERRAIN_LEGEND
+
+RADII = [15, 100, 500]
+NOISE_RADIUS = 300
+NOISE_BUDGET = 1.0  # seconds
+# The old loop takes minutes at radius 500, so only time it on smaller maps
+LEGACY_MAX_RADIUS = 100
+
+def legacy_generate(radius):
+    all_coordinates = hx.get_disk(np.array((0, 0, 0)), radius)
+    terrain_choices = list(terrain_probabilities.keys())
+    terrain_weights = list(terrain_probabilities.values())
+    hex_map = {}
+    for cube in all_coordinates:
+        terrain = random.choices(terrain_choices, weights=terrain_weights, k=1)[0]
+        hex_map[tuple(cube)] = (cube.tolist(), terrain)
+    return hex_map
+
+def vectorized_generate(radius, seed=1234):
+    cube_coordinates = disk_coordinates(radius)
+    return cube_coordinates, generate_terrain(len(cube_coordinates), seed)
+
+def noise_generate(radius, seed=1234):
+    cube_coordinates = disk_coordinates(radius)
+    return cube_coordinates, generate_noise_terrain(cube_coordinates, seed)
+
+def neighbour_agreement(cube_coordinates, codes):
+    """ Fraction of hexes whose east neighbour has the same terrain. """
+    lookup = {(x, z): code for (x, _, z), code in zip(cube_coordinates.tolist(), codes.tolist())}
+    pairs = [(code, lookup.get((x + 1, z))) for (x, z), code in lookup.items()]
+    pairs = [(a, b) for a, b in pairs if b is not None]
+    return sum(a == b for a, b in pairs) / len(pairs)
+
+def best_of(func, radius, repeats):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func(radius)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    print(f"{'radius':>7} {'hexes':>9} {'legacy hex/s':>14} {'vectorized hex/s':>18} {'speedup':>8}")
+    for radius in RADII:
+        count = 1 + 3 * radius * (radius + 1)
+        fast = best_of(vectorized_generate, radius, 5)
+        if radius <= LEGACY_MAX_RADIUS:
+            slow = best_of(legacy_generate, radius, 1)
+            legacy_rate = f"{count / slow:14,.0f}"
+            speedup = f"{slow / fast:7.0f}x"
+        else:
+            legacy_rate, speedup = f"{'-':>14}", f"{'-':>8}"
+        print(f"{radius:>7} {count:>9,} {legacy_rate} {count / fast:18,.0f} {speedup}")
+
+    # Same seed, same world
+    a = vectorized_generate(100, seed=42)[1]
+    b = vectorized_generate(100, seed=42)[1]
+    print(f"seed 42 regenerates identically: {np.array_equal(a, b)}")
+
+    # Noise mode; the calibration sample is built once per process, time it apart
+    noise_quantile_sample()
+    count = 1 + 3 * NOISE_RADIUS * (NOISE_RADIUS + 1)
+    elapsed = best_of(noise_generate, NOISE_RADIUS, 3)
+    verdict = "ok" if elapsed < NOISE_BUDGET else "OVER BUDGET"
+    print(f"\nnoise radius {NOISE_RADIUS}: {count:,} hexes in {elapsed:.3f}s ({count / elapsed:,.0f} hex/s) {verdict}")
+
+    cube_coordinates, codes = noise_generate(100, seed=42)
+    print(f"noise regenerates identically: {np.array_equal(codes, noise_generate(100, seed=42)[1])}")
+    mix = np.bincount(codes, minlength=len(TERRAIN_LEGEND)) / len(codes)
+    for name, share in zip(TERRAIN_LEGEND, mix):
+        print(f"  {name:>10}: {share:6.1%} (target {terrain_probabilities[name]:.0%})")
+    random_codes = vectorized_generate(100, seed=42)[1]
+    print(f"same terrain as neighbour: random {neighbour_agreement(cube_coordinates, random_codes):.0%}, "
+          f"noise {neighbour_agreement(cube_coordinates, codes):.0%}")
+
+if __name__ == "__main__":
+    main()
@@ -2,13 +2,14 @@ import sqlite3
 import json
 import os
 import sys
-import random
 import tkinter as tk
 from tkinter import ttk, messagebox
 from contextlib import closing
 import logging
 import subprocess
 
+from utils.dice import stream
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -24,17 +25,15 @@ def get_resource_path(relative_path):
 # Set the correct path for the database
 DB_PATH = get_resource_path(os.path.join('tables', 'game_database.db'))
 
-def roll_stat():
+def roll_stat(size=None):
     """ Roll 4d6 and drop the lowest die. """
-    rolls = [random.randint(1, 6) for _ in range(4)]
-    rolls.remove(min(rolls))
-    return sum(rolls)
+    return stream("chargen").roll(4, 6, size=size, drop_lowest=1)
 
 def calculate_stats():
     """ Calculate the character's stats ensuring total is at least 75. """
-    stats = [roll_stat() for _ in range(6)]
+    stats = roll_stat(6).tolist()
     while sum(stats) < 75:
-        stats = [roll_stat() for _ in range(6)]
+        stats = roll_stat(6).tolist()
     return {
         "Strength": stats[0],
         "Intelligence": stats[1],
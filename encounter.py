@@ -1,30 +1,24 @@
 import json
 import os
-import random
 import sys
-import subprocess
-import pygame as pg
 
-# Add the utils directory to the Python path
-script_dir = os.path.abspath(os.path.dirname(__file__))
-utils_dir = os.path.join(script_dir, "utils")
-sys.path.append(utils_dir)
+from combat_gui import CombatScene
+from utils.dice import stream
+from utils.old.encounter_generation import generate_encounter_data, load_json, next_encounter_number
+from utils.scenes import SceneManager
 
-from Champion.utils.old.encounter_generation import generate_encounter_data, load_json
-from utils.dice import roll_dice  # Ensure dice is imported from utils
 # Constants
 ENCOUNTER_PROBABILITY = 0.1
-ENCOUNTERS_DIR = "encounters"
+script_dir = os.path.abspath(os.path.dirname(__file__))
+ENCOUNTERS_DIR = os.path.join(script_dir, "encounters")
 
 def save_json(data, file_path):
     os.makedirs(os.path.dirname(file_path), exist_ok=True)
     with open(file_path, 'w') as f:
         json.dump(data, f, indent=4)
 
-def generate_encounter(player_name, hex_coordinates, party_size, party_level, realm):
-    monsters_by_cr = load_json('data/monsters_by_cr.json')
-
-    encounter_data = generate_encounter_data(party_size, party_level, "random", realm, monsters_by_cr)
+def generate_encounter(player_name, hex_coordinates, party_size, party_level, terrain, realm, manager=None):
+    encounter_data = load_json(generate_encounter_data(party_size, party_level, "random", terrain, realm, next_encounter_number()))
 
     encounter_data["player"] = player_name
     encounter_data["hex"] = hex_coordinates
@@ -35,16 +29,16 @@ def generate_encounter(player_name, hex_coordinates, party_size, party_level, re
     encounter_filepath = os.path.join(ENCOUNTERS_DIR, encounter_filename)
     save_json(encounter_data, encounter_filepath)
 
-    # Launch the combat GUI
-    run_script("combat_gui.py", encounter_filepath)
-
-def run_script(script_name, *args):
-    script_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), script_name)
-    subprocess.run([sys.executable, script_path, *args])
+    # Go to the combat screen, on top of the caller's scenes when there is a running game
+    combat = CombatScene(encounter_filepath, realm)
+    if manager is None:
+        SceneManager().run(combat)
+    else:
+        manager.push(combat)
 
-def check_for_encounter(player_name, hex_coordinates, party_size, party_level, realm):
-    if random.random() < ENCOUNTER_PROBABILITY:
-        generate_encounter(player_name, hex_coordinates, party_size, party_level, realm)
+def check_for_encounter(player_name, hex_coordinates, party_size, party_level, terrain, realm, manager=None):
+    if stream("encounter").rng.random() < ENCOUNTER_PROBABILITY:
+        generate_encounter(player_name, hex_coordinates, party_size, party_level, terrain, realm, manager)
         return True
     return False
 
@@ -54,6 +48,6 @@ if __name__ == "__main__":
     party_size = 2
     party_level = 1
     terrain = "forest"
-    realm = "Elvish"
+    realm = "hesperia"
 
-    check_for_encounter(player_name, hex_coordinates, party_size, party_level, realm)
+    check_for_encounter(player_name, hex_coordinates, party_size, party_level, terrain, realm)
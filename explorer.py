@@ -1,24 +1,33 @@
-import json
 import os
 import sys
 import numpy as np
 import hexy as hx
 import pygame as pg
-from PIL import Image
-from collections import deque
-import subprocess
 
-TARGET_FPS = 60
+from utils.camera import Camera
+from utils.hex_grid import HexGrid, pixel_to_cube
+from utils.chunks import WORLD_FILE, ChunkedWorld, axial_box_for_pixels
+from utils.map_format import MAP_EXTENSION, load_map, read_json_map
+from utils.map_render import LOD_ZOOM, TerrainLayer
+from utils.encounter_service import ENCOUNTER_READY, EncounterService
+from utils.scenes import Scene, SceneManager
+from utils.selection import Selection
+from utils.sprite_atlas import load_sprites
+from utils.terrain import TERRAIN_ALIASES
+from utils.text_cache import TextCache
+
 HEX_RADIUS = 30
 VIEWPORT_PIXEL_SIZE = (1600, 1600)
+VIEW_MARGIN = 200  # screen pixels of map kept loaded around the viewport
+PAN_SPEED = 800  # screen pixels per second while a pan key is held
+PAN_KEYS = {pg.K_a: (-1, 0), pg.K_d: (1, 0), pg.K_w: (0, -1), pg.K_s: (0, 1)}
 SOFT_BROWN_GREEN = (231, 247, 161)
+HUD_TEXT_COLOUR = (50, 50, 50)
 
 # Absolute paths
 script_dir = os.path.abspath(os.path.dirname(__file__))
 images_dir = os.path.join(script_dir, "images")
 maps_dir = os.path.join(script_dir, "maps")
-saves_dir = os.path.join(script_dir, "saves")
-utils_dir = os.path.join(script_dir, "utils")
 
 terrain_types = {
     "dense": os.path.join(images_dir, "forest.png"),
@@ -28,52 +37,19 @@ terrain_types = {
     "settlement": os.path.join(images_dir, "settlement.png")
 }
 
-def scale_image(image, hex_radius):
-    original_size = image.size
-    scale_ratio = (hex_radius * 1.9) / max(original_size)
-    new_size = tuple([int(dim * scale_ratio) for dim in original_size])
-    return image.resize(new_size, Image.Resampling.LANCZOS)
-
-terrain_images = {}
-for key, value in terrain_types.items():
-    try:
-        image = Image.open(value)
-        terrain_images[key] = scale_image(image, HEX_RADIUS)
-    except FileNotFoundError as e:
-        print(f"Error loading image for terrain type '{key}': {value}")
-        print(str(e))
-        exit(1)
-
-def pil_to_pygame(image):
-    mode = image.mode
-    size = image.size
-    data = image.tobytes()
-    return pg.image.fromstring(data, size, mode)
-
-terrain_surfaces = {key: pil_to_pygame(image) for key, image in terrain_images.items()}
-
-class ExampleHex:
-    def __init__(self, cube_coordinates, terrain, radius):
-        self.cube_coordinates = np.array([cube_coordinates])
-        self.axial_coordinates = hx.cube_to_axial(self.cube_coordinates)[0]
-        self.position = hx.cube_to_pixel(self.cube_coordinates, radius)
-        self.terrain = terrain
-        self.radius = radius
-        self.image = terrain_surfaces[terrain]
-        self.value = None
-
-    def set_value(self, value):
-        self.value = value
-
-    def get_draw_position(self):
-        draw_position = self.position[0] - [self.image.get_width() / 2, self.image.get_height() / 2]
-        return draw_position
-
-    def get_position(self):
-        return self.position[0]
+# Flat colours for the zoomed-out view, where sprites are too small to read
+terrain_colours = {
+    "dense": (190, 219, 126),
+    "open": (238, 242, 184),
+    "hill": (212, 196, 139),
+    "water": (142, 184, 222),
+    "settlement": (96, 92, 88)
+}
 
-class ExampleHexMap:
-    def __init__(self, hex_map_data, viewport_pixel_size=VIEWPORT_PIXEL_SIZE, hex_radius=HEX_RADIUS, caption="ExampleHexMap"):
+class ExampleHexMap(Scene):
+    def __init__(self, map_source, viewport_pixel_size=VIEWPORT_PIXEL_SIZE, hex_radius=HEX_RADIUS, caption="ExampleHexMap",
+                 dirty_rects=True):
+        super().__init__()
         self.viewport_pixel_size = viewport_pixel_size
         self.caption = caption
 
@@ -83,33 +59,46 @@ class ExampleHexMap:
 
         self.hex_radius = hex_radius
 
-        self.hex_map = hx.HexMap()
+        # Any object with a legend and window(q_min, q_max, r_min, r_max): an
+        # in-memory or memory-mapped map file, or a chunked world
+        self.map_source = map_source
+        self.camera = Camera(viewport_pixel_size)
+        self.dragging = False
+        self.loaded_rect = None  # world rect whose hexes are in self.grid
+        self.grid = HexGrid([], [], [], map_source.legend, hex_radius)
+
+        # Terrain is pre-rendered into tiles per zoom level as they come into
+        # view, once the scene is entered and the shared sprites are at hand
+        self.terrain_layer = None
+
+        # Terrain under the viewport, composed once per camera position; with
+        # dirty_rects only what the overlay and HUD touch is pushed to the display
+        self.dirty_rects = dirty_rects
+        self.background = None
+        self.background_view = None
+        self.overlay_rects = []  # drawn over the background last frame
+
         self.selection_radius = ClampedInteger(3, 1, 5)
-        self.selected_hex_image = make_hex_surface(
-            (128, 128, 128, 180),
-            self.hex_radius,
-            (255, 255, 255),
-            hollow=False,
-            border=5)
+        self.selected_hex_images = {}  # per zoom level
+        self.selection_key = None
+        self.selection_grid = None
+        self.selected_hexes_cube_coords = None
+        self.selected_hexes = None
+
+        # HUD text surfaces, and HUD strings that are costly to format, kept until their inputs change
+        self.text_cache = TextCache()
+        self.hud_strings = {}
 
         self.selection_type = CyclicInteger(3, 0, 4)
         self._clicked_hex_as_cube_coord = np.array([[0, 0, 0]])
 
-        hexes = []
-        coordinates = []
-        for key, value in hex_map_data.items():
-            cube = np.array(value['cube'])
-            terrain = value['terrain']
-            hex = ExampleHex(cube, terrain, hex_radius)
-            hexes.append(hex)
-            coordinates.append(hex.cube_coordinates[0])
-        
-        self.hex_map[np.array(coordinates)] = hexes
+        self.load_view()
 
         self.main_surf = None
         self.font = None
         self.clock = None
-        self.init_pg()
+        self.encounters = None
+        self.encounter_pending = False
 
     @property
     def clicked_hex_as_cube_coord(self):
@@ -119,136 +108,229 @@ class ExampleHexMap:
     def clicked_hex_axial_coord(self):
         return hx.cube_to_axial(self._clicked_hex_as_cube_coord)[0]  # Ensure correct format
 
-    def init_pg(self):
-        pg.init()
-        self.main_surf = pg.display.set_mode(self.viewport_pixel_size)
-        pg.display.set_caption(self.caption)
-
-        pg.font.init()
-        self.font = pg.font.SysFont("monospace", 14, True)
-        self.clock = pg.time.Clock()
-
-    def handle_events(self):
-        running = True
-        for event in pg.event.get():
-            if event.type == pg.QUIT:
-                running = False
-
-            if event.type == pg.MOUSEBUTTONDOWN:
-                if event.button == 1:
-                    mouse_pos = np.array([pg.mouse.get_pos()]) - self.center
-                    self._clicked_hex_as_cube_coord = hx.pixel_to_cube(mouse_pos, self.hex_radius)
-                    clicked_hexes = self.hex_map[self.clicked_hex_as_cube_coord]
-
-                    # Ensure we get a single hex object, not a list
-                    if clicked_hexes:
-                        clicked_hex = clicked_hexes[0]
-                        print(f"Clicked hex axial coordinates: {self.clicked_hex_axial_coord}, Terrain: {clicked_hex.terrain}")  # Debugging statement
-                        # Check for encounter when a hex is clicked
-                        self.check_for_encounter(self.clicked_hex_axial_coord, clicked_hex.terrain)
-                    else:
-                        print("No hex found at the clicked coordinates.")
-
-                if event.button == 3:
-                    self.selection_type += 1
-                if event.button == 4:
-                    self.selection_radius += 1
-                if event.button == 5:
-                    self.selection_radius -= 1
-
-            if event.type == pg.KEYUP:
-                if event.key == pg.K_UP:
+    def mouse_world_pos(self):
+        return self.camera.screen_to_world(np.array([pg.mouse.get_pos()]))
+
+    def view_rect(self, margin=0):
+        """ World rect that needs hexes for clicks and selection, grown by `margin` screen pixels.
+
+        Zoomed out past LOD_ZOOM the whole viewport is hundreds of thousands
+        of hexes, so the rect keeps the size it has at LOD_ZOOM and follows the
+        mouse instead; terrain tiles read the map on their own.
+        """
+        if self.camera.zoom >= LOD_ZOOM:
+            return self.camera.world_rect(margin)
+        half = (self.camera.half_size + margin) / LOD_ZOOM
+        mouse = self.mouse_world_pos()[0]
+        x_min, y_min = mouse - half
+        x_max, y_max = mouse + half
+        return x_min, y_min, x_max, y_max
+
+    def load_view(self):
+        # Keep hexes only for the part of the map around the viewport,
+        # reloading once the view gets close to the edge of what is loaded.
+        # Compared as world rects: the grid is trimmed to the rect, so its
+        # axial box (a parallelogram on screen) would claim hexes it dropped
+        view_x_min, view_y_min, view_x_max, view_y_max = self.view_rect()
+        if self.loaded_rect is not None:
+            x_min, y_min, x_max, y_max = self.loaded_rect
+            if view_x_min >= x_min and view_y_min >= y_min and view_x_max <= x_max and view_y_max <= y_max:
+                return
+
+        x_min, y_min, x_max, y_max = self.loaded_rect = self.view_rect(VIEW_MARGIN)
+        q, r, codes = self.map_source.window(*axial_box_for_pixels(x_min, y_min, x_max, y_max, self.hex_radius))
+
+        # The axial box is a parallelogram on screen; drop what falls outside the margin
+        pixels = hx.axial_to_pixel(np.column_stack((q, r)).astype(float), self.hex_radius).reshape(-1, 2)
+        inside = ((pixels[:, 0] >= x_min - self.hex_radius) & (pixels[:, 0] <= x_max + self.hex_radius) &
+                  (pixels[:, 1] >= y_min - self.hex_radius) & (pixels[:, 1] <= y_max + self.hex_radius))
+        self.grid = HexGrid(q[inside], r[inside], codes[inside], self.map_source.legend, self.hex_radius)
+
+    def enter(self, manager):
+        super().enter(manager)
+        self.main_surf = manager.screen
+        self.font = manager.font("monospace", 14, True)
+        self.clock = manager.clock
+        # Realm data and the last character stay loaded for every map screen in the game
+        self.encounters = manager.asset("encounter_service", EncounterService)
+        if self.terrain_layer is None:
+            terrain_surfaces = manager.asset(("terrain_surfaces", self.hex_radius), lambda: load_terrain_surfaces(self.hex_radius))
+            terrain_keys = [TERRAIN_ALIASES.get(name, name) for name in self.map_source.legend]
+            self.terrain_layer = TerrainLayer(
+                self.map_source,
+                [terrain_surfaces[key] for key in terrain_keys],
+                [terrain_colours[key] for key in terrain_keys],
+                self.hex_radius, SOFT_BROWN_GREEN)
+        # Coming back from another screen: the display holds that screen's last frame
+        self.background_view = None
+        self.dragging = False
+
+    def handle_event(self, event):
+        if event.type == ENCOUNTER_READY:
+            self.encounter_pending = False
+            if event.path:
+                # Imported here because the combat screen is only needed once an encounter starts
+                from combat_gui import CombatScene
+                self.manager.push(CombatScene(event.path, event.realm))
+
+        if event.type == pg.MOUSEBUTTONDOWN:
+            zoom_modifier = pg.key.get_mods() & pg.KMOD_CTRL
+            if event.button == 1:
+                self._clicked_hex_as_cube_coord = pixel_to_cube(self.mouse_world_pos(), self.hex_radius)
+                clicked_hexes = self.grid.present(self._clicked_hex_as_cube_coord)
+
+                if len(clicked_hexes):
+                    terrain = self.grid.terrain_name(clicked_hexes[0])
+                    print(f"Clicked hex axial coordinates: {self.clicked_hex_axial_coord}, Terrain: {terrain}")  # Debugging statement
+                    # Check for encounter when a hex is clicked; the answer comes back as an ENCOUNTER_READY event
+                    if not self.encounter_pending:
+                        self.encounter_pending = True
+                        self.encounters.request(self.clicked_hex_axial_coord, terrain)
+                else:
+                    print("No hex found at the clicked coordinates.")
+
+            if event.button == 2:
+                self.dragging = True
+            if event.button == 3:
+                self.selection_type += 1
+            if event.button == 4:
+                if zoom_modifier:
+                    self.camera.zoom_by(1, pg.mouse.get_pos())
+                else:
                     self.selection_radius += 1
-                elif event.key == pg.K_DOWN:
+            if event.button == 5:
+                if zoom_modifier:
+                    self.camera.zoom_by(-1, pg.mouse.get_pos())
+                else:
                     self.selection_radius -= 1
 
-            if event.type == pg.KEYDOWN:
-                if event.key == pg.K_ESCAPE:
-                    running = False
-
-        return running
-
-    def main_loop(self):
-        running = self.handle_events()
-        return running
-
-    def draw(self):
-        hexagons = list(self.hex_map.values())
-        self.main_surf.blits((hexagon.image, hexagon.get_draw_position() + self.center) for hexagon in hexagons)
-
-        mouse_pos = np.array([pg.mouse.get_pos()]) - self.center
-        mouse_pos_as_cube_coord = hx.pixel_to_cube(mouse_pos, self.hex_radius)[0]
-        selected_hexes_cube_coords = Selection.get_selection(self.selection_type.value, mouse_pos_as_cube_coord,
-                                                             self.selection_radius, self.clicked_hex_as_cube_coord)
-
-        selected_hexes = self.hex_map[selected_hexes_cube_coords]
-        deque(map(self.draw_selected_hex, selected_hexes), maxlen=0)
-
-        self.draw_HUD(mouse_pos, selected_hexes_cube_coords)
-        pg.display.update()
-        self.main_surf.fill((SOFT_BROWN_GREEN))
-        self.clock.tick(TARGET_FPS)
-
-    def draw_HUD(self, mouse_pos, selected_hexes_cube_coords):
-        selection_type_text = self.font.render(
-            "(Right Click To Change) Selection Type: " + Selection.Type.to_string(self.selection_type.value),
-            True, (50, 50, 50))
-        radius_text = self.font.render(
-            "(Scroll Mouse Wheel To Change) Radius: " + str(self.selection_radius.value),
-            True, (50, 50, 50))
-        fps_text = self.font.render(" FPS: " + str(int(self.clock.get_fps())), True, (50, 50, 50))
-        clicked_hx_coord = self.font.render(" clicked hex coord (cubic): " + str(self._clicked_hex_as_cube_coord),
-                                            True, (50, 50, 50))
-        clicked_hexes = self.hex_map[self.clicked_hex_axial_coord]
-        clicked_hx_text = self.font.render(" clicked hex: " + str(clicked_hexes[0]) if clicked_hexes else "_", True,
-                                           (50, 50, 50))
-        mouse_pos_text = self.font.render(f" mouse pos : {pg.mouse.get_pos()} => {mouse_pos} ", True,
-                                          (50, 50, 50))
-        rad_hex_text = self.font.render(f"rad_hex selection {selected_hexes_cube_coords}", True, (50, 50, 50))
-
-        display_driver_text = self.font.render(f"PG display driver: {pg.display.get_driver()}", True,  (50,50,50))
-        self.main_surf.blit(fps_text, (5, 0))
-        self.main_surf.blit(radius_text, (5, 15))
-        self.main_surf.blit(selection_type_text, (5, 30))
-        self.main_surf.blit(clicked_hx_coord, (5, 45))
-        self.main_surf.blit(clicked_hx_text, (5, 60))
-        self.main_surf.blit(mouse_pos_text, (self.viewport_pixel_size[0] - mouse_pos_text.get_width(), 0))
-        self.main_surf.blit(display_driver_text, (self.viewport_pixel_size[0] - display_driver_text.get_width(), 15))
-        self.main_surf.blit(rad_hex_text, (5, 75))
-
-    def draw_selected_hex(self, hexagon):
-        self.main_surf.blit(self.selected_hex_image, hexagon.get_draw_position() + self.center)
-
-    def quit_app(self):
-        pg.quit()
-        raise SystemExit
-
-    def load_most_recent_character(self):
-        save_files = [f for f in os.listdir(saves_dir) if f.endswith(".json")]
-        if not save_files:
-            print("No save files found.")
-            return None
-        latest_save = max(save_files, key=lambda f: os.path.getctime(os.path.join(saves_dir, f)))
-        print(f"Loading most recent save file: {latest_save}")
-        name, realm = os.path.splitext(latest_save)[0].rsplit('.', 1)
-        with open(os.path.join(saves_dir, latest_save), 'r') as file:
-            character_data = json.load(file)
-            character_data['realm'] = realm
-            print(f"Loaded character data: {character_data}")
-            return character_data
-
-    def check_for_encounter(self, hex_coordinates, terrain):
-        character_data = self.load_most_recent_character()
-        if character_data:
-            player_name = character_data.get('name', 'Unknown')
-            party_level = character_data.get('level', 1)
-            realm = character_data.get('realm', 'Unknown')
-            print(f"Checking encounter for {player_name} at {hex_coordinates} with terrain {terrain} in realm {realm} at level {party_level}")
-            run_script("encounter_generation.py", '1', str(party_level), "random", terrain, realm)
-
-def run_script(script_name, *args):
-    script_path = os.path.join(utils_dir, script_name)  # Correct path to utils directory
-    subprocess.run([sys.executable, script_path, *args])
+        if event.type == pg.MOUSEBUTTONUP and event.button == 2:
+            self.dragging = False
+
+        if event.type == pg.MOUSEMOTION and self.dragging:
+            self.camera.pan(-event.rel[0], -event.rel[1])
+
+        if event.type == pg.KEYUP:
+            if event.key == pg.K_UP:
+                self.selection_radius += 1
+            elif event.key == pg.K_DOWN:
+                self.selection_radius -= 1
+
+        if event.type == pg.KEYDOWN:
+            if event.key == pg.K_ESCAPE:
+                self.manager.pop()
+
+    def update(self, dt):
+        keys = pg.key.get_pressed()
+        step = PAN_SPEED * dt
+        for key, (dx, dy) in PAN_KEYS.items():
+            if keys[key]:
+                self.camera.pan(dx * step, dy * step)
+
+        self.load_view()
+
+    def draw(self, surface):
+        self.main_surf = surface
+        view = (*self.camera.position, self.camera.zoom)
+        full_update = not self.dirty_rects or view != self.background_view
+        if full_update:
+            if self.background is None:
+                self.background = pg.Surface(self.viewport_pixel_size)
+            self.terrain_layer.draw(self.background, self.camera)
+            self.background_view = view
+            self.main_surf.blit(self.background, (0, 0))
+        else:
+            # Put back the terrain under last frame's overlay and HUD
+            for rect in self.overlay_rects:
+                self.main_surf.blit(self.background, rect, rect)
+
+        mouse_pos = self.mouse_world_pos()
+        mouse_pos_as_cube_coord = pixel_to_cube(mouse_pos, self.hex_radius)[0]
+        selection_key = Selection.key(self.selection_type.value, mouse_pos_as_cube_coord,
+                                      self.selection_radius, self.clicked_hex_as_cube_coord)
+        if selection_key != self.selection_key or self.grid is not self.selection_grid:
+            # Only when the hovered hex, the selection settings or the loaded hexes change
+            self.selected_hexes_cube_coords = Selection.get_selection(
+                self.selection_type.value, mouse_pos_as_cube_coord,
+                self.selection_radius, self.clicked_hex_as_cube_coord)
+            self.selected_hexes = self.grid.present(self.selected_hexes_cube_coords)
+            self.selection_key = selection_key
+            self.selection_grid = self.grid
+
+        rects = self.draw_selected_hexes(self.selected_hexes)
+        rects += self.draw_HUD(mouse_pos, self.selected_hexes_cube_coords, selection_key)
+
+        dirty = None if full_update else self.overlay_rects + rects
+        self.overlay_rects = rects
+        return dirty
+
+    def draw_HUD(self, mouse_pos, selected_hexes_cube_coords, selection_key=None):
+        render = self.text_cache.render
+        selection_type_text = render(
+            self.font, "(Right Click To Change) Selection Type: " + Selection.Type.to_string(self.selection_type.value),
+            HUD_TEXT_COLOUR)
+        radius_text = render(
+            self.font, "(Scroll Mouse Wheel To Change) Radius: " + str(self.selection_radius.value),
+            HUD_TEXT_COLOUR)
+        fps_text = render(self.font, " FPS: " + str(int(self.clock.get_fps())), HUD_TEXT_COLOUR)
+        clicked_hx_coord = render(
+            self.font,
+            self.hud_string("clicked", tuple(self.clicked_hex_as_cube_coord),
+                            lambda: " clicked hex coord (cubic): " + str(self._clicked_hex_as_cube_coord)),
+            HUD_TEXT_COLOUR)
+        clicked_hexes = self.grid.present(self._clicked_hex_as_cube_coord)
+        clicked_hx_text = render(self.font, " clicked hex: " + self.grid.terrain_name(clicked_hexes[0]) if len(clicked_hexes) else "_",
+                                 HUD_TEXT_COLOUR)
+        mouse_pos_text = render(
+            self.font,
+            self.hud_string("mouse", (pg.mouse.get_pos(), self.background_view),
+                            lambda: f" mouse pos : {pg.mouse.get_pos()} => {mouse_pos} "),
+            HUD_TEXT_COLOUR)
+        rad_hex_text = render(
+            self.font,
+            self.hud_string("selection", selection_key,
+                            lambda: f"rad_hex selection {selected_hexes_cube_coords}"),
+            HUD_TEXT_COLOUR)
+
+        camera_text = render(
+            self.font, "(WASD / Middle Drag To Pan, Ctrl + Wheel To Zoom) Zoom: " + str(self.camera.zoom),
+            HUD_TEXT_COLOUR)
+
+        display_driver_text = render(self.font, f"PG display driver: {pg.display.get_driver()}", HUD_TEXT_COLOUR)
+        return self.main_surf.blits([
+            (fps_text, (5, 0)),
+            (radius_text, (5, 15)),
+            (selection_type_text, (5, 30)),
+            (clicked_hx_coord, (5, 45)),
+            (clicked_hx_text, (5, 60)),
+            (mouse_pos_text, (self.viewport_pixel_size[0] - mouse_pos_text.get_width(), 0)),
+            (display_driver_text, (self.viewport_pixel_size[0] - display_driver_text.get_width(), 15)),
+            (rad_hex_text, (5, 75)),
+            (camera_text, (5, 90)),
+        ])
+
+    def hud_string(self, name, key, format_string):
+        """ Return format_string(), calling it again only when `key` differs from last time (None always does). """
+        cached = self.hud_strings.get(name)
+        if key is None or cached is None or cached[0] != key:
+            cached = (key, format_string())
+            self.hud_strings[name] = cached
+        return cached[1]
+
+    def draw_selected_hexes(self, indexes):
+        zoom = self.camera.zoom
+        if zoom not in self.selected_hex_images:
+            self.selected_hex_images[zoom] = make_hex_surface(
+                (128, 128, 128, 180),
+                self.hex_radius * zoom,
+                (255, 255, 255),
+                hollow=False,
+                border=5)
+        selected_hex_image = self.selected_hex_images[zoom]
+
+        offset = np.array(selected_hex_image.get_size()) / 2
+        positions = (self.camera.world_to_screen(self.grid.centers[indexes]) - offset).tolist()
+        return self.main_surf.blits([(selected_hex_image, position) for position in positions])
 
 class ClampedInteger:
     def __init__(self, initial_value, lower_limit, upper_limit):
@@ -282,42 +364,6 @@ class CyclicInteger:
             self.value = self.upper_limit
         return self
 
-class Selection:
-    class Type:
-        POINT = 0
-        RING = 1
-        DISK = 2
-        LINE = 3
-        SPIRAL = 4
-
-        @staticmethod
-        def to_string(selection_type):
-            if selection_type == Selection.Type.DISK:
-                return "disk"
-            elif selection_type == Selection.Type.RING:
-                return "ring"
-            elif selection_type == Selection.Type.LINE:
-                return "line"
-            elif selection_type == Selection.Type.SPIRAL:
-                return "spiral"
-            else:
-                return "point"
-
-    @staticmethod
-    def get_selection(selection_type, cube_mouse, selection_radius, clicked_hex=None):
-        if selection_type == Selection.Type.DISK:
-            return hx.get_disk(cube_mouse, selection_radius.value)
-        elif selection_type == Selection.Type.RING:
-            return hx.get_ring(cube_mouse, selection_radius.value)
-        elif selection_type == Selection.Type.LINE:
-            return hx.get_hex_line(clicked_hex, cube_mouse)
-        elif selection_type == Selection.Type.SPIRAL:
-            click_rad = int(hx.get_cube_distance([0, 0, 0], clicked_hex))
-            mouse_rad = int(hx.get_cube_distance([0, 0, 0], cube_mouse))
-            return hx.get_spiral([0, 0, 0], min(click_rad, mouse_rad), max(click_rad, mouse_rad))
-        else:
-            return np.array([cube_mouse.copy()])
-
 def make_hex_surface(color, radius, border_color=(100, 100, 100), border=True, hollow=False):
     angles_in_radians = np.deg2rad([60 * i + 30 for i in range(6)])
     x = radius * np.cos(angles_in_radians)
@@ -351,23 +397,28 @@ def make_hex_surface(color, radius, border_color=(100, 100, 100), border=True, h
     return surface
 
 def load_hex_map(filename):
-    with open(filename, 'r') as file:
-        hex_map_data = json.load(file)
-    # Convert string keys back to tuple
-    hex_map_data = {tuple(json.loads(key)): value for key, value in hex_map_data.items()}
-    return hex_map_data
-
-if len(sys.argv) < 2:
-    print("Usage: python explorer.py <hex_map_file.json>")
-    exit(1)
-
-hex_map_file = sys.argv[1]
-hex_map_data = load_hex_map(hex_map_file)
-hex_map = ExampleHexMap(hex_map_data)
-
-running = True
-while running:
-    running = hex_map.main_loop()
-    hex_map.draw()
-
-hex_map.quit_app()
+    if os.path.isfile(os.path.join(filename, WORLD_FILE)):
+        return ChunkedWorld(filename)
+    if filename.endswith(MAP_EXTENSION):
+        # Memory-mapped: opening costs the same whatever the map size, and
+        # only the rows under the viewport are ever read
+        return load_map(filename, mmap=True)
+    # Legacy JSON maps with stringified cube keys
+    return read_json_map(filename)
+
+def load_terrain_surfaces(hex_radius=HEX_RADIUS):
+    # Scaled once per hex radius and cached on disk as a sprite atlas
+    try:
+        return load_sprites(terrain_types, hex_radius)
+    except FileNotFoundError as e:
+        print("Error loading terrain images")
+        print(str(e))
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(f"Usage: python explorer.py <hex_map_file{MAP_EXTENSION} | hex_map_file.json | world_dir>")
+        exit(1)
+
+    hex_map_file = sys.argv[1]
+    SceneManager().run(ExampleHexMap(load_hex_map(hex_map_file)))
@@ -1,11 +1,14 @@
 # hexmap.py
-from collections import deque
 import numpy as np
 import hexy as hx
 import pygame as pg
-from PIL import Image, ImageDraw
 import os
-import random
+
+from utils import hex_grid
+from utils.hex_grid import HexGrid, pixel_to_cube
+from utils.selection import Selection
+from utils.sprite_atlas import load_sprites
+from utils.terrain import generate_terrain
 
 TARGET_FPS = 60
 HEX_RADIUS = 30
@@ -31,52 +34,13 @@ terrain_probabilities = {
     "settlement": 0.02
 }
 
-def scale_image(image, hex_radius):
-    # Calculate the new size preserving the aspect ratio
-    original_size = image.size
-    scale_ratio = (hex_radius * 1.9) / max(original_size)
-    new_size = tuple([int(dim * scale_ratio) for dim in original_size])
-    return image.resize(new_size, Image.Resampling.LANCZOS)
-
-# Load and scale images
-terrain_images = {}
-for key, value in terrain_types.items():
-    try:
-        image = Image.open(value)
-        terrain_images[key] = scale_image(image, HEX_RADIUS)
-    except FileNotFoundError as e:
-        print(f"Error loading image for terrain type '{key}': {value}")
-        print(str(e))
-        exit(1)
-
-# Convert PIL images to Pygame surfaces
-def pil_to_pygame(image):
-    mode = image.mode
-    size = image.size
-    data = image.tobytes()
-    return pg.image.fromstring(data, size, mode)
-
-terrain_surfaces = {key: pil_to_pygame(image) for key, image in terrain_images.items()}
-
-class ExampleHex(hx.HexTile):
-    def __init__(self, axial_coordinates, terrain, radius):
-        self.axial_coordinates = np.array([axial_coordinates])
-        self.cube_coordinates = hx.axial_to_cube(self.axial_coordinates)
-        self.position = hx.axial_to_pixel(self.axial_coordinates, radius)
-        self.terrain = terrain
-        self.radius = radius
-        self.image = terrain_surfaces[terrain]
-        self.value = None
-
-    def set_value(self, value):
-        self.value = value
-
-    def get_draw_position(self):
-        draw_position = self.position[0] - [self.image.get_width() / 2, self.image.get_height() / 2]
-        return draw_position
-
-    def get_position(self):
-        return self.position[0]
+# Scaled once per hex radius and cached on disk as a sprite atlas
+try:
+    terrain_surfaces = load_sprites(terrain_types, HEX_RADIUS)
+except FileNotFoundError as e:
+    print("Error loading terrain images")
+    print(str(e))
+    exit(1)
 
 class ExampleHexMap:
     def __init__(self, viewport_pixel_size=VIEWPORT_PIXEL_SIZE, hex_radius=HEX_RADIUS, caption="ExampleHexMap"):
@@ -89,7 +53,6 @@ class ExampleHexMap:
 
         self.hex_radius = hex_radius
 
-        self.hex_map = hx.HexMap()
         self.max_coord = 8
 
         self.selection_radius = ClampedInteger(3, 1, 5)
@@ -104,23 +67,21 @@ class ExampleHexMap:
         self.selection_type = CyclicInteger(3, 0, 4)
         self._clicked_hex_as_cube_coord = np.array([[0, 0, 0]])
 
-        all_coordinates = hx.get_disk(np.array((0, 0, 0)), self.max_coord)
+        all_coordinates = hex_grid.disk((0, 0, 0), self.max_coord)
         col_idx = np.random.randint(0, 4, len(all_coordinates))
 
-        hexes = []
         num_shown_hexes = np.random.binomial(len(all_coordinates), .95)
-        axial_coordinates = hx.cube_to_axial(all_coordinates)
+        axial_coordinates = hx.cube_to_axial(all_coordinates).astype(int)
         axial_coordinates = axial_coordinates[np.random.choice(len(axial_coordinates), num_shown_hexes, replace=False)]
 
-        terrain_choices = list(terrain_probabilities.keys())
-        terrain_weights = list(terrain_probabilities.values())
-
-        for i, axial in enumerate(axial_coordinates):
-            terrain = random.choices(terrain_choices, weights=terrain_weights, k=1)[0]
-            hexes.append(ExampleHex(axial, terrain, hex_radius))
-            hexes[-1].set_value(i)
+        legend = list(terrain_probabilities.keys())
+        terrain = generate_terrain(num_shown_hexes, probabilities=terrain_probabilities, legend=legend)
+        self.grid = HexGrid(axial_coordinates[:, 0], axial_coordinates[:, 1], terrain, legend, hex_radius,
+                            values=np.arange(num_shown_hexes))
 
-        self.hex_map[np.array(axial_coordinates)] = hexes
+        # Sprite and blit offset per terrain code
+        self.terrain_sprites = [terrain_surfaces[name] for name in legend]
+        self.sprite_offsets = np.array([np.array(sprite.get_size()) / 2 for sprite in self.terrain_sprites])
 
         self.main_surf = None
         self.font = None
@@ -152,7 +113,7 @@ class ExampleHexMap:
 
             if event.type == pg.MOUSEBUTTONDOWN:
                 if event.button == 1:
-                    self._clicked_hex_as_cube_coord = hx.pixel_to_cube(
+                    self._clicked_hex_as_cube_coord = pixel_to_cube(
                         np.array([pg.mouse.get_pos() - self.center]),
                         self.hex_radius)
                 if event.button == 3:
@@ -179,25 +140,25 @@ class ExampleHexMap:
         return running
 
     def draw(self):
-        hexagons = list(self.hex_map.values())
-        self.main_surf.blits((hexagon.image, hexagon.get_draw_position() + self.center) for hexagon in hexagons)
-
-        for hexagon in list(self.hex_map.values()):
-            # Comment out or remove the lines below to stop displaying numbers
-            # text = self.font.render(str(hexagon.value), False, (0, 0, 0))
-            # text.set_alpha(160)
-            # text_pos = hexagon.get_position() + self.center
-            # text_pos -= (text.get_width() / 2, text.get_height() / 2)
-             # self.main_surf.blit(text, text_pos)
-
-            mouse_pos = np.array([pg.mouse.get_pos()]) - self.center
-            mouse_pos_as_cube_coord = hx.pixel_to_cube(mouse_pos, self.hex_radius)[0]
-            selected_hexes_cube_coords = Selection.get_selection(self.selection_type.value, mouse_pos_as_cube_coord,
+        draw_positions = (self.grid.centers - self.sprite_offsets[self.grid.terrain] + self.center).tolist()
+        sprites = self.terrain_sprites
+        self.main_surf.blits(zip([sprites[code] for code in self.grid.terrain.tolist()], draw_positions))
+
+        # Uncomment the lines below to display hex numbers
+        # for index in range(len(self.grid)):
+        #     text = self.font.render(str(self.grid.values[index]), False, (0, 0, 0))
+        #     text.set_alpha(160)
+        #     text_pos = self.grid.centers[index] + self.center
+        #     text_pos -= (text.get_width() / 2, text.get_height() / 2)
+        #     self.main_surf.blit(text, text_pos)
+
+        mouse_pos = np.array([pg.mouse.get_pos()]) - self.center
+        mouse_pos_as_cube_coord = pixel_to_cube(mouse_pos, self.hex_radius)[0]
+        selected_hexes_cube_coords = Selection.get_selection(self.selection_type.value, mouse_pos_as_cube_coord,
                                                              self.selection_radius, self.clicked_hex_as_cube_coord)
 
-        selected_hexes_axial_coords = hx.cube_to_axial(selected_hexes_cube_coords)
-        selected_hexes = self.hex_map[selected_hexes_axial_coords]
-        deque(map(self.draw_selected_hex, selected_hexes), maxlen=0)
+        selected_hexes = self.grid.present(selected_hexes_cube_coords)
+        self.draw_selected_hexes(selected_hexes)
 
         self.draw_HUD(mouse_pos, selected_hexes_cube_coords)
         pg.display.update()
@@ -214,8 +175,8 @@ class ExampleHexMap:
         fps_text = self.font.render(" FPS: " + str(int(self.clock.get_fps())), True, (50, 50, 50))
         clicked_hx_coord = self.font.render(" clicked hex coord (cubic): " + str(self._clicked_hex_as_cube_coord),
                                             True, (50, 50, 50))
-        clicked_hexes = self.hex_map[self.clicked_hex_axial_coord]
-        clicked_hx_text = self.font.render(" clicked hex: " + str(clicked_hexes[0]) if clicked_hexes else "_", True,
+        clicked_hexes = self.grid.present(self._clicked_hex_as_cube_coord)
+        clicked_hx_text = self.font.render(" clicked hex: " + str(self.grid.values[clicked_hexes[0]]) if len(clicked_hexes) else "_", True,
                                            (50, 50, 50))
         mouse_pos_text = self.font.render(f" mouse pos : {pg.mouse.get_pos()} => {mouse_pos} ", True,
                                           (50, 50, 50))
@@ -231,8 +192,10 @@ class ExampleHexMap:
         self.main_surf.blit(display_driver_text, (self.viewport_pixel_size[0] - display_driver_text.get_width(), 15))
         self.main_surf.blit(rad_hex_text, (5, 75))
 
-    def draw_selected_hex(self, hexagon):
-        self.main_surf.blit(self.selected_hex_image, hexagon.get_draw_position() + self.center)
+    def draw_selected_hexes(self, indexes):
+        offset = self.center - np.array(self.selected_hex_image.get_size()) / 2
+        positions = (self.grid.centers[indexes] + offset).tolist()
+        self.main_surf.blits((self.selected_hex_image, position) for position in positions)
 
     def quit_app(self):
         pg.quit()
@@ -273,42 +236,6 @@ class CyclicInteger:
         return self
 
 
-class Selection:
-    class Type:
-        POINT = 0
-        RING = 1
-        DISK = 2
-        LINE = 3
-        SPIRAL = 4
-
-        @staticmethod
-        def to_string(selection_type):
-            if selection_type == Selection.Type.DISK:
-                return "disk"
-            elif selection_type == Selection.Type.RING:
-                return "ring"
-            elif selection_type == Selection.Type.LINE:
-                return "line"
-            elif selection_type == Selection.Type.SPIRAL:
-                return "spiral"
-            else:
-                return "point"
-
-    @staticmethod
-    def get_selection(selection_type, cube_mouse, selection_radius, clicked_hex=None):
-        if selection_type == Selection.Type.DISK:
-            return hx.get_disk(cube_mouse, selection_radius.value)
-        elif selection_type == Selection.Type.RING:
-            return hx.get_ring(cube_mouse, selection_radius.value)
-        elif selection_type == Selection.Type.LINE:
-            return hx.get_hex_line(clicked_hex, cube_mouse)
-        elif selection_type == Selection.Type.SPIRAL:
-            click_rad = int(hx.get_cube_distance([0, 0, 0], clicked_hex))
-            mouse_rad = int(hx.get_cube_distance([0, 0, 0], cube_mouse))
-            return hx.get_spiral([0, 0, 0], min(click_rad, mouse_rad), max(click_rad, mouse_rad))
-        else:
-            return np.array([cube_mouse.copy()])
-
 def make_hex_surface(color, radius, border_color=(100, 100, 100), border=True, hollow=False):
     angles_in_radians = np.deg2rad([60 * i + 30 for i in range(6)])
     x = radius * np.cos(angles_in_radians)
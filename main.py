@@ -1,11 +1,10 @@
 import os
-import subprocess
-import sys
 import pygame as pg
 
-# Initialize Pygame
-pg.init()
-pg.font.init()
+import overland
+from explorer import ExampleHexMap, load_hex_map
+from utils.launcher import get_launcher
+from utils.scenes import Scene, SceneManager
 
 # Constants
 SCREEN_WIDTH, SCREEN_HEIGHT = 800, 920
@@ -20,113 +19,165 @@ COLORS = {
     "popup": (255, 255, 255),
     "popup_border": (0, 0, 0),
 }
-FONT = pg.font.SysFont('Arial', 24)
-POPUP_FONT = pg.font.SysFont('Arial', 20)
-
-# Set up the screen
-screen = pg.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pg.display.set_caption("Main Menu")
 
 script_dir = os.path.dirname(os.path.abspath(__file__))
 maps_dir = os.path.join(script_dir, "maps")
+save_dir = os.path.join(script_dir, "saves")
+MAP_EXTENSIONS = (".hxm", ".json")
 
+# The Tk and Qt tools run their own event loops, so they stay separate
+# processes, forked from a launcher that already has the heavy imports loaded
 def run_script(script_name, *args):
     script_path = os.path.join(script_dir, script_name)
-    subprocess.run([sys.executable, script_path, *args])
+    get_launcher().run(script_path, *args)
 
-def draw_button(text, position):
+def draw_button(surface, font, text, position):
     mouse_pos = pg.mouse.get_pos()
     button_rect = pg.Rect(*position, BUTTON_WIDTH, BUTTON_HEIGHT)
     shadow_rect = pg.Rect(position[0] + 5, position[1] + 5, BUTTON_WIDTH, BUTTON_HEIGHT)
     color = COLORS["button_hover"] if button_rect.collidepoint(mouse_pos) else COLORS["button"]
 
-    pg.draw.rect(screen, COLORS["button_shadow"], shadow_rect, border_radius=10)
-    pg.draw.rect(screen, color, button_rect, border_radius=10)
-    pg.draw.rect(screen, COLORS["popup_border"], button_rect, 2, border_radius=10)
+    pg.draw.rect(surface, COLORS["button_shadow"], shadow_rect, border_radius=10)
+    pg.draw.rect(surface, color, button_rect, border_radius=10)
+    pg.draw.rect(surface, COLORS["popup_border"], button_rect, 2, border_radius=10)
 
-    text_surface = FONT.render(text, True, COLORS["button_text"])
-    screen.blit(text_surface, text_surface.get_rect(center=button_rect.center))
+    text_surface = font.render(text, True, COLORS["button_text"])
+    surface.blit(text_surface, text_surface.get_rect(center=button_rect.center))
     return button_rect
 
-def draw_popup(text, position, width, height):
+def draw_popup(surface, font, text, position, width, height):
     popup_rect = pg.Rect(*position, width, height)
-    pg.draw.rect(screen, COLORS["popup"], popup_rect, border_radius=10)
-    pg.draw.rect(screen, COLORS["popup_border"], popup_rect, 2, border_radius=10)
+    pg.draw.rect(surface, COLORS["popup"], popup_rect, border_radius=10)
+    pg.draw.rect(surface, COLORS["popup_border"], popup_rect, 2, border_radius=10)
 
-    text_surface = POPUP_FONT.render(text, True, COLORS["popup_border"])
-    screen.blit(text_surface, text_surface.get_rect(center=(position[0] + width // 2, position[1] + height // 2)))
+    text_surface = font.render(text, True, COLORS["popup_border"])
+    surface.blit(text_surface, text_surface.get_rect(center=(position[0] + width // 2, position[1] + height // 2)))
     return popup_rect
 
-def choose_character():
-    save_dir = os.path.join(script_dir, "saves")
-    save_files = [f for f in os.listdir(save_dir) if f.endswith(".json") and len(f.split('.')) == 3]
-    if not save_files:
-        print("No characters found. Returning to main menu.")
-        return
-
-    while True:
-        screen.fill(COLORS["background"])
-        popup_rect = draw_popup("Choose a character to load:", (200, 200), 400, 50)
-        button_positions = [(275, 270 + i * (BUTTON_HEIGHT + BUTTON_PADDING)) for i in range(len(save_files))]
-
-        for i, pos in enumerate(button_positions):
-            rect = draw_button(f"{i + 1}. {save_files[i]}", pos)
-            if pg.mouse.get_pressed()[0] and rect.collidepoint(pg.mouse.get_pos()):
-                run_script("csdisplay.py", os.path.join(save_dir, save_files[i]))
-                return
-
-        if any(event.type == pg.QUIT for event in pg.event.get()):
-            pg.quit()
-            return
-        pg.display.flip()
-
-def main_menu():
-    buttons = [
-        ("Create Character", "ccmenu.py"),
-        ("New Map", "overland.py"),
-        ("Continue Game", None),
-        ("Generate Encounter", "DM_Enc_tool.py"),
-        ("Backpack", "inventory.py"),
-        ("Level Up", "leveling.py"),
-        ("Camp", "camp.py"),
-        ("Choose Character", choose_character),
-        ("Exit", None)
-    ]
-
-    while True:
-        screen.fill(COLORS["background"])
-        for i, (text, script) in enumerate(buttons):
-            rect = draw_button(text, (275, 100 + i * (BUTTON_HEIGHT + BUTTON_PADDING)))
-            if pg.mouse.get_pressed()[0] and rect.collidepoint(pg.mouse.get_pos()):
-                if text == "New Map":
-                    run_script(script)
-                    generated_files = [f for f in os.listdir(maps_dir) if f.startswith("hex_map_") and f.endswith(".json")]
-                    if generated_files:
-                        latest_map = max(generated_files, key=lambda f: os.path.getctime(os.path.join(maps_dir, f)))
-                        print(f"Loading the latest generated map: {os.path.join(maps_dir, latest_map)}")
-                        run_script("explorer.py", os.path.join(maps_dir, latest_map))
-                    else:
-                        print("No maps generated. Returning to main menu.")
-                elif text == "Continue Game":
-                    generated_files = [f for f in os.listdir(maps_dir) if f.startswith("hex_map_") and f.endswith(".json")]
-                    if generated_files:
-                        latest_map = max(generated_files, key=lambda f: os.path.getctime(os.path.join(maps_dir, f)))
-                        print(f"Loading the most recent map: {os.path.join(maps_dir, latest_map)}")
-                        run_script("explorer.py", os.path.join(maps_dir, latest_map))
-                    else:
-                        print("No maps found. Returning to main menu.")
-                elif text == "Exit":
-                    pg.quit()
+def latest_map():
+    generated_files = [f for f in os.listdir(maps_dir) if f.startswith("hex_map_") and f.endswith(MAP_EXTENSIONS)]
+    if not generated_files:
+        return None
+    return os.path.join(maps_dir, max(generated_files, key=lambda f: os.path.getctime(os.path.join(maps_dir, f))))
+
+class ButtonScene(Scene):
+    """ A column of buttons; clicking one calls on_click with its index. """
+    size = (SCREEN_WIDTH, SCREEN_HEIGHT)
+    first_button_y = 100
+
+    def __init__(self):
+        super().__init__()
+        self.font = None
+        self.popup_font = None
+
+    def enter(self, manager):
+        super().enter(manager)
+        self.font = manager.font('Arial', 24)
+        self.popup_font = manager.font('Arial', 20)
+
+    def labels(self):
+        return []
+
+    def button_position(self, i):
+        return 275, self.first_button_y + i * (BUTTON_HEIGHT + BUTTON_PADDING)
+
+    def handle_event(self, event):
+        if event.type == pg.MOUSEBUTTONDOWN and event.button == 1:
+            for i in range(len(self.labels())):
+                if pg.Rect(self.button_position(i), (BUTTON_WIDTH, BUTTON_HEIGHT)).collidepoint(event.pos):
+                    self.on_click(i)
                     return
-                elif callable(script):
-                    script()
-                else:
-                    run_script(script)
 
-        if any(event.type == pg.QUIT for event in pg.event.get()):
-            pg.quit()
+    def on_click(self, i):
+        pass
+
+    def draw(self, surface):
+        surface.fill(COLORS["background"])
+        for i, text in enumerate(self.labels()):
+            draw_button(surface, self.font, text, self.button_position(i))
+
+class ChooseCharacterScene(ButtonScene):
+    caption = "Choose Character"
+    first_button_y = 270
+
+    def __init__(self, save_files):
+        super().__init__()
+        self.save_files = save_files
+
+    def labels(self):
+        return [f"{i + 1}. {save_file}" for i, save_file in enumerate(self.save_files)]
+
+    def on_click(self, i):
+        run_script("csdisplay.py", os.path.join(save_dir, self.save_files[i]))
+        self.manager.pop()
+
+    def handle_event(self, event):
+        if event.type == pg.KEYDOWN and event.key == pg.K_ESCAPE:
+            self.manager.pop()
+        else:
+            super().handle_event(event)
+
+    def draw(self, surface):
+        super().draw(surface)
+        draw_popup(surface, self.popup_font, "Choose a character to load:", (200, 200), 400, 50)
+
+class MainMenuScene(ButtonScene):
+    caption = "Main Menu"
+
+    def __init__(self):
+        super().__init__()
+        self.buttons = [
+            ("Create Character", "ccmenu.py"),
+            ("New Map", self.new_map),
+            ("Continue Game", self.continue_game),
+            ("Generate Encounter", "DM_Enc_tool.py"),
+            ("Backpack", "inventory.py"),
+            ("Level Up", "leveling.py"),
+            ("Camp", "camp.py"),
+            ("Choose Character", self.choose_character),
+            ("Exit", self.exit_game)
+        ]
+
+    def labels(self):
+        return [text for text, _ in self.buttons]
+
+    def on_click(self, i):
+        script = self.buttons[i][1]
+        if callable(script):
+            script()
+        else:
+            run_script(script)
+
+    def open_map(self, map_file):
+        self.manager.push(ExampleHexMap(load_hex_map(map_file)))
+
+    def new_map(self):
+        map_file = overland.generate_map()
+        print(f"Loading the latest generated map: {map_file}")
+        self.open_map(map_file)
+
+    def continue_game(self):
+        map_file = latest_map()
+        if map_file:
+            print(f"Loading the most recent map: {map_file}")
+            self.open_map(map_file)
+        else:
+            print("No maps found. Returning to main menu.")
+
+    def choose_character(self):
+        save_files = [f for f in os.listdir(save_dir) if f.endswith(".json") and len(f.split('.')) == 3]
+        if not save_files:
+            print("No characters found. Returning to main menu.")
             return
-        pg.display.flip()
+        self.manager.push(ChooseCharacterScene(save_files))
+
+    def exit_game(self):
+        self.manager.quit()
+
+def main_menu():
+    # Fork the launcher before pygame opens the window, so it starts clean
+    get_launcher().start()
+    SceneManager().run(MainMenuScene())
 
 if __name__ == '__main__':
     main_menu()
@@ -1,15 +1,19 @@
+import argparse
 import json
 import os
-import numpy as np
-import hexy as hx
-import random
 from datetime import datetime
 
+from utils.chunks import ChunkedWorld
+from utils.dice import stream
+from utils.map_format import MAP_EXTENSION, write_map
+from utils.terrain import TERRAIN_LEGEND, TERRAIN_MODES, disk_coordinates, generate_map_terrain, terrain_probabilities
+
 HEX_RADIUS = 30
 # Absolute paths
 script_dir = os.path.abspath(os.path.dirname(__file__))
 images_dir = os.path.join(script_dir, "images")
 maps_dir = os.path.join(script_dir, "maps")
+worlds_dir = os.path.join(maps_dir, "worlds")
 
 # Define terrain types and their corresponding images
 terrain_types = {
@@ -31,45 +35,67 @@ for terrain, filename in terrain_types.items():
 if not os.path.exists(maps_dir):
     os.makedirs(maps_dir)
 
-terrain_probabilities = {
-    "dense": 0.75,
-    "hill": 0.10,
-    "open": 0.10,
-    "water": 0.03,
-    "settlement": 0.02
-}
-
-class ExampleHex:
-    def __init__(self, cube_coordinates, terrain):
-        self.cube_coordinates = cube_coordinates
-        self.terrain = terrain
-
 class ExampleHexMap:
-    def __init__(self, max_coord=15):
-        self.hex_map = {}
+    def __init__(self, max_coord=15, seed=None, mode="random"):
         self.max_coord = max_coord
+        self.mode = mode
+        # Keep the seed so the same world can be regenerated bit-for-bit
+        self.seed = stream("map").new_seed() if seed is None else seed
+        self.legend = TERRAIN_LEGEND
+
+        # Terrain codes line up row-for-row with the cube coordinates
+        self.cube_coordinates = disk_coordinates(self.max_coord)
+        self.terrain = generate_map_terrain(self.cube_coordinates, self.seed, self.mode, terrain_probabilities, self.legend)
 
-        all_coordinates = hx.get_disk(np.array((0, 0, 0)), self.max_coord)
-        terrain_choices = list(terrain_probabilities.keys())
-        terrain_weights = list(terrain_probabilities.values())
+    def __len__(self):
+        return len(self.cube_coordinates)
 
-        for cube in all_coordinates:
-            terrain = random.choices(terrain_choices, weights=terrain_weights, k=1)[0]
-            self.hex_map[tuple(cube)] = ExampleHex(cube.tolist(), terrain)
+    def save_to_map(self, filename):
+        write_map(filename, self.cube_coordinates[:, 0], self.cube_coordinates[:, 2], self.terrain,
+                  self.legend, self.seed, self.max_coord)
 
     def save_to_json(self, filename):
-        hex_map_data = {json.dumps(key): {"cube": hex.cube_coordinates, "terrain": hex.terrain} for key, hex in self.hex_map.items()}
+        cubes = self.cube_coordinates.astype(float).tolist()
+        names = [self.legend[code] for code in self.terrain]
+        hex_map_data = {json.dumps(cube): {"cube": cube, "terrain": terrain} for cube, terrain in zip(cubes, names)}
         with open(filename, 'w') as file:
             json.dump(hex_map_data, file)
 
-try:
-    hex_map = ExampleHexMap()
+def generate_map(radius=15, seed=None, mode="random", use_json=False):
+    """ Generate a fixed-size map, save it in the maps folder and return its path. """
+    hex_map = ExampleHexMap(radius, seed, mode)
 
     # Generate a dynamic filename with timestamp
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"hex_map_{timestamp}.json"
+    if use_json:
+        filename = f"hex_map_{timestamp}.json"
+        hex_map.save_to_json(os.path.join(maps_dir, filename))
+    else:
+        filename = f"hex_map_{timestamp}{MAP_EXTENSION}"
+        hex_map.save_to_map(os.path.join(maps_dir, filename))
+    print(f"Map saved as {os.path.join(maps_dir, filename)} (seed {hex_map.seed})")
+    return os.path.join(maps_dir, filename)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate a new overland hex map.")
+    parser.add_argument("--radius", type=int, default=15, help="map radius in hexes")
+    parser.add_argument("--seed", type=int, default=None, help="world seed, random if omitted")
+    parser.add_argument("--mode", choices=TERRAIN_MODES, default="random",
+                        help="'random' samples every hex independently, 'noise' grows clustered biomes")
+    parser.add_argument("--world", default=None,
+                        help="create an unbounded chunked world with this name instead of a fixed map")
+    parser.add_argument("--json", action="store_true", help=f"save in the legacy JSON format instead of {MAP_EXTENSION}")
+    return parser.parse_args()
 
-    hex_map.save_to_json(os.path.join(maps_dir, filename))
-    print(f"Map saved as {os.path.join(maps_dir, filename)}")
-except Exception as e:
-    print(f"An error occurred: {e}")
+if __name__ == "__main__":
+    args = parse_args()
+    try:
+        if args.world:
+            world = ChunkedWorld(os.path.join(worlds_dir, args.world), args.seed, args.mode)
+            # Only the chunks around the starting area are generated up front
+            world.window(-args.radius, args.radius, -args.radius, args.radius)
+            print(f"World saved in {world.world_dir} (seed {world.seed}, {world.mode} terrain)")
+        else:
+            generate_map(args.radius, args.seed, args.mode, args.json)
+    except Exception as e:
+        print(f"An error occurred: {e}")
@@ -0,0 +1,351 @@
+# /tables/combat_sim.py
+# Headless Monte Carlo fights for encounter balancing.
+#
+# A party (character saves) and a group of monsters (from realms/*.json, an
+# encounter file, or the monsters table) are turned into Combatants whose
+# attacks are temp_combat's CompiledAttacks. simulate then plays n full
+# fights at once: every per-fight value (hit points, initiative order, prone
+# flags) is a NumPy column, and each turn resolves one attack for all fights
+# still running. Fights use initiative, random targets among standing
+# enemies, natural 1s and 20s, crit ranges, saving throws against prone
+# riders, and advantage on prone targets. A prone creature stands up at the
+# start of its turn; a creature at 0 hit points is out of the fight.
+# Only actions with an attack roll are used, so spellcasters fight with
+# their weapons.
+#
+#   python tables/combat_sim.py --party Kim.hesperia --realm hesperia --monsters "Giant Ox" -n 100000
+
+import argparse
+import json
+import os
+import re
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from tables.temp_combat import CompiledAttack, get_monster_data, parse_bonus
+from utils.dice import Distribution, distribution, parse, stream
+from utils.realm_repository import get_realm
+
+script_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+saves_dir = os.path.join(script_dir, "saves")
+
+PARTY, MONSTERS = 0, 1
+SAVE_TYPES = ("strength", "dexterity", "constitution", "intelligence", "wisdom", "charisma")
+MAX_ROUNDS = 50  # fights still going after this many rounds count as losses
+HP_LOSS_BINS = 10
+NUMBER_WORDS = {"twice": 2, "two": 2, "three": 3, "thrice": 3, "four": 4, "five": 5, "six": 6}
+
+HIT_TAG = re.compile(r"\{@hit (-?\d+)\}")
+DAMAGE_TAG = re.compile(r"\{@damage ([^}]+)\}")
+FLAT_DAMAGE = re.compile(r"\{@h\}(\d+) ")
+SAVE_TAG = re.compile(r"\{@dc (\d+)\}\s*(\w+) saving throw", re.IGNORECASE)
+CONDITION_TAG = re.compile(r"\{@condition (\w+)")
+
+
+def ability_modifier(score):
+    return (int(score) - 10) // 2
+
+
+def damage_expression(text):
+    """ "1d8 piercing + 3 + 2" -> "1d8+5"; dice beyond the first kind count as their (rounded down) average. """
+    terms, constant = parse(re.sub(r"[a-zA-Z]{2,}", "", text))
+    if not terms:
+        return str(constant)
+    (count, sides), extra = terms[0], terms[1:]
+    constant += sum(count * (sides + 1) // 2 for count, sides in extra)
+    return f"{count}d{sides}{constant:+d}"
+
+
+class Combatant:
+    """ One side's fighter: hit points as a distribution, saves in SAVE_TYPES order, and the attacks of one turn. """
+
+    __slots__ = ("name", "side", "ac", "hitpoints", "initiative", "saves", "attacks")
+
+    def __init__(self, name, side, ac, hitpoints, initiative, saves, attacks):
+        self.name = name
+        self.side = side
+        self.ac = int(ac)
+        self.hitpoints = hitpoints if isinstance(hitpoints, Distribution) else Distribution.constant(int(hitpoints))
+        self.initiative = int(initiative)
+        self.saves = tuple(int(bonus) for bonus in saves)
+        self.attacks = attacks
+
+    def __repr__(self):
+        return f"Combatant({self.name!r}, AC {self.ac}, HP {self.hitpoints.mean:.0f}, {len(self.attacks)} attacks)"
+
+
+def character_combatant(character_data):
+    """ A party member from a character save. """
+    attack = character_data.get('attack')
+    if attack:
+        attack = {'name': attack.get('name', 'Attack'), 'tohit': attack['to_hit'],
+                  'damage': damage_expression(attack['damage'])}
+    else:
+        # Saves written before attacks were stored: an unarmed strike
+        strength = character_data.get('strength_modifier', 0)
+        attack = {'name': 'Unarmed Strike', 'tohit': character_data.get('proficiency_bonus', 2) + strength,
+                  'damage': str(max(1 + strength, 1))}
+    saves = [character_data.get(f"{save[:3]}_save_bonus", character_data.get(f"{save}_modifier", 0))
+             for save in SAVE_TYPES]
+    return Combatant(character_data.get('name', 'Unknown'), PARTY, character_data.get('armor_class', 10),
+                     character_data.get('current_hp') or character_data.get('hit_points', 1),
+                     character_data.get('dexterity_modifier', 0), saves, [CompiledAttack(attack)])
+
+
+def standard_character(level, name=None):
+    """ A stand-in fighter of `level` for sweeps over party levels: longsword, shield, Extra Attack at 5, 11 and 20. """
+    proficiency = 2 + (level - 1) // 4
+    strength = min(3 + (level >= 4) + (level >= 8), 5)
+    constitution = 2
+    attack = CompiledAttack({'name': 'Longsword', 'tohit': proficiency + strength, 'damage': f"1d8+{strength}"})
+    saves = [strength + proficiency, 1, constitution + proficiency, 0, 1, 0]
+    return Combatant(name or f"Fighter {level}", PARTY, 18 + (level >= 10), 10 + constitution + (level - 1) * (6 + constitution),
+                     1, saves, [attack] * (1 + (level >= 5) + (level >= 11) + (level >= 20)))
+
+
+def load_party(save_names, saves_dir=saves_dir):
+    """ Party members from saves/<name>.json, e.g. ["Kim.hesperia", "Alex.hesperia"]. """
+    party = []
+    for save_name in save_names:
+        path = os.path.join(saves_dir, save_name if save_name.endswith(".json") else save_name + ".json")
+        with open(path, 'r') as file:
+            party.append(character_combatant(json.load(file)))
+    return party
+
+
+def action_attack(action):
+    """ temp_combat attack data for a 5etools action with a {@hit} tag and damage, or None. """
+    text = json.dumps(action.get('entries', []))
+    hit = HIT_TAG.search(text)
+    # Damage is a {@damage} roll, or a flat "{@h}1 piercing damage"
+    damage = DAMAGE_TAG.search(text) or FLAT_DAMAGE.search(text)
+    if not hit or not damage:
+        return None
+    attack = {'name': action.get('name', 'Attack'), 'tohit': hit.group(1), 'damage': damage_expression(damage.group(1))}
+    save, condition = SAVE_TAG.search(text), CONDITION_TAG.search(text)
+    if save and condition:
+        attack['special'] = {'condition': True, 'effect': condition.group(1), 'saving_throw': {
+            'type': save.group(2), 'DC': int(save.group(1)), 'failure': {'effect': condition.group(1)}}}
+    return attack
+
+
+def attacks_per_turn(actions):
+    """ How many attacks a 5etools Multiattack makes, 1 without one. """
+    for action in actions:
+        if action.get('name', '').startswith('Multiattack'):
+            words = re.findall(r"[a-z]+", json.dumps(action.get('entries', [])).lower())
+            return next((NUMBER_WORDS[word] for word in words if word in NUMBER_WORDS), 1)
+    return 1
+
+
+def monster_combatant(monster):
+    """ A monster from a 5etools bestiary entry (realms/*.json or an encounter file). """
+    ac = (monster.get('ac') or [10])[0]
+    ac = ac.get('ac', 10) if isinstance(ac, dict) else ac
+    hp = monster.get('hp', {})
+    hitpoints = distribution(hp['formula']) if 'formula' in hp else Distribution.constant(hp.get('average', 1))
+    listed_saves = monster.get('save', {})
+    saves = [parse_bonus(listed_saves[save[:3]]) if save[:3] in listed_saves else ability_modifier(monster.get(save[:3], 10))
+             for save in SAVE_TYPES]
+
+    actions = monster.get('action') or []
+    attacks = [CompiledAttack(attack) for attack in map(action_attack, actions) if attack]
+    if attacks:
+        # A Multiattack repeats the monster's best attack
+        best = max(attacks, key=lambda attack: attack.tohit + attack.num_dice * (attack.dice_type + 1) / 2 + attack.bonus)
+        attacks = [best] * attacks_per_turn(actions)
+    return Combatant(monster.get('name', 'Unknown'), MONSTERS, ac, hitpoints,
+                     ability_modifier(monster.get('dex', 10)), saves, attacks)
+
+
+def realm_monsters(realm, names):
+    """ Combatants for monster names (repeat a name for several) from realms/<realm>.json. """
+    by_name = {monster.get('name'): monster for monster in get_realm(realm).monsters}
+    missing = [name for name in names if name not in by_name]
+    if missing:
+        raise ValueError(f"Not in realm {realm}: {', '.join(missing)}")
+    return [monster_combatant(by_name[name]) for name in names]
+
+
+def encounter_monsters(encounter_path):
+    """ Combatants for the monsters of an encounter file written by generate_encounter_data. """
+    with open(encounter_path, 'r') as file:
+        return [monster_combatant(monster) for monster in json.load(file)['encounter']]
+
+
+def table_monster(monster_id):
+    """ A monster from the monsters table of the game database. """
+    monster_data = get_monster_data(monster_id)
+    if monster_data is None:
+        raise ValueError(f"No monster with id {monster_id}")
+    return Combatant(monster_data['name'], MONSTERS, monster_data['AC'], distribution(monster_data['hitpoints']),
+                     parse_bonus(monster_data['initiative']), [0] * len(SAVE_TYPES),
+                     [CompiledAttack(attack) for attack in monster_data['attacks']])
+
+
+class FightResults:
+    """ One row per simulated fight. """
+
+    def __init__(self, won, rounds, party_hp_lost, party_down):
+        self.won = won  # the party is standing and the monsters are not
+        self.rounds = rounds
+        self.party_hp_lost = party_hp_lost  # fraction of the party's starting hit points
+        self.party_down = party_down  # party members at 0 hit points
+
+    def __len__(self):
+        return len(self.won)
+
+    def summary(self):
+        percentiles = (10, 50, 90)
+        return {
+            "fights": len(self),
+            "win_rate": float(self.won.mean()),
+            "rounds_mean": float(self.rounds.mean()),
+            "rounds_percentiles": dict(zip(percentiles, np.percentile(self.rounds, percentiles).tolist())),
+            "hp_lost_mean": float(self.party_hp_lost.mean()),
+            "hp_lost_percentiles": dict(zip(percentiles, np.percentile(self.party_hp_lost, percentiles).tolist())),
+            "hp_lost_histogram": np.histogram(self.party_hp_lost, HP_LOSS_BINS, (0, 1))[0].tolist(),
+            "party_down_mean": float(self.party_down.mean()),
+        }
+
+
+def attack_table(combatants):
+    """ Attack stats as (combatants, attacks per turn) arrays, padded with invalid attacks. """
+    width = max([len(combatant.attacks) for combatant in combatants] + [1])
+    shape = (len(combatants), width)
+    table = {name: np.zeros(shape, dtype=np.int32) for name in ("tohit", "num_dice", "dice_type", "bonus", "crit_range")}
+    table["valid"] = np.zeros(shape, dtype=bool)
+    table["save"] = np.full(shape, -1, dtype=np.int32)  # index into SAVE_TYPES of a prone rider, -1 for none
+    table["dc"] = np.zeros(shape, dtype=np.int32)
+    for c, combatant in enumerate(combatants):
+        for a, attack in enumerate(combatant.attacks):
+            table["valid"][c, a] = True
+            for name in ("tohit", "num_dice", "dice_type", "bonus", "crit_range"):
+                table[name][c, a] = getattr(attack, name)
+            rider = attack.rider
+            if rider is not None and rider.failure_effect.lower() == 'prone' and rider.save_type[:-5] in SAVE_TYPES:
+                table["save"][c, a] = SAVE_TYPES.index(rider.save_type[:-5])
+                table["dc"][c, a] = rider.dc
+    return table
+
+
+def pick_targets(rng, candidates):
+    """ A uniformly chosen True column per row of `candidates`; every row needs at least one. """
+    cumulative = candidates.cumsum(axis=1)
+    choice = (rng.random(len(candidates)) * cumulative[:, -1]).astype(np.int32)
+    return (cumulative <= choice[:, None]).sum(axis=1)
+
+
+def simulate(party, monsters, n=100000, seed=None, max_rounds=MAX_ROUNDS):
+    """ Play `n` fights between `party` and `monsters` and return their FightResults.
+
+    Without a seed the draws come from the "combat" dice stream.
+    """
+    rng = stream("combat").rng if seed is None else np.random.default_rng(seed)
+    combatants = list(party) + list(monsters)
+    count = len(combatants)
+    side = np.array([combatant.side for combatant in combatants])
+    ac = np.array([combatant.ac for combatant in combatants], dtype=np.int32)
+    saves = np.array([combatant.saves for combatant in combatants], dtype=np.int32)
+    attacks = attack_table(combatants)
+    width = attacks["valid"].shape[1]
+    max_dice = max(2 * int(attacks["num_dice"].max()), 1)
+    in_party = side == PARTY
+
+    hp = np.column_stack([combatant.hitpoints.sample(n, rng) for combatant in combatants]).astype(np.int32)
+    party_start_hp = hp[:, in_party].sum(axis=1)
+    initiative = rng.integers(1, 21, (n, count)) + np.array([combatant.initiative for combatant in combatants])
+    # Ties go to a coin flip
+    order = np.argsort(-(initiative + rng.random((n, count))), axis=1)
+    prone = np.zeros((n, count), dtype=bool)
+    fights = np.arange(n)
+
+    won = np.zeros(n, dtype=bool)
+    rounds = np.full(n, max_rounds, dtype=np.int16)
+    final_hp = np.empty_like(hp)
+
+    for round_number in range(1, max_rounds + 1):
+        rows = np.arange(len(fights))
+        for turn in range(count):
+            actor = order[:, turn]
+            prone[rows, actor] = False
+            for a in range(width):
+                standing = hp > 0
+                enemies = standing & (side[None, :] != side[actor][:, None])
+                attacking = np.flatnonzero(standing[rows, actor] & attacks["valid"][actor, a] & enemies.any(axis=1))
+                if not len(attacking):
+                    continue
+                attacker = actor[attacking]
+                target = pick_targets(rng, enemies[attacking])
+
+                d20 = rng.integers(1, 21, (len(attacking), 2))
+                natural = np.where(prone[attacking, target], d20.max(axis=1), d20[:, 0])
+                crit = natural >= attacks["crit_range"][attacker, a]
+                hit = crit | ((natural != 1) & (natural + attacks["tohit"][attacker, a] >= ac[target]))
+
+                num_dice = attacks["num_dice"][attacker, a] * (1 + crit)
+                sides = attacks["dice_type"][attacker, a]
+                faces = (rng.random((len(attacking), max_dice)) * sides[:, None]).astype(np.int32) + 1
+                rolled = np.where(np.arange(max_dice) < num_dice[:, None], faces, 0).sum(axis=1)
+                damage = np.where(hit, np.maximum(rolled + attacks["bonus"][attacker, a], 0), 0)
+                hp[attacking, target] -= damage
+
+                # Prone riders: the target saves or falls prone
+                save = attacks["save"][attacker, a]
+                ridden = np.flatnonzero(hit & (save >= 0) & (hp[attacking, target] > 0))
+                if len(ridden):
+                    save_roll = rng.integers(1, 21, len(ridden)) + saves[target[ridden], save[ridden]]
+                    failed = ridden[save_roll < attacks["dc"][attacker[ridden], a]]
+                    prone[attacking[failed], target[failed]] = True
+
+        standing = hp > 0
+        party_standing = standing[:, in_party].any(axis=1)
+        over = ~party_standing | ~standing[:, ~in_party].any(axis=1)
+        finished = fights[over]
+        won[finished] = party_standing[over]
+        rounds[finished] = round_number
+        final_hp[finished] = hp[over]
+
+        # Only fights still going stay in the working columns
+        keep = ~over
+        fights, hp, order, prone = fights[keep], hp[keep], order[keep], prone[keep]
+        if not len(fights):
+            break
+    final_hp[fights] = hp
+
+    party_hp = np.maximum(final_hp[:, in_party], 0)
+    party_hp_lost = 1.0 - party_hp.sum(axis=1) / np.maximum(party_start_hp, 1)
+    return FightResults(won, rounds, party_hp_lost.astype(np.float32), (party_hp == 0).sum(axis=1).astype(np.int8))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate fights between a party and monsters.")
+    parser.add_argument("--party", nargs="+", default=["Kim.hesperia"], help="character saves, e.g. Kim.hesperia")
+    parser.add_argument("--realm", default="hesperia", help="realm the --monsters come from")
+    parser.add_argument("--monsters", nargs="+", default=[], help="monster names, repeated for several")
+    parser.add_argument("--encounter", help="an encounter file written by generate_encounter_data")
+    parser.add_argument("--monster-ids", nargs="+", type=int, default=[], help="ids in the monsters table")
+    parser.add_argument("-n", type=int, default=100000, help="number of fights")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    party = load_party(args.party)
+    monsters = realm_monsters(args.realm, args.monsters)
+    if args.encounter:
+        monsters += encounter_monsters(args.encounter)
+    monsters += [table_monster(monster_id) for monster_id in args.monster_ids]
+    if not monsters:
+        parser.error("no monsters: give --monsters, --encounter or --monster-ids")
+
+    print("Party:", ", ".join(map(repr, party)))
+    print("Monsters:", ", ".join(map(repr, monsters)))
+    results = simulate(party, monsters, args.n, args.seed)
+    for key, value in results.summary().items():
+        print(f"{key:>20}: {value}")
+
+
+if __name__ == "__main__":
+    main()
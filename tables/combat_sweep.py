@@ -0,0 +1,189 @@
+# /tables/combat_sweep.py
+# Balance sweep: simulated fights for every (party level, party size,
+# difficulty, realm) cell, spread over a process pool.
+#
+# Each cell generates encounters for its XP budget from the realm's
+# bestiary and plays them with combat_sim against a party of stand-in
+# fighters. A cell's random draws come from SeedSequence(seed, cell index),
+# so a cell gives the same answer whichever worker runs it and in whatever
+# order. Realms and thresholds are parsed before the pool starts; with fork,
+# workers inherit them instead of parsing them again.
+#
+# Results go to one .npy file per column under the output directory, opened
+# as memmaps and flushed as each cell finishes. The "done" column is written
+# last, so an interrupted sweep picks up where it stopped when run again.
+#
+#   python tables/combat_sweep.py --out cache/sweep --workers 8
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from tables.combat_sim import monster_combatant, simulate, standard_character
+from utils.encounter_batch import DIFFICULTIES, json_data
+from utils.old.encounter_generation import generate_encounter
+from utils.realm_repository import get_realm, realms_dir
+
+script_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DEFAULT_OUT = os.path.join(script_dir, "cache", "sweep")
+LEVELS = range(1, 21)
+PARTY_SIZES = range(1, 7)
+ENCOUNTERS_PER_CELL = 10
+FIGHTS_PER_ENCOUNTER = 200
+META_FILE = "sweep.json"
+
+# Written for every cell; "done" goes last
+COLUMNS = {
+    "level": np.int8,
+    "party_size": np.int8,
+    "difficulty": np.int8,  # index into DIFFICULTIES
+    "realm": np.int8,  # index into the sweep's realm list
+    "encounters": np.int16,  # encounters that found monsters
+    "monsters_mean": np.float32,
+    "win_rate": np.float32,
+    "rounds_mean": np.float32,
+    "hp_lost_mean": np.float32,
+    "hp_lost_p90": np.float32,
+    "party_down_mean": np.float32,
+    "done": np.bool_,
+}
+
+
+def realm_names():
+    return sorted(os.path.splitext(name)[0] for name in os.listdir(realms_dir) if name.endswith(".json"))
+
+
+def sweep_cells(realms):
+    """ (level, party size, difficulty index, realm index) for every cell, in a fixed order. """
+    return [(level, size, difficulty, realm)
+            for realm in range(len(realms))
+            for difficulty in range(len(DIFFICULTIES))
+            for level in LEVELS
+            for size in PARTY_SIZES]
+
+
+def run_cell(cell_index, cell, realms, seed, encounters, fights):
+    """ Simulate one cell; runs in a worker. Returns (cell_index, column values). """
+    level, size, difficulty, realm = cell
+    cell_seed = np.random.SeedSequence(seed, spawn_key=(cell_index,))
+    encounter_seed, fight_seed = cell_seed.spawn(2)
+    encounter_rng = np.random.default_rng(encounter_seed)
+    fight_seeds = fight_seed.spawn(encounters)
+
+    thresholds = next(threshold for threshold in json_data("difficulty_thresholds") if threshold['level'] == level)
+    xp_budget = thresholds[DIFFICULTIES[difficulty]] * size
+    monsters = get_realm(realms[realm]).by_cr
+    party = [standard_character(level) for _ in range(size)]
+
+    summaries, group_sizes = [], []
+    for fight_seed in fight_seeds:
+        encounter = generate_encounter(xp_budget, monsters, encounter_rng)
+        if not encounter:
+            continue
+        group_sizes.append(len(encounter))
+        summaries.append(simulate(party, [monster_combatant(monster) for monster in encounter], fights, fight_seed))
+
+    values = {"level": level, "party_size": size, "difficulty": difficulty, "realm": realm,
+              "encounters": len(summaries)}
+    if summaries:
+        won = np.concatenate([results.won for results in summaries])
+        rounds = np.concatenate([results.rounds for results in summaries])
+        hp_lost = np.concatenate([results.party_hp_lost for results in summaries])
+        party_down = np.concatenate([results.party_down for results in summaries])
+        values.update(monsters_mean=np.mean(group_sizes), win_rate=won.mean(), rounds_mean=rounds.mean(),
+                      hp_lost_mean=hp_lost.mean(), hp_lost_p90=np.percentile(hp_lost, 90),
+                      party_down_mean=party_down.mean())
+    else:
+        values.update(monsters_mean=0, win_rate=np.nan, rounds_mean=np.nan, hp_lost_mean=np.nan,
+                      hp_lost_p90=np.nan, party_down_mean=np.nan)
+    return cell_index, values
+
+
+def open_results(out_dir, meta):
+    """ Column memmaps for a sweep, created, or reopened when `meta` matches the sweep already there. """
+    meta_path = os.path.join(out_dir, META_FILE)
+    cells = meta["cells"]
+    if os.path.exists(meta_path):
+        with open(meta_path, 'r') as file:
+            existing = json.load(file)
+        if existing != meta:
+            raise ValueError(f"{out_dir} holds a different sweep; use another --out or delete it")
+        return {name: np.load(os.path.join(out_dir, name + ".npy"), mmap_mode='r+') for name in COLUMNS}
+
+    os.makedirs(out_dir, exist_ok=True)
+    columns = {}
+    for name, dtype in COLUMNS.items():
+        column = np.lib.format.open_memmap(os.path.join(out_dir, name + ".npy"), mode='w+', dtype=dtype, shape=(cells,))
+        column[:] = np.nan if np.issubdtype(dtype, np.floating) else 0
+        column.flush()
+        columns[name] = column
+    with open(meta_path, 'w') as file:
+        json.dump(meta, file, indent=4)
+    return columns
+
+
+def write_cell(columns, cell_index, values):
+    for name, value in values.items():
+        columns[name][cell_index] = value
+    for name in values:
+        columns[name].flush()
+    # Only marked done once its values are on disk
+    columns["done"][cell_index] = True
+    columns["done"].flush()
+
+
+def run_sweep(out_dir=DEFAULT_OUT, workers=None, seed=0, realms=None, encounters=ENCOUNTERS_PER_CELL,
+              fights=FIGHTS_PER_ENCOUNTER):
+    """ Run (or resume) a sweep and return its columns. """
+    realms = list(realms or realm_names())
+    cells = sweep_cells(realms)
+    meta = {"seed": seed, "realms": realms, "difficulties": list(DIFFICULTIES), "levels": list(LEVELS),
+            "party_sizes": list(PARTY_SIZES), "encounters": encounters, "fights": fights, "cells": len(cells)}
+    columns = open_results(out_dir, meta)
+    pending = np.flatnonzero(~columns["done"]).tolist()
+    print(f"{len(cells) - len(pending)} of {len(cells)} cells already done")
+    if not pending:
+        return columns
+
+    # Parse everything the workers read before forking them
+    json_data("difficulty_thresholds")
+    for realm in realms:
+        get_realm(realm)
+    context = multiprocessing.get_context("fork") if "fork" in multiprocessing.get_all_start_methods() else None
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        futures = [executor.submit(run_cell, i, cells[i], realms, seed, encounters, fights) for i in pending]
+        for finished, future in enumerate(as_completed(futures), 1):
+            cell_index, values = future.result()
+            write_cell(columns, cell_index, values)
+            if finished % 100 == 0 or finished == len(futures):
+                print(f"{finished} / {len(futures)} cells")
+    return columns
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulated win rates for every level x party size x difficulty x realm.")
+    parser.add_argument("--out", default=DEFAULT_OUT, help="results directory, resumed if it exists")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes, one per CPU by default")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--realms", nargs="+", default=None, help="realm names, every realms/*.json by default")
+    parser.add_argument("--encounters", type=int, default=ENCOUNTERS_PER_CELL, help="encounters per cell")
+    parser.add_argument("--fights", type=int, default=FIGHTS_PER_ENCOUNTER, help="fights per encounter")
+    args = parser.parse_args()
+
+    columns = run_sweep(args.out, args.workers, args.seed, args.realms, args.encounters, args.fights)
+    for difficulty, name in enumerate(DIFFICULTIES):
+        rows = columns["difficulty"] == difficulty
+        print(f"{name:>8}: win rate {np.nanmean(columns['win_rate'][rows]):.1%}, "
+              f"{np.nanmean(columns['hp_lost_mean'][rows]):.0%} HP lost")
+
+
+if __name__ == "__main__":
+    main()
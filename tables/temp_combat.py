@@ -1,15 +1,30 @@
 # /tables/temp_combat.py
+import os
+import re
 import sqlite3
 import json
-import random
+import sys
 
-# Connect to the database
-conn = sqlite3.connect('game_database.db')
-cursor = conn.cursor()
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from utils.dice import stream
+
+DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'game_database.db')
+DAMAGE_PATTERN = re.compile(r"^\s*(\d*)\s*d\s*(\d+)\s*(?:([+-])\s*(\d+))?\s*$")
+
+# Opened on first use, so importing this module doesn't create or lock the database
+_conn = None
+
+def get_connection():
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(DB_PATH)
+    return _conn
 
 # Function to add a combatant
 def add_combatant(name, type, ac, hitpoints, conditions, attack_data):
-    cursor.execute('''
+    conn = get_connection()
+    conn.execute('''
         INSERT INTO combatants (name, type, ac, hitpoints, conditions, attack_data)
         VALUES (?, ?, ?, ?, ?, ?)
     ''', (name, type, ac, hitpoints, json.dumps(conditions), json.dumps(attack_data)))
@@ -17,8 +32,7 @@ def add_combatant(name, type, ac, hitpoints, conditions, attack_data):
 
 # Function to fetch combatant data by ID
 def get_combatant_data(combatant_id):
-    cursor.execute("SELECT * FROM combatants WHERE id=?", (combatant_id,))
-    row = cursor.fetchone()
+    row = get_connection().execute("SELECT * FROM combatants WHERE id=?", (combatant_id,)).fetchone()
     if row:
         return {
             "id": row[0],
@@ -27,13 +41,15 @@ def get_combatant_data(combatant_id):
             "ac": row[3],
             "hitpoints": row[4],
             "conditions": json.loads(row[5]),
-            "attack_data": json.loads(row[6])
+            "attack_data": json.loads(row[6]),
+            "attacks": compile_attacks(json.loads(row[6]), json.loads(row[5]))
         }
     return None
 
 # Function to update combatant conditions and hitpoints
 def update_combatant_status(combatant_id, hitpoints, conditions):
-    cursor.execute('''
+    conn = get_connection()
+    conn.execute('''
         UPDATE combatants
         SET hitpoints = ?, conditions = ?
         WHERE id = ?
@@ -42,8 +58,7 @@ def update_combatant_status(combatant_id, hitpoints, conditions):
 
 # Function to fetch monster data by ID
 def get_monster_data(monster_id):
-    cursor.execute("SELECT * FROM monsters WHERE id=?", (monster_id,))
-    row = cursor.fetchone()
+    row = get_connection().execute("SELECT * FROM monsters WHERE id=?", (monster_id,)).fetchone()
     if row:
         return {
             "id": row[0],
@@ -61,8 +76,7 @@ def get_monster_data(monster_id):
 
 # Function to fetch character data by ID
 def get_character_data(character_id):
-    cursor.execute("SELECT * FROM characters WHERE id=?", (character_id,))
-    row = cursor.fetchone()
+    row = get_connection().execute("SELECT * FROM characters WHERE id=?", (character_id,)).fetchone()
     if row:
         return {
             "id": row[0],
@@ -75,21 +89,74 @@ def get_character_data(character_id):
 
 # Function to update character status
 def update_character_status(character_id, new_status):
-    cursor.execute("UPDATE characters SET active=? WHERE id=?", (new_status, character_id))
+    conn = get_connection()
+    conn.execute("UPDATE characters SET active=? WHERE id=?", (new_status, character_id))
     conn.commit()
 
 # Function to simulate a d20 roll
 def roll_d20():
-    return random.randint(1, 20)
+    return int(stream("combat").rng.integers(1, 21))
+
+# Function to roll damage dice
+def roll_damage(num_dice, dice_type, bonus):
+    return int(stream("combat").rng.integers(1, dice_type + 1, num_dice).sum()) + bonus
 
 # Function to parse attack bonus
 def parse_bonus(bonus_str):
-    return int(bonus_str.strip('+'))
+    return int(str(bonus_str).strip())
 
-# Function to parse damage
+# Function to parse damage: "2d6+3", "1d4 + 2 ", "1d8", "d6" or a flat "5"
 def parse_damage(damage_str):
-    num_dice, dice_type, bonus = damage_str.split('d')[0], damage_str.split('d')[1].split()[0], damage_str.split('+')[1].strip()
-    return int(num_dice), int(dice_type), int(bonus)
+    damage_str = str(damage_str)
+    match = DAMAGE_PATTERN.match(damage_str)
+    if match:
+        num_dice, dice_type, sign, bonus = match.groups()
+        bonus = int(bonus or 0)
+        return int(num_dice or 1), int(dice_type), -bonus if sign == '-' else bonus
+    if damage_str.strip().lstrip('+-').isdigit():
+        return 0, 1, int(damage_str)
+    raise ValueError(f"Could not parse damage '{damage_str}'")
+
+# Function to get the lowest natural roll that crits for an attacker
+def crit_range(attacker_conditions):
+    if 'improved critical 18' in attacker_conditions:
+        return 18
+    if 'improved critical 19' in attacker_conditions:
+        return 19
+    return 20
+
+class CompiledRider:
+    """ The saving throw an attack forces on a hit, with its failure effect resolved up front. """
+    __slots__ = ("effect", "save_type", "dc", "failure_effect", "additional_attack")
+
+    def __init__(self, special):
+        saving_throw = special['saving_throw']
+        failure = saving_throw['failure']
+        self.effect = special['effect']
+        self.save_type = saving_throw['type'].lower() + '_save'
+        self.dc = int(saving_throw['DC'])
+        self.failure_effect = failure['effect']
+        self.additional_attack = None
+        if 'additional_attack' in failure:
+            additional_attack = failure['additional_attack']
+            self.additional_attack = CompiledAttack(additional_attack, advantage=additional_attack.get('advantage', False))
+
+class CompiledAttack:
+    """ An attack parsed once at load: integer to-hit, damage dice, crit range and rider. """
+    __slots__ = ("name", "tohit", "num_dice", "dice_type", "bonus", "crit_range", "advantage", "rider")
+
+    def __init__(self, attack, crit_range=20, advantage=False):
+        self.name = attack.get('name', 'Attack')
+        self.tohit = parse_bonus(attack['tohit'])
+        self.num_dice, self.dice_type, self.bonus = parse_damage(attack['damage'])
+        self.crit_range = crit_range
+        self.advantage = advantage
+        special = attack.get('special')
+        self.rider = CompiledRider(special) if special and special.get('condition') else None
+
+# Function to compile a combatant's attacks once, when it is loaded
+def compile_attacks(attack_data, attacker_conditions=()):
+    return [CompiledAttack(attack, crit_range(attacker_conditions)) for attack in attack_data]
 
 # Function to determine if an attack has advantage, disadvantage, or neither
 def determine_attack_roll(condition_tracker):
@@ -114,103 +181,89 @@ def apply_pre_attack_conditions(attacker_conditions, defender_conditions):
     return condition_tracker
 
 # Function to handle post-attack conditions
-def apply_post_attack_conditions(attack, target_saves, condition_tracker, target_hitpoints):
-    if 'special' in attack:
-        special = attack['special']
-        if special['condition']:
-            print(f"Special Effect: {special['effect']}")
-            saving_throw = special['saving_throw']
-            save_type = saving_throw['type'].lower() + '_save'
-            save_dc = saving_throw['DC']
-            if save_type in target_saves:
-                save_roll = roll_d20() + target_saves[save_type]
-                if save_roll < save_dc:
-                    print(f"Saving throw failed! Target {saving_throw['failure']['effect']}.")
-                    condition_tracker.append(saving_throw['failure']['effect'])
-                    if 'additional_attack' in saving_throw['failure']:
-                        additional_attack = saving_throw['failure']['additional_attack']
-                        additional_hit = roll_d20()
-                        if additional_attack.get('advantage', False):
-                            additional_hit = determine_attack_roll(['advantage'])
-                        if additional_hit + parse_bonus(additional_attack['tohit']) >= target_ac:
-                            print(f"Additional attack hits! Roll: {additional_hit}")
-                            num_dice, dice_type, bonus = parse_damage(additional_attack['damage'])
-                            damage = sum(random.randint(1, dice_type) for _ in range(num_dice)) + bonus
-                            print(f"Additional Damage: {damage}")
-                            target_hitpoints -= damage
+def apply_post_attack_conditions(attack, target_saves, condition_tracker, target_hitpoints, target_ac):
+    rider = attack.rider
+    if rider is not None:
+        print(f"Special Effect: {rider.effect}")
+        if rider.save_type in target_saves:
+            save_roll = roll_d20() + target_saves[rider.save_type]
+            if save_roll < rider.dc:
+                print(f"Saving throw failed! Target {rider.failure_effect}.")
+                condition_tracker.append(rider.failure_effect)
+                additional_attack = rider.additional_attack
+                if additional_attack is not None:
+                    additional_hit = determine_attack_roll(['advantage'] if additional_attack.advantage else [])
+                    if additional_hit + additional_attack.tohit >= target_ac:
+                        print(f"Additional attack hits! Roll: {additional_hit}")
+                        damage = roll_damage(additional_attack.num_dice, additional_attack.dice_type, additional_attack.bonus)
+                        print(f"Additional Damage: {damage}")
+                        target_hitpoints -= damage
     return target_hitpoints
 
-# Function to resolve an attack with critical hits
+# Function to resolve a compiled attack with critical hits; the attacker's
+# current conditions can widen the crit range compiled at load
 def resolve_attack(attack, target_ac, target_hitpoints, target_saves, attacker_conditions, defender_conditions):
     condition_tracker = apply_pre_attack_conditions(attacker_conditions, defender_conditions)
-    tohit = parse_bonus(attack['tohit'])
     roll = determine_attack_roll(condition_tracker)
-    is_critical = False
-
-    # Check for critical hit
-    if roll == 20:
-        is_critical = True
-    elif roll >= 19 and 'improved critical 19' in attacker_conditions:
-        is_critical = True
-    elif roll >= 18 and 'improved critical 18' in attacker_conditions:
-        is_critical = True
+    is_critical = roll >= min(attack.crit_range, crit_range(attacker_conditions))
 
-    if roll + tohit >= target_ac:
-        print(f"Attack {attack['name']} hits!")
-        num_dice, dice_type, bonus = parse_damage(attack['damage'])
+    if roll + attack.tohit >= target_ac:
+        print(f"Attack {attack.name} hits!")
+        num_dice = attack.num_dice
 
         # Double the dice for critical hit
         if is_critical:
             num_dice *= 2
-            print(f"Critical hit! Rolling {num_dice}d{dice_type} for damage.")
+            print(f"Critical hit! Rolling {num_dice}d{attack.dice_type} for damage.")
 
-        damage = sum(random.randint(1, dice_type) for _ in range(num_dice)) + bonus
+        damage = roll_damage(num_dice, attack.dice_type, attack.bonus)
         print(f"Damage: {damage}")
         target_hitpoints -= damage
-        target_hitpoints = apply_post_attack_conditions(attack, target_saves, condition_tracker, target_hitpoints)
+        target_hitpoints = apply_post_attack_conditions(attack, target_saves, condition_tracker, target_hitpoints, target_ac)
     else:
-        print(f"Attack {attack['name']} misses.")
+        print(f"Attack {attack.name} misses.")
     return target_hitpoints, condition_tracker
 
 
-# Example usage
-monster_id = 30
-character_id = 1
-
-# Assuming combatants table already exists and is being used here
-# Fetch monster and character data
-monster_data = get_monster_data(monster_id)
-character_data = get_character_data(character_id)
-
-if monster_data and character_data:
-    # Add combatants to the combatants table
-    add_combatant(monster_data['name'], 'monster', monster_data['AC'], monster_data['hitpoints'], [], monster_data['attacks'])
-    add_combatant(character_data['name'], 'character', character_data['AC'], character_data['hitpoints'], [], [])
-
-    # Fetch combatant data
-    monster_combatant = get_combatant_data(1)  # Assuming monster is the first entry
-    character_combatant = get_combatant_data(2)  # Assuming character is the second entry
-
-    target_ac = character_combatant['ac']
-    target_hitpoints = character_combatant['hitpoints']
-    target_saves = character_data['saves']
-    attacker_conditions = []  # Add actual conditions from the attacker's state
-    defender_conditions = character_combatant['conditions']
-
-    print(f"Character {character_combatant['name']} AC: {target_ac}, HP: {target_hitpoints}")
-    for attack in monster_combatant['attack_data']:
-        target_hitpoints, new_conditions = resolve_attack(attack, target_ac, target_hitpoints, target_saves, attacker_conditions, defender_conditions)
-        defender_conditions.extend(new_conditions)
-        update_combatant_status(character_combatant['id'], target_hitpoints, defender_conditions)
-        print(f"Remaining Hitpoints: {target_hitpoints}")
-        if target_hitpoints <= 0:
-            print(f"Character {character_combatant['name']} has been killed.")
-            update_character_status(character_id, "dead")
-            break
-
-    print("Current Conditions:", defender_conditions)
-else:
-    print("Failed to retrieve monster or character data.")
-
-# Close the database connection
-conn.close()
+if __name__ == "__main__":
+    # Example usage
+    monster_id = 30
+    character_id = 1
+
+    # Assuming combatants table already exists and is being used here
+    # Fetch monster and character data
+    monster_data = get_monster_data(monster_id)
+    character_data = get_character_data(character_id)
+
+    if monster_data and character_data:
+        # Add combatants to the combatants table
+        add_combatant(monster_data['name'], 'monster', monster_data['AC'], monster_data['hitpoints'], [], monster_data['attacks'])
+        add_combatant(character_data['name'], 'character', character_data['AC'], character_data['hitpoints'], [], [])
+
+        # Fetch combatant data
+        monster_combatant = get_combatant_data(1)  # Assuming monster is the first entry
+        character_combatant = get_combatant_data(2)  # Assuming character is the second entry
+
+        target_ac = character_combatant['ac']
+        target_hitpoints = character_combatant['hitpoints']
+        target_saves = character_data['saves']
+        attacker_conditions = []  # Add actual conditions from the attacker's state
+        defender_conditions = character_combatant['conditions']
+
+        print(f"Character {character_combatant['name']} AC: {target_ac}, HP: {target_hitpoints}")
+        for attack in monster_combatant['attacks']:
+            target_hitpoints, new_conditions = resolve_attack(attack, target_ac, target_hitpoints, target_saves, attacker_conditions, defender_conditions)
+            defender_conditions.extend(new_conditions)
+            update_combatant_status(character_combatant['id'], target_hitpoints, defender_conditions)
+            print(f"Remaining Hitpoints: {target_hitpoints}")
+            if target_hitpoints <= 0:
+                print(f"Character {character_combatant['name']} has been killed.")
+                update_character_status(character_id, "dead")
+                break
+
+        print("Current Conditions:", defender_conditions)
+    else:
+        print("Failed to retrieve monster or character data.")
+
+    # Close the database connection
+    get_connection().close()
@@ -1,55 +1,54 @@
-import random
-import json
+import os
+
+import numpy as np
+
+from utils.dice import stream
+from utils.old.encounter_generation import challenge_rating_list, get_xp_from_cr
+from utils.realm_repository import repository
+
+script_dir = os.path.abspath(os.path.dirname(__file__))
+data_dir = os.path.join(script_dir, "data")
 
 # Load your data
-with open('monstersByCR.json') as f:
-    monsters_by_cr = json.load(f)
-
-with open('featuresList.json') as f:
-    features_list_data = json.load(f)
-
-# Constants
-terrain_distance_map = {
-    'desert': lambda: roll_dice(6, 6) * 10,
-    'arctic': lambda: roll_dice(6, 6) * 10,
-    'forest': lambda: roll_dice(2, 8) * 10,
-    'hills': lambda: roll_dice(2, 10) * 10,
-    'mountains': lambda: roll_dice(4, 10) * 10,
-    'jungle': lambda: roll_dice(2, 6) * 10,
-}
-
-difficulty_thresholds = [
-    {"level": 1, "easy": 25, "medium": 50, "hard": 75, "deadly": 100},
-    # Add remaining levels...
-]
-
-challenge_rating_list = [
-    {"cr": "0", "xp": 10},
-    {"cr": "1/8", "xp": 25},
-    {"cr": "1/4", "xp": 50},
-    {"cr": "1/2", "xp": 100},
-    {"cr": "1", "xp": 200},
-    # Add remaining challenge ratings...
-]
-
-features_list = features_list_data['featuresList']
+monsters_by_cr = repository.monsters_by_cr()
+# (terrain, realm) -> candidate monsters by CR, so filtering only looks at monsters that can appear
+monster_index = repository.terrain_realm_index()
+
+FACTION_INCLUSION = 0.75
+DIFFICULTIES = ["easy", "medium", "hard", "deadly"]
+DIFFICULTY_WEIGHTS = [0.14, 0.68, 0.13, 0.05]
+# Every draw comes from the encounter stream, so seed_streams replays encounters too
+dice = stream("encounter")
+
+# Tables shared with utils.encounter_batch, so both generators give the same
+# budgets and monster picks for the same inputs
+def load_data(name):
+    return repository.load_json(os.path.join(data_dir, name + '.json'))
+
+terrain_distance_map = load_data('terrain_distance_map')
+difficulty_thresholds = load_data('difficulty_thresholds')
+light_levels = load_data('light_levels')
+features_list = load_data('features_list')['featuresList']
 
 # Functions
 def roll_dice(number, sides):
-    return sum(random.randint(1, sides) for _ in range(number))
+    return dice.roll(number, sides)
+
+def choose(items):
+    return items[int(dice.rng.random() * len(items))]
 
 def generate_random_feature(encounter_distance):
-    random_feature = random.choice(features_list)
-    distance_modifier = random.uniform(-0.5, 1.5)
+    random_feature = choose(features_list)
+    distance_modifier = dice.rng.uniform(-0.5, 1.5)
     distance = encounter_distance * distance_modifier
     
-    size_modifier = random.uniform(0.05, 2)
+    size_modifier = dice.rng.uniform(0.05, 2)
     area = encounter_distance * size_modifier
     if 'areaModifier' in random_feature:
         area *= random_feature['areaModifier']
     
     height_modifier = random_feature.get('heightModifier', 1)
-    height_fraction = random.uniform(0.1, 1)
+    height_fraction = dice.rng.uniform(0.1, 1)
     height = encounter_distance * height_fraction * height_modifier
     
     return {
@@ -60,7 +59,10 @@ def generate_random_feature(encounter_distance):
     }
 
 def generate_encounter_distance(terrain):
-    return terrain_distance_map.get(terrain, lambda: 0)()
+    distance = terrain_distance_map.get(terrain)
+    if distance is None:
+        return 0
+    return roll_dice(*distance['dice']) * distance['multiplier']
 
 def generate_wind():
     roll = roll_dice(1, 20)
@@ -79,29 +81,19 @@ def generate_precipitation():
     return 'strong rain or snow (¾ cover over 100ft)'
 
 def generate_light_level():
-    roll = roll_dice(1, 11)
-    light_levels = [
-        'Dawn, dim', 'Dawn, bright', 'Morning, overcast', 'Morning, clear unless precipitation',
-        'Midday or night if travelling at night', 'Afternoon, overcast', 'Afternoon clear unless precipitation',
-        'Dusk, bright', 'Dusk, dim', 'Night, moonlight', 'Night, dark'
-    ]
+    roll = roll_dice(1, len(light_levels))
     return light_levels[roll - 1]
 
-def filter_monsters_by_terrain_and_faction(monsters_by_cr, terrain, faction):
-    filtered_monsters_by_cr = {}
-    for cr, monsters in monsters_by_cr.items():
-        filtered_monsters = [
-            monster for monster in monsters
-            if terrain in monster['terrain'] and (random.random() <= 0.75 and faction in monster['faction'])
-        ]
-        if filtered_monsters:
-            filtered_monsters_by_cr[cr] = filtered_monsters
-    return filtered_monsters_by_cr
+def filter_monsters_by_terrain_and_faction(monster_index, terrain, faction):
+    # Each monster of the terrain and realm ("faction" here) makes the list 75% of the time
+    return monster_index.sample(terrain, faction, FACTION_INCLUSION, dice.rng)
 
 def find_highest_cr(xp_budget, challenge_rating_list, filtered_monsters_by_cr):
+    # The CR list mixes "1/8" strings and integers; monsters_by_cr keys are all strings
     for cr_info in reversed(challenge_rating_list):
-        if cr_info['xp'] <= xp_budget and cr_info['cr'] in filtered_monsters_by_cr:
-            return cr_info['cr']
+        cr = str(cr_info['cr'])
+        if cr_info['xp'] <= xp_budget and cr in filtered_monsters_by_cr:
+            return cr
     return 0
 
 def generate_encounter(xp_budget, challenge_rating_list, filtered_monsters_by_cr):
@@ -110,26 +102,24 @@ def generate_encounter(xp_budget, challenge_rating_list, filtered_monsters_by_cr
     def add_to_encounter(monster, cr):
         encounter.append(monster)
         nonlocal xp_budget
-        xp_budget -= next(cr_item['xp'] for cr_item in challenge_rating_list if cr_item['cr'] == cr)
+        xp_budget -= get_xp_from_cr(cr)
 
-    method = random.choices(
-        [1, 2, 3, 4], 
-        [0.75, 0.5 if xp_budget >= 600 else 0, 0.25 if xp_budget >= 3000 else 0, 1]
-    )[0]
+    weights = np.array([0.75, 0.5 if xp_budget >= 600 else 0, 0.25 if xp_budget >= 3000 else 0, 1])
+    method = int(dice.rng.choice([1, 2, 3, 4], p=weights / weights.sum()))
 
     if method == 1:
         cr = find_highest_cr(xp_budget, challenge_rating_list, filtered_monsters_by_cr)
         if cr in filtered_monsters_by_cr:
-            selected_monster = random.choice(filtered_monsters_by_cr[cr])
+            selected_monster = choose(filtered_monsters_by_cr[cr])
             add_to_encounter(selected_monster, cr)
-            xp_budget *= random.uniform(0.5, 1)
+            xp_budget *= dice.rng.uniform(0.5, 1)
 
     elif method == 2:
         pair_budget = xp_budget / 3
         for _ in range(2):
             cr = find_highest_cr(pair_budget, challenge_rating_list, filtered_monsters_by_cr)
             if cr in filtered_monsters_by_cr:
-                selected_monster = random.choice(filtered_monsters_by_cr[cr])
+                selected_monster = choose(filtered_monsters_by_cr[cr])
                 add_to_encounter(selected_monster, cr)
 
     elif method == 3:
@@ -137,8 +127,8 @@ def generate_encounter(xp_budget, challenge_rating_list, filtered_monsters_by_cr
         for _ in range(2):
             cr = find_highest_cr(minion_budget, challenge_rating_list, filtered_monsters_by_cr)
             if cr in filtered_monsters_by_cr:
-                selected_monster = random.choice(filtered_monsters_by_cr[cr])
-                for _ in range(random.randint(1, 6)):
+                selected_monster = choose(filtered_monsters_by_cr[cr])
+                for _ in range(dice.rng.integers(1, 7)):
                     add_to_encounter(selected_monster, cr)
 
     elif method == 4:
@@ -146,8 +136,8 @@ def generate_encounter(xp_budget, challenge_rating_list, filtered_monsters_by_cr
         for _ in range(3):
             cr = find_highest_cr(swarm_budget, challenge_rating_list, filtered_monsters_by_cr)
             if cr in filtered_monsters_by_cr:
-                selected_monster = random.choice(filtered_monsters_by_cr[cr])
-                for _ in range(random.randint(1, 10)):
+                selected_monster = choose(filtered_monsters_by_cr[cr])
+                for _ in range(dice.rng.integers(1, 11)):
                     add_to_encounter(selected_monster, cr)
 
     return encounter
@@ -157,10 +147,10 @@ def get_party_xp_threshold(party_size, party_level, difficulty_thresholds, diffi
 
 # Main function for generating encounters
 def generate_encounter_data(party_size, party_level, difficulty, terrain, faction):
-    filtered_monsters_by_cr = filter_monsters_by_terrain_and_faction(monsters_by_cr, terrain, faction)
+    filtered_monsters_by_cr = filter_monsters_by_terrain_and_faction(monster_index, terrain, faction)
     
     if difficulty == "random":
-        difficulty = random.choices(["easy", "medium", "hard", "deadly"], [0.14, 0.68, 0.13, 0.05])[0]
+        difficulty = DIFFICULTIES[dice.rng.choice(len(DIFFICULTIES), p=DIFFICULTY_WEIGHTS)]
 
     xp_budget = get_party_xp_threshold(party_size, party_level, difficulty_thresholds, difficulty)
     encounter = generate_encounter(xp_budget, challenge_rating_list, filtered_monsters_by_cr)
@@ -179,12 +169,13 @@ def generate_encounter_data(party_size, party_level, difficulty, terrain, factio
         "generated_features": generated_features,
     }
 
-# Example usage
-party_size = 2
-party_level = 1
-difficulty = "random"
-terrain = "forest"
-faction = "Elvish"
+if __name__ == "__main__":
+    # Example usage
+    party_size = 2
+    party_level = 1
+    difficulty = "random"
+    terrain = "arctic"
+    faction = "Dungeon"
 
-encounter_data = generate_encounter_data(party_size, party_level, difficulty, terrain, faction)
-print(encounter_data)
+    encounter_data = generate_encounter_data(party_size, party_level, difficulty, terrain, faction)
+    print(encounter_data)
@@ -0,0 +1,52 @@
+# utils/camera.py
+# View transform for the map screens.
+#
+# World coordinates are map pixels at zoom 1 (hx.axial_to_pixel with the
+# screen's hex radius). The camera keeps the world point shown in the middle
+# of the viewport and a zoom picked from a fixed list of levels, so rendered
+# tiles can be cached per level.
+
+import numpy as np
+
+ZOOM_LEVELS = (0.0625, 0.125, 0.25, 0.5, 1.0, 2.0)
+
+
+class Camera:
+    def __init__(self, viewport_size, position=(0, 0), zoom=1.0, zoom_levels=ZOOM_LEVELS):
+        self.size = np.array(viewport_size, dtype=float)
+        self.half_size = self.size / 2
+        self.position = np.array(position, dtype=float)  # world point at the centre of the viewport
+        self.zoom_levels = zoom_levels
+        self.zoom_index = zoom_levels.index(zoom)
+
+    @property
+    def zoom(self):
+        return self.zoom_levels[self.zoom_index]
+
+    def pan(self, dx, dy):
+        """ Move the view by a distance in screen pixels. """
+        self.position += np.array((dx, dy), dtype=float) / self.zoom
+
+    def zoom_by(self, steps, anchor=None):
+        """ Step through the zoom levels, keeping the world point under `anchor` (screen pixels) in place. """
+        zoom_index = min(max(self.zoom_index + steps, 0), len(self.zoom_levels) - 1)
+        if zoom_index == self.zoom_index:
+            return False
+        anchor = self.half_size if anchor is None else np.asarray(anchor, dtype=float)
+        world = self.screen_to_world(anchor)
+        self.zoom_index = zoom_index
+        self.position = world - (anchor - self.half_size) / self.zoom
+        return True
+
+    def screen_to_world(self, points):
+        return (np.asarray(points, dtype=float) - self.half_size) / self.zoom + self.position
+
+    def world_to_screen(self, points):
+        return (np.asarray(points, dtype=float) - self.position) * self.zoom + self.half_size
+
+    def world_rect(self, margin=0):
+        """ (x_min, y_min, x_max, y_max) of the world on screen, grown by `margin` screen pixels. """
+        half = (self.half_size + margin) / self.zoom
+        x_min, y_min = self.position - half
+        x_max, y_max = self.position + half
+        return x_min, y_min, x_max, y_max
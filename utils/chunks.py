@@ -0,0 +1,145 @@
+# utils/chunks.py
+# Chunked, unbounded overland worlds.
+#
+# The world is cut into CHUNK_SIZE x CHUNK_SIZE parallelograms of axial
+# coordinates. A chunk is generated from (world seed, chunk key) the first
+# time it is asked for, saved to its own file in the world directory, and
+# kept in a bounded LRU so memory follows what is on screen.
+
+import json
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+from utils.dice import stream
+from utils.terrain import TERRAIN_LEGEND, TERRAIN_MODES, generate_map_terrain, terrain_probabilities
+
+CHUNK_SIZE = 32
+CHUNK_CACHE_SIZE = 1024  # 1 KB of terrain codes each; covers a viewport at the smallest zoom
+WORLD_FILE = "world.json"
+
+
+def chunk_key(q, r, chunk_size=CHUNK_SIZE):
+    """ Return the (cq, cr) key of the chunk holding axial hex (q, r). """
+    return int(q) // chunk_size, int(r) // chunk_size
+
+
+def chunk_axial_coordinates(key, chunk_size=CHUNK_SIZE):
+    """ Axial q and r of every hex in a chunk, as (chunk_size, chunk_size) arrays indexed [q, r]. """
+    cq, cr = key
+    span = np.arange(chunk_size)
+    q, r = np.meshgrid(cq * chunk_size + span, cr * chunk_size + span, indexing='ij')
+    return q, r
+
+
+def axial_box_for_pixels(x_min, y_min, x_max, y_max, hex_radius):
+    """ Smallest axial (q_min, q_max, r_min, r_max) box holding every hex that touches a pixel rectangle. """
+    r_min = int(np.floor(y_min / (1.5 * hex_radius))) - 1
+    r_max = int(np.ceil(y_max / (1.5 * hex_radius))) + 1
+    column = np.sqrt(3) * hex_radius
+    q_min = int(np.floor(x_min / column - r_max / 2)) - 1
+    q_max = int(np.ceil(x_max / column - r_min / 2)) + 1
+    return q_min, q_max, r_min, r_max
+
+
+def _zigzag(value):
+    """ Map a signed integer onto the non-negative integers (0, -1, 1, -2 ... -> 0, 1, 2, 3 ...). """
+    return 2 * value if value >= 0 else -2 * value - 1
+
+
+class ChunkedWorld:
+    def __init__(self, world_dir, seed=None, mode="noise", chunk_size=CHUNK_SIZE, cache_size=CHUNK_CACHE_SIZE):
+        self.world_dir = world_dir
+        self.cache_size = cache_size
+        self._chunks = OrderedDict()
+
+        metadata_path = os.path.join(world_dir, WORLD_FILE)
+        if os.path.isfile(metadata_path):
+            # An existing world keeps the settings it was created with
+            with open(metadata_path, 'r') as file:
+                metadata = json.load(file)
+        else:
+            if mode not in TERRAIN_MODES:
+                raise ValueError(f"Unknown terrain mode '{mode}', expected one of {TERRAIN_MODES}")
+            metadata = {
+                "seed": stream("map").new_seed() if seed is None else seed,
+                "mode": mode,
+                "chunk_size": chunk_size,
+                "legend": TERRAIN_LEGEND,
+            }
+            os.makedirs(world_dir, exist_ok=True)
+            with open(metadata_path, 'w') as file:
+                json.dump(metadata, file, indent=4)
+
+        self.seed = metadata["seed"]
+        self.mode = metadata["mode"]
+        self.chunk_size = metadata["chunk_size"]
+        self.legend = metadata["legend"]
+
+    def __len__(self):
+        return len(self._chunks)
+
+    def chunk_path(self, key):
+        return os.path.join(self.world_dir, f"chunk_{key[0]}_{key[1]}.npy")
+
+    def chunk_seed(self, key):
+        """ Independent seed for one chunk, derived from the world seed and the chunk key. """
+        return np.random.SeedSequence(self.seed, spawn_key=(_zigzag(key[0]), _zigzag(key[1])))
+
+    def generate_chunk(self, key):
+        q, r = chunk_axial_coordinates(key, self.chunk_size)
+        cube = np.column_stack((q.ravel(), -q.ravel() - r.ravel(), r.ravel()))
+        # Noise terrain is a function of absolute coordinates so chunks line up
+        # with their neighbours; random terrain only needs an independent stream
+        seed = self.chunk_seed(key) if self.mode == "random" else self.seed
+        terrain = generate_map_terrain(cube, seed, self.mode, terrain_probabilities, self.legend)
+        return terrain.reshape(self.chunk_size, self.chunk_size)
+
+    def save_chunk(self, key, terrain):
+        path = self.chunk_path(key)
+        temp_path = path + ".tmp"
+        with open(temp_path, 'wb') as file:
+            np.save(file, terrain)
+        os.replace(temp_path, path)
+
+    def get_chunk(self, key):
+        """ Terrain codes for a chunk, indexed [q, r] relative to the chunk origin. """
+        key = (int(key[0]), int(key[1]))
+        if key in self._chunks:
+            self._chunks.move_to_end(key)
+            return self._chunks[key]
+
+        path = self.chunk_path(key)
+        if os.path.isfile(path):
+            terrain = np.load(path)
+        else:
+            terrain = self.generate_chunk(key)
+            self.save_chunk(key, terrain)
+
+        self._chunks[key] = terrain
+        while len(self._chunks) > self.cache_size:
+            self._chunks.popitem(last=False)
+        return terrain
+
+    def terrain_at(self, q, r):
+        key = chunk_key(q, r, self.chunk_size)
+        return self.get_chunk(key)[int(q) - key[0] * self.chunk_size, int(r) - key[1] * self.chunk_size]
+
+    def window(self, q_min, q_max, r_min, r_max):
+        """ Axial q, r and terrain code arrays for every hex in an inclusive axial box. """
+        size = self.chunk_size
+        qs, rs, codes = [], [], []
+        for cq in range(q_min // size, q_max // size + 1):
+            # The part of each chunk inside the box is a slice of it
+            q_start = max(q_min, cq * size)
+            q_stop = min(q_max + 1, (cq + 1) * size)
+            for cr in range(r_min // size, r_max // size + 1):
+                r_start = max(r_min, cr * size)
+                r_stop = min(r_max + 1, (cr + 1) * size)
+                terrain = self.get_chunk((cq, cr))
+                q, r = np.meshgrid(np.arange(q_start, q_stop), np.arange(r_start, r_stop), indexing='ij')
+                qs.append(q.ravel())
+                rs.append(r.ravel())
+                codes.append(terrain[q_start - cq * size:q_stop - cq * size, r_start - cr * size:r_stop - cr * size].ravel())
+        return np.concatenate(qs), np.concatenate(rs), np.concatenate(codes)
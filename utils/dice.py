@@ -1,4 +1,353 @@
+# utils/dice.py
+# Dice rolls, and exact distributions of dice expressions.
+#
+# roll_dice rolls once. For balance questions, an expression such as "2d6+3"
+# is turned into its exact probability mass function by convolving the PMFs
+# of its dice, so means, variances and odds like "at least 13 damage" are
+# computed instead of estimated from many rolls. Distributions are cached
+# per normalized expression and sampled from directly when rolls are needed.
+#
+# Bulk rolls go through a Roller, which wraps a numpy.random.Generator and
+# rolls whole batches in one call. Each subsystem (map, encounter, combat,
+# chargen) has its own named stream, all spawned from one root SeedSequence:
+# seeding the root makes a run reproducible, and each stream's draws do not
+# depend on how much the others have rolled.
+
 import random
+import re
+from functools import lru_cache
+
+import numpy as np
+
+CACHE_SIZE = 512
+SUBSYSTEMS = ("map", "encounter", "combat", "chargen")
+MAX_EXPLOSIONS = 100  # rerolls per exploding die; reaching it on a d6 takes 1 in 6**100 odds
+TERM = re.compile(r"([+-])(\d*)d(\d+)|([+-])(\d+)")
+CHECK = re.compile(r"^(.*?)\s+vs\.?\s+(?:ac|dc)?\s*(-?\d+)$")
+
 
 def roll_dice(number, sides):
     return sum(random.randint(1, sides) for _ in range(number))
+
+
+def _read_only(array):
+    array.flags.writeable = False
+    return array
+
+
+class Distribution:
+    """ Exact distribution of an integer roll: P(X = offset + i) = pmf[i]. """
+
+    __slots__ = ("offset", "pmf", "_cumulative")
+
+    def __init__(self, offset, pmf):
+        self.offset = int(offset)
+        self.pmf = _read_only(np.asarray(pmf, dtype=float))
+        self._cumulative = None
+
+    @staticmethod
+    def constant(value):
+        return Distribution(value, [1.0])
+
+    @property
+    def values(self):
+        return np.arange(self.offset, self.offset + len(self.pmf))
+
+    @property
+    def min(self):
+        return self.offset
+
+    @property
+    def max(self):
+        return self.offset + len(self.pmf) - 1
+
+    @property
+    def mean(self):
+        return float(self.values @ self.pmf)
+
+    @property
+    def variance(self):
+        deviation = self.values - self.mean
+        return float((deviation * deviation) @ self.pmf)
+
+    @property
+    def std(self):
+        return self.variance ** 0.5
+
+    @property
+    def cumulative(self):
+        if self._cumulative is None:
+            self._cumulative = _read_only(np.cumsum(self.pmf))
+        return self._cumulative
+
+    def probability(self, value):
+        """ P(X == value). """
+        i = int(value) - self.offset
+        return float(self.pmf[i]) if 0 <= i < len(self.pmf) else 0.0
+
+    def cdf(self, value):
+        """ P(X <= value); `value` may be an array. """
+        i = np.floor(np.asarray(value)).astype(np.int64) - self.offset
+        result = np.where(i >= len(self.pmf), 1.0, self.cumulative[np.clip(i, 0, len(self.pmf) - 1)])
+        result = np.where(i < 0, 0.0, result)
+        return float(result) if result.ndim == 0 else result
+
+    def at_least(self, value):
+        """ P(X >= value). """
+        return 1.0 - self.cdf(np.asarray(value) - 1)
+
+    def sample(self, size=None, rng=None):
+        """ Rolls drawn from the PMF: one binary search per roll instead of one random call per die. """
+        rng = np.random.default_rng() if rng is None else rng
+        cumulative = self.cumulative
+        index = np.searchsorted(cumulative, rng.random(size) * cumulative[-1], side='right')
+        return self.offset + np.minimum(index, len(self.pmf) - 1)
+
+    def __add__(self, other):
+        """ Distribution of X + Y for independent X and Y (or X + a constant). """
+        if isinstance(other, (int, np.integer)):
+            return Distribution(self.offset + other, self.pmf)
+        return Distribution(self.offset + other.offset, np.convolve(self.pmf, other.pmf))
+
+    __radd__ = __add__
+
+    def __neg__(self):
+        return Distribution(-self.max, self.pmf[::-1])
+
+    def __sub__(self, other):
+        return self + (-other)
+
+    def __mul__(self, other):
+        """ Sum of `other` independent rolls of this distribution. """
+        if other < 0:
+            return -(self * -other)
+        result = Distribution.constant(0)
+        power = self
+        while other:
+            if other & 1:
+                result = result + power
+            other >>= 1
+            if other:
+                power = power + power
+        return result
+
+    __rmul__ = __mul__
+
+    def maximum(self, other):
+        """ Distribution of max(X, Y): advantage when Y is a second copy of X. """
+        return self._extreme(other, highest=True)
+
+    def minimum(self, other):
+        """ Distribution of min(X, Y): disadvantage when Y is a second copy of X. """
+        return self._extreme(other, highest=False)
+
+    def _extreme(self, other, highest):
+        offset = min(self.offset, other.offset)
+        values = np.arange(offset, max(self.max, other.max) + 1)
+        if highest:
+            cdf = self.cdf(values) * other.cdf(values)
+        else:
+            cdf = 1.0 - (1.0 - self.cdf(values)) * (1.0 - other.cdf(values))
+        return Distribution(offset, np.diff(cdf, prepend=0.0))
+
+    def mix(self, other, weight):
+        """ X with probability `weight`, otherwise Y. """
+        offset = min(self.offset, other.offset)
+        pmf = np.zeros(max(self.max, other.max) - offset + 1)
+        pmf[self.offset - offset:self.max - offset + 1] += weight * self.pmf
+        pmf[other.offset - offset:other.max - offset + 1] += (1.0 - weight) * other.pmf
+        return Distribution(offset, pmf)
+
+    def __repr__(self):
+        return f"Distribution({self.min}..{self.max}, mean={self.mean:.3f})"
+
+
+def parse(expression):
+    """ "2d6 + 1d4+3" -> (((2, 6), (1, 4)), 3): dice as (count, sides) with counts summed per die, and the constant. """
+    text = re.sub(r"\s+", "", expression.lower())
+    if not text:
+        raise ValueError("Empty dice expression")
+    if text[0] not in "+-":
+        text = "+" + text
+    dice = {}
+    constant = 0
+    position = 0
+    for match in TERM.finditer(text):
+        if match.start() != position:
+            break
+        position = match.end()
+        if match.group(3):
+            sign = -1 if match.group(1) == "-" else 1
+            sides = int(match.group(3))
+            if sides < 1:
+                raise ValueError(f"Dice need at least one side: {expression!r}")
+            dice[sides] = dice.get(sides, 0) + sign * int(match.group(2) or 1)
+        else:
+            constant += int(match.group(5)) * (-1 if match.group(4) == "-" else 1)
+    if position != len(text):
+        raise ValueError(f"Could not parse dice expression {expression!r}")
+    terms = tuple((count, sides) for sides, count in sorted(dice.items(), reverse=True) if count)
+    return terms, constant
+
+
+def normalize(expression):
+    """ Canonical text of an expression, e.g. " 3 + 1d6+1d6" -> "2d6+3". """
+    terms, constant = parse(expression)
+    text = "".join(f"{'-' if count < 0 else '+'}{abs(count)}d{sides}" for count, sides in terms)
+    if constant or not text:
+        text += f"{'-' if constant < 0 else '+'}{abs(constant)}"
+    return text.lstrip("+")
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def dice(count, sides):
+    """ Distribution of the sum of `count` dice with `sides` sides. """
+    if count == 0:
+        return Distribution.constant(0)
+    if count == 1:
+        return Distribution(1, np.full(sides, 1.0 / sides))
+    half = count // 2
+    return dice(half, sides) + dice(count - half, sides)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _distribution(normalized, advantage, disadvantage, crit):
+    terms, constant = parse(normalized)
+    result = Distribution.constant(constant)
+    for count, sides in terms:
+        count *= 2 if crit else 1
+        rolled = dice(abs(count), sides)
+        result = result + (rolled if count > 0 else -rolled)
+    if advantage and not disadvantage:
+        result = result.maximum(result)
+    elif disadvantage and not advantage:
+        result = result.minimum(result)
+    return result
+
+
+def distribution(expression, advantage=False, disadvantage=False, crit=False):
+    """ Exact distribution of a dice expression such as "2d6+3".
+
+    With advantage or disadvantage the whole expression is rolled twice and
+    the higher or lower total kept (both at once cancel out, as in play);
+    crit doubles every die but not the constant. Cached per normalized
+    expression, so "1d6+1d6+3" and "2d6 + 3" share one result.
+    """
+    return _distribution(normalize(expression), bool(advantage), bool(disadvantage), bool(crit))
+
+
+def check_chance(expression, advantage=False, disadvantage=False, crit_range=20):
+    """ Chance that "<roll> vs AC <n>" (or "vs DC <n>", or "vs <n>") meets the target.
+
+    A lone d20 plus modifiers follows the attack rules: a natural 1 always
+    misses and a natural `crit_range` or higher always hits.
+    """
+    match = CHECK.match(expression.strip().lower())
+    if not match:
+        raise ValueError(f"Expected '<roll> vs AC <n>', got {expression!r}")
+    roll, target = match.group(1), int(match.group(2))
+    terms, constant = parse(roll)
+    if terms != ((1, 20),):
+        return float(distribution(roll, advantage, disadvantage).at_least(target))
+
+    d20 = distribution("1d20", advantage, disadvantage)
+    naturals = np.arange(1, 21)
+    hits = (naturals >= crit_range) | ((naturals != 1) & (naturals + constant >= target))
+    return float(d20.pmf[hits].sum())
+
+
+def crit_chance(advantage=False, disadvantage=False, crit_range=20):
+    return float(distribution("1d20", advantage, disadvantage).at_least(crit_range))
+
+
+def attack_damage(attack, damage, advantage=False, disadvantage=False, crit_range=20):
+    """ Damage dealt by one attack such as ("1d20+5 vs AC 13", "2d6+3"), misses counting as 0. """
+    hit = check_chance(attack, advantage, disadvantage, crit_range)
+    if not hit:
+        return Distribution.constant(0)
+    crit = min(crit_chance(advantage, disadvantage, crit_range), hit)
+    on_hit = distribution(damage).mix(distribution(damage, crit=True), 1.0 - crit / hit)
+    dealt = on_hit.mix(Distribution.constant(0), hit)
+    # A penalty can't take damage below zero
+    if dealt.min < 0:
+        pmf = dealt.pmf[-dealt.min:].copy()
+        pmf[0] += dealt.pmf[:-dealt.min].sum()
+        dealt = Distribution(0, pmf)
+    return dealt
+
+
+class Roller:
+    """ Batch dice rolls from one numpy Generator. Like a Generator, not safe to share between threads. """
+
+    __slots__ = ("rng",)
+
+    def __init__(self, seed=None):
+        self.rng = np.random.default_rng(seed)
+
+    def dice(self, n_dice, sides, size=None, explode=False):
+        """ The individual dice: shape `size` + (n_dice,). Exploding dice roll again on their highest face and add it. """
+        shape = (() if size is None else tuple(np.atleast_1d(size))) + (n_dice,)
+        rolls = self.rng.integers(1, sides + 1, shape)
+        if explode and sides > 1:
+            exploding = rolls == sides
+            for _ in range(MAX_EXPLOSIONS):
+                if not exploding.any():
+                    break
+                extra = self.rng.integers(1, sides + 1, np.count_nonzero(exploding))
+                rolls[exploding] += extra
+                exploding[exploding] = extra == sides
+        return rolls
+
+    def roll(self, n_dice, sides, size=None, keep_highest=None, drop_lowest=0, explode=False, bonus=0):
+        """ Totals of `n_dice`d`sides` + bonus: an int, or an array of shape `size`.
+
+        roll(4, 6, size=6, drop_lowest=1) rolls a full set of ability scores;
+        keep_highest=1 on 2d20 is advantage.
+        """
+        keep = n_dice - drop_lowest if keep_highest is None else keep_highest
+        if not 0 <= keep <= n_dice:
+            raise ValueError(f"Can't keep {keep} of {n_dice} dice")
+        rolls = self.dice(n_dice, sides, size, explode)
+        if keep < n_dice:
+            rolls = np.sort(rolls, axis=-1)[..., n_dice - keep:]
+        totals = rolls.sum(axis=-1) + bonus
+        return int(totals) if size is None else totals
+
+    def expression(self, expression, size=None, advantage=False, disadvantage=False, crit=False):
+        """ Rolls of a dice expression such as "2d6+3", drawn from its cached distribution. """
+        rolls = distribution(expression, advantage, disadvantage, crit).sample(size, self.rng)
+        return int(rolls) if size is None else rolls
+
+    def new_seed(self):
+        """ A seed for something that keeps its own, like a world; drawn from this stream so it replays too. """
+        return int(self.rng.integers(2 ** 63))
+
+    def spawn(self, n):
+        """ `n` independent Rollers, e.g. one per worker of a batch job. """
+        return [Roller(child) for child in self.rng.bit_generator.seed_seq.spawn(n)]
+
+
+_root_seed = None
+_streams = {}
+
+
+def seed_streams(entropy=None):
+    """ Reseed every subsystem stream from one root seed; returns the root entropy, which replays the run. """
+    global _root_seed
+    _root_seed = np.random.SeedSequence(entropy)
+    for name, child in zip(SUBSYSTEMS, _root_seed.spawn(len(SUBSYSTEMS))):
+        # Reseeded in place, so modules holding on to a stream's Roller follow along
+        if name in _streams:
+            _streams[name].rng = np.random.default_rng(child)
+        else:
+            _streams[name] = Roller(child)
+    return _root_seed.entropy
+
+
+def stream(name):
+    """ The Roller of a subsystem: "map", "encounter", "combat" or "chargen". """
+    if _root_seed is None:
+        seed_streams()
+    if name not in _streams:
+        raise ValueError(f"Unknown dice stream {name!r}, expected one of {SUBSYSTEMS}")
+    return _streams[name]
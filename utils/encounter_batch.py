@@ -0,0 +1,199 @@
+# utils/encounter_batch.py
+# Vectorized encounter generation for pre-rolling many encounters at once.
+#
+# generate_encounters follows the rules of test_enc.generate_encounter_data
+# (difficulty, XP budget, the four build methods, 75% realm inclusion,
+# distance, weather, light and terrain features), but draws each of them
+# for every encounter in one NumPy pass instead of one random call at a
+# time. Both read the thresholds, CR/XP and distance tables from data/, so
+# they agree on budgets and monster picks at every level. Results are
+# columns, one row per encounter; EncounterBatch.to_dicts turns them into
+# test_enc-style dictionaries when that is more convenient.
+
+import os
+
+import numpy as np
+
+from utils.dice import stream
+from utils.old.encounter_generation import cr_value, cr_xp
+from utils.realm_repository import repository
+
+script_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+data_dir = os.path.join(script_dir, "data")
+
+DIFFICULTIES = ("easy", "medium", "hard", "deadly")
+DIFFICULTY_WEIGHTS = (0.14, 0.68, 0.13, 0.05)
+FACTION_INCLUSION = 0.75  # in quarter steps: drawn as a 0-3 integer per monster
+FEATURES_PER_ENCOUNTER = 3
+MAX_GROUPS = 3  # monster groups of the swarm method
+NO_MONSTER = -1
+CHUNK_SIZE = 8192  # encounters per pass; bounds the (encounters x candidates) scratch arrays
+
+# Build methods: 1 single monster, 2 pair, 3 minions, 4 swarm, as in test_enc.generate_encounter
+METHOD_BUDGET_DIVISOR = np.array([1, 3, 12, 60])
+METHOD_GROUPS = np.array([1, 2, 2, 3])
+METHOD_MAX_COUNT = np.array([1, 1, 6, 10])  # each group has 1..max monsters
+
+WINDS = ('no wind', 'light wind', 'strong wind (Disadvantage on ranged, ¾ cover at long range)')
+PRECIPITATIONS = ('none', 'light rain or snow (½ Cover over 100ft)', 'strong rain or snow (¾ cover over 100ft)')
+
+
+def json_data(name):
+    return repository.load_json(os.path.join(data_dir, name + ".json"))
+
+
+def weather(rolls):
+    """ d20 rolls to 0 (1-12), 1 (13-17) or 2 (18-20). """
+    return (rolls > 12).astype(np.uint8) + (rolls > 17)
+
+
+class EncounterBatch:
+    """ n encounters as columns; monsters are ids into `monsters`, features ids into `features`. """
+
+    def __init__(self, monsters, features, light_levels, **columns):
+        self.monsters = monsters
+        self.features = features
+        self.light_levels = light_levels
+        self.difficulty = columns["difficulty"]  # index into DIFFICULTIES
+        self.xp_budget = columns["xp_budget"]
+        self.method = columns["method"]  # 1-4
+        self.monster_ids = columns["monster_ids"]  # (n, MAX_GROUPS), NO_MONSTER where a group is empty
+        self.monster_counts = columns["monster_counts"]  # (n, MAX_GROUPS)
+        self.encounter_distance = columns["encounter_distance"]
+        self.wind = columns["wind"]  # index into WINDS
+        self.precipitation = columns["precipitation"]  # index into PRECIPITATIONS
+        self.light_level = columns["light_level"]  # index into light_levels
+        self.feature_ids = columns["feature_ids"]  # (n, FEATURES_PER_ENCOUNTER)
+        self.feature_distance = columns["feature_distance"]
+        self.feature_area = columns["feature_area"]
+        self.feature_height = columns["feature_height"]
+
+    def __len__(self):
+        return len(self.xp_budget)
+
+    def to_dicts(self):
+        """ One test_enc-style dictionary per encounter. """
+        encounters = []
+        for i in range(len(self)):
+            encounter = []
+            for monster_id, count in zip(self.monster_ids[i].tolist(), self.monster_counts[i].tolist()):
+                if monster_id != NO_MONSTER:
+                    encounter.extend([self.monsters[monster_id]] * count)
+            features = [{**self.features[feature_id], 'distance': distance, 'area': area, 'height': height}
+                        for feature_id, distance, area, height in zip(
+                            self.feature_ids[i].tolist(), self.feature_distance[i].tolist(),
+                            self.feature_area[i].tolist(), self.feature_height[i].tolist())]
+            encounters.append({
+                "encounter": encounter,
+                "difficulty": DIFFICULTIES[self.difficulty[i]],
+                "xp_budget": int(self.xp_budget[i]),
+                "encounter_distance": int(self.encounter_distance[i]),
+                "wind": WINDS[self.wind[i]],
+                "precipitation": PRECIPITATIONS[self.precipitation[i]],
+                "light_level": self.light_levels[self.light_level[i]],
+                "generated_features": features,
+            })
+        return encounters
+
+
+def pick_monsters(rng, ids, crs, bounds, xp_budget, method):
+    """ Monster id and count per group for each encounter, following test_enc's method rules. """
+    n = len(xp_budget)
+    monster_ids = np.full((n, MAX_GROUPS), NO_MONSTER, dtype=np.int32)
+    monster_counts = np.zeros((n, MAX_GROUPS), dtype=np.int16)
+    if not len(ids):
+        return monster_ids, monster_counts
+
+    # CR runs in XP order; CRs missing from the XP table can never be afforded
+    run_xp = np.array([cr_xp.get(cr_value(cr), np.inf) for cr in crs])
+    order = np.argsort(run_xp, kind='stable')
+    run_xp, starts, ends = run_xp[order], bounds[:-1][order], bounds[1:][order]
+
+    # Which candidates made the 75% cut in each encounter, and how many per CR run
+    kept = rng.integers(0, 4, (n, len(ids)), dtype=np.uint8) < round(FACTION_INCLUSION * 4)
+    kept_before = np.zeros((n, len(ids) + 1), dtype=np.int16)
+    np.cumsum(kept, axis=1, out=kept_before[:, 1:])
+    run_kept = kept_before[:, ends] - kept_before[:, starts]
+
+    # Every group of a method shares one budget, so they all draw from the same (highest affordable) CR
+    group_budget = xp_budget / METHOD_BUDGET_DIVISOR[method - 1]
+    affordable = (run_kept > 0) & (run_xp <= group_budget[:, None])
+    found = affordable.any(axis=1)
+    run = len(run_xp) - 1 - np.argmax(affordable[:, ::-1], axis=1)
+    rows = np.flatnonzero(found)
+    run = run[rows]
+    available = run_kept[rows, run]
+    first = kept_before[rows, starts[run]]
+
+    groups = METHOD_GROUPS[method[rows] - 1]
+    max_count = METHOD_MAX_COUNT[method[rows] - 1]
+    for group in range(MAX_GROUPS):
+        active = group < groups
+        # The j-th kept candidate of the run, j uniform over the kept ones
+        target = first + (rng.random(len(rows)) * available).astype(np.int16) + 1
+        position = (kept_before[rows, 1:] < target[:, None]).sum(axis=1)
+        monster_ids[rows[active], group] = ids[position[active]]
+        monster_counts[rows[active], group] = rng.integers(1, max_count[active] + 1)
+    return monster_ids, monster_counts
+
+
+def generate_encounters(n, party_size, party_level, difficulty, terrain, realm, seed=None):
+    """ Generate `n` encounters in vectorized passes and return them as an EncounterBatch.
+
+    Without a seed the draws come from the "encounter" dice stream.
+    """
+    rng = stream("encounter").rng if seed is None else np.random.default_rng(seed)
+    index = repository.terrain_realm_index()
+    ids, crs, bounds = index.candidates(terrain, realm)
+    thresholds = next(threshold for threshold in json_data("difficulty_thresholds") if threshold['level'] == party_level)
+    features = json_data("features_list")['featuresList']
+    light_levels = json_data("light_levels")
+    distance_dice = json_data("terrain_distance_map").get(terrain)
+
+    if difficulty == "random":
+        difficulty = rng.choice(len(DIFFICULTIES), n, p=DIFFICULTY_WEIGHTS).astype(np.uint8)
+    else:
+        difficulty = np.full(n, DIFFICULTIES.index(difficulty), dtype=np.uint8)
+    xp_budget = np.array([thresholds[name] for name in DIFFICULTIES])[difficulty] * party_size
+
+    # Method weights 0.75 / 0.5 (600+ XP) / 0.25 (3000+ XP) / 1
+    weights = np.column_stack((np.full(n, 0.75), np.where(xp_budget >= 600, 0.5, 0), np.where(xp_budget >= 3000, 0.25, 0),
+                               np.ones(n)))
+    cumulative = weights.cumsum(axis=1)
+    method = (cumulative < rng.random(n)[:, None] * cumulative[:, -1:]).sum(axis=1) + 1
+
+    monster_ids = np.empty((n, MAX_GROUPS), dtype=np.int32)
+    monster_counts = np.empty((n, MAX_GROUPS), dtype=np.int16)
+    for start in range(0, n, CHUNK_SIZE):
+        chunk = slice(start, start + CHUNK_SIZE)
+        monster_ids[chunk], monster_counts[chunk] = pick_monsters(rng, ids, crs, bounds, xp_budget[chunk], method[chunk])
+
+    if distance_dice:
+        number, sides = distance_dice["dice"]
+        rolls = rng.integers(1, sides + 1, (n, number), dtype=np.int16).sum(axis=1)
+        encounter_distance = rolls.astype(np.int32) * distance_dice["multiplier"]
+    else:
+        encounter_distance = np.zeros(n, dtype=np.int32)
+
+    shape = (n, FEATURES_PER_ENCOUNTER)
+    feature_ids = rng.integers(0, len(features), shape, dtype=np.int16)
+    area_modifier = np.array([feature.get('areaModifier', 1) for feature in features], dtype=float)[feature_ids]
+    height_modifier = np.array([feature.get('heightModifier', 1) for feature in features], dtype=float)[feature_ids]
+    distance = encounter_distance[:, None].astype(float)
+
+    return EncounterBatch(
+        index.monsters, features, light_levels,
+        difficulty=difficulty,
+        xp_budget=xp_budget,
+        method=method.astype(np.uint8),
+        monster_ids=monster_ids,
+        monster_counts=monster_counts,
+        encounter_distance=encounter_distance,
+        wind=weather(rng.integers(1, 21, n)),
+        precipitation=weather(rng.integers(1, 21, n)),
+        light_level=rng.integers(0, len(light_levels), n, dtype=np.uint8),
+        feature_ids=feature_ids,
+        feature_distance=np.rint(distance * rng.uniform(-0.5, 1.5, shape)).astype(np.int32),
+        feature_area=np.rint(distance * rng.uniform(0.05, 2, shape) * area_modifier).astype(np.int32),
+        feature_height=np.rint(distance * rng.uniform(0.1, 1, shape) * height_modifier).astype(np.int32),
+    )
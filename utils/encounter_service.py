@@ -0,0 +1,99 @@
+# utils/encounter_service.py
+# Background encounter generation for the map screens.
+#
+# One EncounterService lives for the whole game. Realm bestiaries come from
+# the shared realm repository, the most recent character is remembered
+# until the saves folder changes, and encounters are generated on a worker
+# thread. Finished encounters come back to the pygame loop as an
+# ENCOUNTER_READY event, so clicking a hex never holds up a frame.
+
+import json
+import os
+import queue
+import threading
+
+import pygame as pg
+
+from utils.old.encounter_generation import generate_encounter_data, next_encounter_number
+from utils.realm_repository import get_realm
+
+script_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+saves_dir = os.path.join(script_dir, "saves")
+
+# Posted with: path (encounter file, None if nothing could be generated), realm, hex, terrain, character
+ENCOUNTER_READY = pg.event.custom_type()
+
+
+class EncounterService:
+    def __init__(self, saves_dir=saves_dir):
+        self.saves_dir = saves_dir
+        self._latest_save = None  # (saves folder mtime, file name)
+        self._character = None  # (path, mtime, character data)
+        self._requests = queue.Queue()
+        self._thread = None
+
+    def latest_save(self):
+        """ File name of the newest <character>.<realm>.json save; the folder is only listed again when it changes. """
+        folder_mtime = os.stat(self.saves_dir).st_mtime_ns
+        if self._latest_save is None or self._latest_save[0] != folder_mtime:
+            # Only saves named <character>.<realm>.json know which realm the character is in
+            save_files = [f for f in os.listdir(self.saves_dir) if f.endswith(".json") and len(f.split('.')) == 3]
+            latest = max(save_files, key=lambda f: os.path.getctime(os.path.join(self.saves_dir, f)), default=None)
+            self._latest_save = (folder_mtime, latest)
+        return self._latest_save[1]
+
+    def load_most_recent_character(self):
+        latest_save = self.latest_save()
+        if latest_save is None:
+            print("No save files found.")
+            return None
+        path = os.path.join(self.saves_dir, latest_save)
+        mtime = os.stat(path).st_mtime_ns
+        if self._character is None or self._character[:2] != (path, mtime):
+            print(f"Loading most recent save file: {latest_save}")
+            name, realm = os.path.splitext(latest_save)[0].rsplit('.', 1)
+            with open(path, 'r') as file:
+                character_data = json.load(file)
+            character_data['realm'] = realm
+            self._character = (path, mtime, character_data)
+        return self._character[2]
+
+    def request(self, hex_coordinates, terrain):
+        """ Queue an encounter check for a hex; the answer arrives later as an ENCOUNTER_READY event. """
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._work, name="encounters", daemon=True)
+            self._thread.start()
+        self._requests.put((hex_coordinates, terrain))
+
+    def close(self):
+        if self._thread is not None:
+            self._requests.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def generate(self, hex_coordinates, terrain):
+        character_data = self.load_most_recent_character()
+        if not character_data:
+            return None, None
+        player_name = character_data.get('name', 'Unknown')
+        party_level = character_data.get('level', 1)
+        realm = character_data.get('realm', 'Unknown')
+        print(f"Checking encounter for {player_name} at {hex_coordinates} with terrain {terrain} in realm {realm} at level {party_level}")
+        path = generate_encounter_data(1, party_level, "random", terrain, realm, next_encounter_number(),
+                                       get_realm(realm).by_cr)
+        return path, character_data
+
+    def _work(self):
+        while True:
+            request = self._requests.get()
+            if request is None:
+                break
+            hex_coordinates, terrain = request
+            try:
+                path, character_data = self.generate(hex_coordinates, terrain)
+            except Exception as e:
+                print(f"Error generating encounter: {e}")
+                path, character_data = None, None
+            realm = character_data.get('realm') if character_data else None
+            pg.event.post(pg.event.Event(ENCOUNTER_READY, path=path, realm=realm, hex=hex_coordinates,
+                                         terrain=terrain, character=character_data))
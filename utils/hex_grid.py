@@ -0,0 +1,183 @@
+# utils/hex_grid.py
+# Array-backed store for the hexes a map screen has loaded.
+#
+# Instead of one Python object (with its own little NumPy arrays) per hex,
+# a HexGrid keeps every hex as a row in parallel columns and finds rows by
+# axial coordinate through a dense offset table, so lookups are O(1) and
+# whole disks, rings and lines are resolved in one vectorized call.
+
+from functools import lru_cache
+
+import numpy as np
+import hexy as hx
+
+NO_HEX = -1
+NO_VALUE = -1
+
+
+def cube_round(cubes):
+    """ Round fractional cube coordinates to the nearest hex, for every row at once. """
+    cubes = np.asarray(cubes, dtype=float).reshape(-1, 3)
+    rounded = np.round(cubes)
+    diff = np.abs(rounded - cubes)
+    fix_x = (diff[:, 0] > diff[:, 1]) & (diff[:, 0] > diff[:, 2])
+    fix_y = ~fix_x & (diff[:, 1] > diff[:, 2])
+    fix_z = ~fix_x & ~fix_y
+    rounded[fix_x, 0] = -rounded[fix_x, 1] - rounded[fix_x, 2]
+    rounded[fix_y, 1] = -rounded[fix_y, 0] - rounded[fix_y, 2]
+    rounded[fix_z, 2] = -rounded[fix_z, 0] - rounded[fix_z, 1]
+    return rounded + 0.0  # no negative zeros
+
+
+def pixel_to_cube(pixels, radius):
+    """ Vectorized hx.pixel_to_cube. """
+    axial = np.asarray(pixels, dtype=float).reshape(-1, 2).dot(hx.pixel_to_axial_mat.T) / radius
+    return cube_round(hx.axial_to_cube(axial))
+
+
+def pixel_to_axial(x, y, radius):
+    """ Integer axial (q, r) of the hex under each pixel, for large pixel arrays.
+
+    Same rounding as pixel_to_cube, but in float32 and without building the
+    (n, 3) cube array, which makes it cheap enough to run per screen pixel.
+    """
+    (a, b), (_, d) = (hx.pixel_to_axial_mat / radius).astype(np.float32)
+    x = np.asarray(x, dtype=np.float32)
+    y = np.asarray(y, dtype=np.float32)
+    qf = a * x + b * y
+    rf = d * y
+    sf = -qf - rf
+    q, r, s = np.rint(qf), np.rint(rf), np.rint(sf)
+    dq, dr, ds = np.abs(q - qf), np.abs(r - rf), np.abs(s - sf)
+    fix_q = (dq > dr) & (dq > ds)
+    fix_r = ~fix_q & (dr > ds)
+    q = np.where(fix_q, -r - s, q)
+    r = np.where(fix_r, -q - s, r)
+    return q.astype(np.int32), r.astype(np.int32)
+
+
+def _read_only(array):
+    array.flags.writeable = False
+    return array
+
+
+@lru_cache(maxsize=64)
+def disk_offsets(radius):
+    """ Cube offsets of every hex within `radius` of the origin (cached, read-only). """
+    span = np.arange(-radius, radius + 1)
+    x, z = np.meshgrid(span, span, indexing='ij')
+    x, z = x.ravel(), z.ravel()
+    inside = np.abs(x + z) <= radius
+    x, z = x[inside], z[inside]
+    return _read_only(np.column_stack((x, -x - z, z)).astype(float))
+
+
+@lru_cache(maxsize=64)
+def ring_offsets(radius):
+    """ Cube offsets of the hexes exactly `radius` from the origin (cached, read-only). """
+    if radius <= 0:
+        return _read_only(np.zeros((1, 3)))
+    steps = np.arange(radius)[:, None]
+    sides = [hx.ALL_DIRECTIONS[i - 1] * (radius - steps) + hx.ALL_DIRECTIONS[i] * steps for i in range(6)]
+    return _read_only(np.concatenate(sides).astype(float))
+
+
+@lru_cache(maxsize=64)
+def spiral_offsets(radius_start, radius_end):
+    """ Cube offsets of the hexes from `radius_start` to `radius_end` (inclusive) from the origin. """
+    offsets = disk_offsets(radius_end)
+    distance = np.abs(offsets).max(axis=1)
+    return _read_only(offsets[distance >= radius_start])
+
+
+def disk(center, radius):
+    return disk_offsets(radius) + np.asarray(center, dtype=float)
+
+
+def ring(center, radius):
+    return ring_offsets(radius) + np.asarray(center, dtype=float)
+
+
+def spiral(center, radius_start, radius_end):
+    """ Every hex between `radius_start` and `radius_end` (inclusive) from `center`. """
+    return spiral_offsets(radius_start, radius_end) + np.asarray(center, dtype=float)
+
+
+def line(start, end):
+    """ Hexes on the straight line from `start` to `end`, both included. """
+    start = np.asarray(start, dtype=float)
+    end = np.asarray(end, dtype=float)
+    distance = int(np.abs(end - start).max())
+    if distance < 1:
+        return start.reshape(1, 3)
+    # Nudge off the exact edges so ties round consistently
+    t = np.arange(distance + 1)[:, None] / distance
+    nudge = np.array([1e-6, 2e-6, -3e-6])
+    return cube_round(start + nudge + (end - start) * t)
+
+
+class HexGrid:
+    def __init__(self, q, r, terrain, legend, hex_radius, values=None, flags=None):
+        self.legend = list(legend)
+        self.hex_radius = hex_radius
+
+        # Parallel columns, one row per hex
+        self.q = np.asarray(q, dtype=np.int32)
+        self.r = np.asarray(r, dtype=np.int32)
+        self.terrain = np.asarray(terrain, dtype=np.uint8)
+        axial = np.column_stack((self.q, self.r)).astype(float)
+        self.centers = hx.axial_to_pixel(axial, hex_radius).astype(np.float32).reshape(-1, 2)
+        self.values = np.full(len(self.q), NO_VALUE, dtype=np.int32) if values is None else np.asarray(values, dtype=np.int32)
+        self.flags = np.zeros(len(self.q), dtype=np.uint8) if flags is None else np.asarray(flags, dtype=np.uint8)
+
+        # Dense offset table over the bounding box: (q, r) -> row, NO_HEX where empty
+        if len(self.q):
+            self.q_min, self.r_min = int(self.q.min()), int(self.r.min())
+            shape = (int(self.q.max()) - self.q_min + 1, int(self.r.max()) - self.r_min + 1)
+        else:
+            self.q_min, self.r_min, shape = 0, 0, (0, 0)
+        self.offsets = np.full(shape, NO_HEX, dtype=np.int32)
+        self.offsets[self.q - self.q_min, self.r - self.r_min] = np.arange(len(self.q), dtype=np.int32)
+
+    def __len__(self):
+        return len(self.q)
+
+    @property
+    def nbytes(self):
+        columns = (self.q, self.r, self.terrain, self.centers, self.values, self.flags, self.offsets)
+        return sum(column.nbytes for column in columns)
+
+    def index_of(self, q, r):
+        """ Row of each axial (q, r), or NO_HEX where the grid has no hex. """
+        q = np.asarray(q, dtype=np.int64) - self.q_min
+        r = np.asarray(r, dtype=np.int64) - self.r_min
+        inside = (q >= 0) & (q < self.offsets.shape[0]) & (r >= 0) & (r < self.offsets.shape[1])
+        index = np.full(np.shape(q), NO_HEX, dtype=np.int32)
+        index[inside] = self.offsets[q[inside], r[inside]]
+        return index
+
+    def index_of_cubes(self, cubes):
+        cubes = np.round(np.asarray(cubes, dtype=float).reshape(-1, 3)).astype(np.int64)
+        return self.index_of(cubes[:, 0], cubes[:, 2])
+
+    def present(self, cubes):
+        """ Rows of the hexes in `cubes` that exist in the grid. """
+        index = self.index_of_cubes(cubes)
+        return index[index != NO_HEX]
+
+    def disk(self, center, radius):
+        return self.present(disk(center, radius))
+
+    def ring(self, center, radius):
+        return self.present(ring(center, radius))
+
+    def line(self, start, end):
+        return self.present(line(start, end))
+
+    def cube_coordinates(self, index=None):
+        q = self.q if index is None else self.q[index]
+        r = self.r if index is None else self.r[index]
+        return np.column_stack((q, -q - r, r))
+
+    def terrain_name(self, index):
+        return self.legend[self.terrain[index]]
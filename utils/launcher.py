@@ -0,0 +1,133 @@
+# utils/launcher.py
+# Warm launcher for the tools that still run as separate processes.
+#
+# The Tk and Qt tools (ccmenu, csdisplay, DM_Enc_tool, inventory) have their
+# own event loops and cannot share the game's pygame window. Rather than a
+# cold interpreter per launch, a launcher process is forked once, imports
+# pygame, NumPy, hexy, PIL, sqlite3 and the tools' helper modules, then
+# forks again for every script it is asked to run. Each script starts with
+# all of that already imported.
+#
+# Where os.fork does not exist (Windows) scripts run with subprocess as before.
+
+import importlib
+import os
+import runpy
+import subprocess
+import sys
+from multiprocessing import Pipe
+
+PRELOAD_MODULES = [
+    "numpy", "hexy", "pygame", "PIL.Image", "PIL.ImageTk", "sqlite3", "tkinter", "tkinter.ttk",
+    "PyQt6.QtWidgets", "PyQt6.QtGui", "PyQt6.QtCore",
+    "utils.names", "utils.game_editions", "utils.races", "utils.classes", "utils.backgrounds",
+    "utils.db_utils", "utils.character_tab", "utils.inventory_tab", "utils.stats_tab", "utils.log_tab",
+    "utils.old.encounter_generation",
+]
+
+def preload(modules=PRELOAD_MODULES):
+    for module in modules:
+        try:
+            importlib.import_module(module)
+        except Exception as e:
+            # Optional dependencies (PyQt, a display for Tk) may be missing; the script will say so itself
+            print(f"Launcher could not preload {module}: {e}")
+
+
+def run_forked(script_path, args, cwd):
+    """ Body of a forked child: run the script as __main__ and never return. """
+    code = 0
+    try:
+        os.chdir(cwd)
+        sys.argv = [script_path, *args]
+        sys.path[0] = os.path.dirname(script_path)
+        runpy.run_path(script_path, run_name="__main__")
+    except SystemExit as e:
+        code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    except BaseException:
+        import traceback
+        traceback.print_exc()
+        code = 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(code)
+
+
+def serve(conn, modules=PRELOAD_MODULES):
+    """ Launcher process: preload, then fork a child per (script, args, cwd) request and report its exit code. """
+    preload(modules)
+    while True:
+        try:
+            script_path, args, cwd = conn.recv()
+        except (EOFError, OSError):
+            break
+        pid = os.fork()
+        if pid == 0:
+            conn.close()
+            run_forked(script_path, args, cwd)
+        _, status = os.waitpid(pid, 0)
+        conn.send(os.waitstatus_to_exitcode(status))
+    os._exit(0)
+
+
+class Launcher:
+    def __init__(self, modules=PRELOAD_MODULES):
+        self.modules = modules
+        self.pid = None
+        self.conn = None
+
+    @property
+    def alive(self):
+        return self.pid is not None
+
+    def start(self):
+        """ Fork the launcher process; best done before pygame opens a window. """
+        if self.alive or not hasattr(os, "fork"):
+            return
+        conn, child_conn = Pipe()
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            conn.close()
+            serve(child_conn, self.modules)
+        child_conn.close()
+        self.pid, self.conn = pid, conn
+
+    def close(self):
+        if not self.alive:
+            return
+        self.conn.close()
+        os.waitpid(self.pid, 0)
+        self.pid = self.conn = None
+
+    def run(self, script_path, *args):
+        """ Run a script to completion like subprocess.run, forking it from the launcher when there is one. """
+        script_path = os.path.abspath(script_path)
+        self.start()
+        if self.alive:
+            try:
+                self.conn.send((script_path, [str(arg) for arg in args], os.getcwd()))
+                return self.conn.recv()
+            except (EOFError, OSError):
+                # The launcher died; forget it and start a new one next time
+                self.pid = self.conn = None
+        return subprocess.run([sys.executable, script_path, *map(str, args)]).returncode
+
+
+_launcher = None
+
+
+def get_launcher():
+    """ The process-wide launcher, shut down when the game exits. """
+    global _launcher
+    if _launcher is None:
+        import atexit
+        _launcher = Launcher()
+        atexit.register(_launcher.close)
+    return _launcher
+
+
+def run_script(script_path, *args):
+    return get_launcher().run(script_path, *args)
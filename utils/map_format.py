@@ -0,0 +1,232 @@
+# utils/map_format.py
+# Compact binary map files (.hxm) for the maps/ folder.
+#
+# Layout, all little-endian:
+#   8 bytes   magic b"HXMAP\x00\x01\x00"
+#   4 bytes   uint32 length of the JSON header
+#   n bytes   JSON header: seed, radius, terrain legend, hex count and the
+#             byte offset of every column
+#   columns   q int16, r int16, terrain uint8 and row_offsets int64, each
+#             starting on a 64 byte boundary
+#
+# Hexes are sorted by (r, q) and row_offsets[i] is the index of the first hex
+# in row r_min + i, so any horizontal band of the map is one contiguous slice
+# and the columns can be memory-mapped directly.
+
+import json
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from utils.terrain import TERRAIN_LEGEND
+
+MAP_EXTENSION = ".hxm"
+MAGIC = b"HXMAP\x00\x01\x00"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+COLUMN_DTYPES = {
+    "q": "<i2",
+    "r": "<i2",
+    "terrain": "|u1",
+    "row_offsets": "<i8",
+}
+
+
+class HexMapData:
+    """ Column arrays for one map: axial q and r, terrain codes and the legend that names them. """
+
+    def __init__(self, q, r, terrain, legend, seed=None, radius=None, row_offsets=None, r_min=0):
+        self.q = q
+        self.r = r
+        self.terrain = terrain
+        self.legend = list(legend)
+        self.seed = seed
+        self.radius = radius
+        self.row_offsets = row_offsets
+        self.r_min = r_min
+
+    def __len__(self):
+        return len(self.q)
+
+    def cube_coordinates(self):
+        q = np.asarray(self.q, dtype=int)
+        r = np.asarray(self.r, dtype=int)
+        return np.column_stack((q, -q - r, r))
+
+    def terrain_names(self):
+        return [self.legend[code] for code in self.terrain]
+
+    def window(self, q_min, q_max, r_min, r_max):
+        """ Axial q, r and terrain code arrays for every hex in an inclusive axial box.
+
+        With a row index only the rows and q ranges inside the box are read,
+        so on a memory-mapped file the cost follows the box, not the map.
+        """
+        if self.row_offsets is None:
+            inside = (self.q >= q_min) & (self.q <= q_max) & (self.r >= r_min) & (self.r <= r_max)
+            return np.asarray(self.q[inside]), np.asarray(self.r[inside]), np.asarray(self.terrain[inside])
+
+        first_row = max(r_min - self.r_min, 0)
+        last_row = min(r_max - self.r_min, len(self.row_offsets) - 2)
+        slices = []
+        for row in range(first_row, last_row + 1):
+            start, end = int(self.row_offsets[row]), int(self.row_offsets[row + 1])
+            row_q = self.q[start:end]
+            low = start + int(np.searchsorted(row_q, q_min, 'left'))
+            high = start + int(np.searchsorted(row_q, q_max, 'right'))
+            if high > low:
+                slices.append(slice(low, high))
+
+        if not slices:
+            empty = np.zeros(0, dtype=int)
+            return empty, empty, np.zeros(0, dtype=np.uint8)
+        q = np.concatenate([self.q[part] for part in slices])
+        r = np.concatenate([self.r[part] for part in slices])
+        terrain = np.concatenate([self.terrain[part] for part in slices])
+        return q, r, terrain
+
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def write_map(path, q, r, terrain, legend, seed=None, radius=None):
+    """ Write axial columns and terrain codes to a .hxm file, sorted by row. """
+    q = np.asarray(q)
+    r = np.asarray(r)
+    terrain = np.asarray(terrain, dtype=np.uint8)
+    limit = np.iinfo(np.int16)
+    if len(q) and (min(q.min(), r.min()) < limit.min or max(q.max(), r.max()) > limit.max):
+        raise ValueError("Axial coordinates do not fit in int16")
+
+    order = np.lexsort((q, r))
+    q, r, terrain = q[order], r[order], terrain[order]
+    r_min = int(r[0]) if len(r) else 0
+    rows = np.bincount(r - r_min) if len(r) else np.zeros(0, dtype=int)
+    row_offsets = np.concatenate(([0], np.cumsum(rows)))
+
+    columns = {
+        "q": q.astype(COLUMN_DTYPES["q"]),
+        "r": r.astype(COLUMN_DTYPES["r"]),
+        "terrain": terrain.astype(COLUMN_DTYPES["terrain"]),
+        "row_offsets": row_offsets.astype(COLUMN_DTYPES["row_offsets"]),
+    }
+    header = {
+        "version": FORMAT_VERSION,
+        "seed": seed,
+        "radius": radius,
+        "legend": list(legend),
+        "count": int(len(q)),
+        "r_min": r_min,
+        "columns": {},
+    }
+
+    # Column offsets depend on the header length, which depends on the
+    # offsets; grow the reserved header room until everything fits
+    header_room = ALIGNMENT
+    while True:
+        offset = header_room
+        for name, column in columns.items():
+            header["columns"][name] = {"dtype": COLUMN_DTYPES[name], "offset": offset, "length": int(len(column))}
+            offset = _align(offset + column.nbytes)
+        header_bytes = json.dumps(header).encode("utf-8")
+        if len(MAGIC) + 4 + len(header_bytes) <= header_room:
+            break
+        header_room = _align(len(MAGIC) + 4 + len(header_bytes))
+
+    temp_path = path + ".tmp"
+    with open(temp_path, 'wb') as file:
+        file.write(MAGIC)
+        file.write(np.uint32(len(header_bytes)).tobytes())
+        file.write(header_bytes)
+        for name, column in columns.items():
+            file.seek(header["columns"][name]["offset"])
+            file.write(column.tobytes())
+        file.truncate(offset)
+    os.replace(temp_path, path)
+
+
+def _header_length(prefix, path):
+    if bytes(prefix[:len(MAGIC)]) != MAGIC:
+        raise ValueError(f"{path} is not a {MAP_EXTENSION} map file")
+    return int(np.frombuffer(prefix, dtype="<u4", count=1, offset=len(MAGIC))[0])
+
+
+def read_header(path):
+    with open(path, 'rb') as file:
+        header_length = _header_length(file.read(len(MAGIC) + 4), path)
+        return json.loads(file.read(header_length).decode("utf-8"))
+
+
+def load_map(path, mmap=False):
+    """ Load a .hxm file. With mmap=True the columns stay on disk and are paged in on use. """
+    if mmap:
+        header = read_header(path)
+        columns = {}
+        for name, column in header["columns"].items():
+            if column["length"] == 0:
+                columns[name] = np.zeros(0, dtype=column["dtype"])
+            else:
+                columns[name] = np.memmap(path, dtype=column["dtype"], mode='r',
+                                          offset=column["offset"], shape=(column["length"],))
+    else:
+        # One read for the whole file; the columns are views into the buffer
+        buffer = bytearray(os.path.getsize(path))
+        with open(path, 'rb') as file:
+            file.readinto(buffer)
+        start = len(MAGIC) + 4
+        header = json.loads(bytes(buffer[start:start + _header_length(buffer, path)]).decode("utf-8"))
+        columns = {name: np.frombuffer(buffer, dtype=column["dtype"], count=column["length"], offset=column["offset"])
+                   for name, column in header["columns"].items()}
+    return HexMapData(columns["q"], columns["r"], columns["terrain"], header["legend"],
+                      header["seed"], header["radius"], columns["row_offsets"], header["r_min"])
+
+
+def read_json_map(path, legend=None):
+    """ Read a legacy hex_map_*.json file into columns. """
+    with open(path, 'r') as file:
+        hex_map_data = json.load(file)
+
+    cubes = np.array([value["cube"] for value in hex_map_data.values()], dtype=float).reshape(-1, 3)
+    if not np.array_equal(cubes, np.round(cubes)) or np.any(cubes.sum(axis=1) != 0):
+        raise ValueError(f"{path} holds coordinates that are not whole cube coordinates")
+    cubes = cubes.astype(int)
+
+    # Keep the usual code order, then any names this map adds (older maps use "forest")
+    names = [value["terrain"] for value in hex_map_data.values()]
+    legend = list(TERRAIN_LEGEND if legend is None else legend)
+    legend += [name for name in dict.fromkeys(names) if name not in legend]
+    codes = {name: code for code, name in enumerate(legend)}
+    terrain = np.array([codes[name] for name in names], dtype=np.uint8)
+
+    radius = int(np.abs(cubes).max()) if len(cubes) else 0
+    return HexMapData(cubes[:, 0], cubes[:, 2], terrain, legend, None, radius)
+
+
+def convert_json_map(json_path, out_path=None):
+    """ Convert a legacy JSON map to .hxm and check that nothing was lost. """
+    if out_path is None:
+        out_path = os.path.splitext(json_path)[0] + MAP_EXTENSION
+    data = read_json_map(json_path)
+    write_map(out_path, data.q, data.r, data.terrain, data.legend, data.seed, data.radius)
+
+    converted = load_map(out_path)
+    original = {(int(q), int(r)): data.legend[code] for q, r, code in zip(data.q, data.r, data.terrain)}
+    roundtrip = {(int(q), int(r)): converted.legend[code]
+                 for q, r, code in zip(converted.q, converted.r, converted.terrain)}
+    if original != roundtrip:
+        raise ValueError(f"Conversion of {json_path} was not lossless")
+    return out_path
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python utils/map_format.py <hex_map_file.json> [...]")
+        exit(1)
+
+    for json_path in sys.argv[1:]:
+        out_path = convert_json_map(json_path)
+        print(f"{json_path} -> {out_path} ({os.path.getsize(json_path):,} -> {os.path.getsize(out_path):,} bytes)")
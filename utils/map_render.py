@@ -0,0 +1,129 @@
+# utils/map_render.py
+# Off-screen rendering of the terrain layer for the map screens.
+#
+# Terrain never changes while a map is on screen, so it is drawn into fixed
+# size tiles keyed by (zoom, tile x, tile y) and kept in a bounded LRU. A
+# tile only ever draws the hexes whose sprites reach into it, and a frame is
+# the handful of tile blits covering the viewport plus whatever overlay sits
+# on top of them.
+#
+# Zoomed out past LOD_ZOOM the sprites are too small to read, so tiles are
+# instead filled per pixel with a flat colour per terrain code. Both kinds
+# of tile come from the same map source and hex geometry, so the map lines
+# up exactly when the zoom crosses the threshold.
+
+from collections import OrderedDict
+
+import hexy as hx
+import numpy as np
+import pygame as pg
+
+from utils.chunks import axial_box_for_pixels
+from utils.hex_grid import pixel_to_axial
+
+TILE_SIZE = 256  # screen pixels
+TILE_CACHE_SIZE = 160
+LOD_ZOOM = 0.5  # below this zoom tiles are colour rasters instead of sprites
+
+
+class TerrainLayer:
+    def __init__(self, map_source, sprites, colours, hex_radius, background_colour,
+                 tile_size=TILE_SIZE, cache_size=TILE_CACHE_SIZE, lod_zoom=LOD_ZOOM):
+        # Any object with window(q_min, q_max, r_min, r_max) -> (q, r, terrain codes)
+        self.map_source = map_source
+        self.sprites = sprites
+        # One RGB row per terrain code, then the background for pixels outside the map
+        self.palette = np.array(list(colours) + [background_colour], dtype=np.uint8)
+        self.lod_zoom = lod_zoom
+        self.hex_radius = hex_radius
+        self.background_colour = background_colour
+        self.tile_size = tile_size
+        self.cache_size = cache_size
+        self._tiles = OrderedDict()
+        self._scaled_sprites = {}
+
+        # Pixel centres across and down a tile, shaped to broadcast x-major like pg.surfarray
+        self._pixel_x = np.arange(tile_size)[:, None] + 0.5
+        self._pixel_y = np.arange(tile_size)[None, :] + 0.5
+
+    def __len__(self):
+        return len(self._tiles)
+
+    def invalidate(self):
+        """ Drop every rendered tile; they are redrawn from the map as they come into view. """
+        self._tiles.clear()
+
+    def sprites_at(self, zoom):
+        """ Sprites and their blit offsets (half sizes) scaled for one zoom level. """
+        if zoom not in self._scaled_sprites:
+            sprites = self.sprites
+            if zoom != 1:
+                sprites = [pg.transform.smoothscale(sprite, (max(1, round(sprite.get_width() * zoom)),
+                                                             max(1, round(sprite.get_height() * zoom))))
+                           for sprite in sprites]
+            offsets = np.array([np.array(sprite.get_size()) / 2 for sprite in sprites]).reshape(-1, 2)
+            self._scaled_sprites[zoom] = (sprites, offsets)
+        return self._scaled_sprites[zoom]
+
+    def render_raster_tile(self, zoom, tx, ty):
+        """ Colour every pixel of the tile by the terrain of the hex it falls in. """
+        size = self.tile_size
+        origin = np.array((tx, ty)) * size
+
+        x_min, y_min = origin / zoom
+        x_max, y_max = (origin + size) / zoom
+        q_min, q_max, r_min, r_max = axial_box_for_pixels(x_min, y_min, x_max, y_max, self.hex_radius)
+        q, r, codes = self.map_source.window(q_min, q_max, r_min, r_max)
+
+        # Palette index for every hex of the box, the background entry where the map has none.
+        # The box holds every hex touching the tile, so each pixel's hex is inside it
+        terrain = np.full((q_max - q_min + 1, r_max - r_min + 1), len(self.palette) - 1, dtype=np.intp)
+        terrain[q - q_min, r - r_min] = codes
+        q, r = pixel_to_axial((origin[0] + self._pixel_x) / zoom, (origin[1] + self._pixel_y) / zoom, self.hex_radius)
+        return pg.surfarray.make_surface(self.palette[terrain[q - q_min, r - r_min]])
+
+    def render_tile(self, zoom, tx, ty):
+        if zoom < self.lod_zoom:
+            return self.render_raster_tile(zoom, tx, ty)
+
+        size = self.tile_size
+        origin = np.array((tx, ty)) * size  # top left of the tile in zoomed pixels
+
+        # Every hex whose sprite can reach into the tile, and nothing else
+        x_min, y_min = origin / zoom - self.hex_radius
+        x_max, y_max = (origin + size) / zoom + self.hex_radius
+        q, r, codes = self.map_source.window(*axial_box_for_pixels(x_min, y_min, x_max, y_max, self.hex_radius))
+
+        surface = pg.Surface((size, size))
+        surface.fill(self.background_colour)
+        if len(q):
+            sprites, offsets = self.sprites_at(zoom)
+            centers = hx.axial_to_pixel(np.column_stack((q, r)).astype(float), self.hex_radius).reshape(-1, 2)
+            codes = np.asarray(codes)
+            draw_positions = (centers * zoom - origin - offsets[codes]).tolist()
+            surface.blits(zip([sprites[code] for code in codes.tolist()], draw_positions), doreturn=False)
+        return surface
+
+    def get_tile(self, zoom, tx, ty):
+        key = (zoom, tx, ty)
+        if key in self._tiles:
+            self._tiles.move_to_end(key)
+            return self._tiles[key]
+
+        tile = self.render_tile(zoom, tx, ty)
+        self._tiles[key] = tile
+        while len(self._tiles) > self.cache_size:
+            self._tiles.popitem(last=False)
+        return tile
+
+    def draw(self, target, camera):
+        """ Blit the tiles under the camera's viewport onto `target`. """
+        zoom = camera.zoom
+        size = self.tile_size
+        left, top = np.round(camera.position * zoom - camera.half_size).astype(int)
+        width, height = target.get_size()
+        tiles = []
+        for ty in range(top // size, (top + height - 1) // size + 1):
+            for tx in range(left // size, (left + width - 1) // size + 1):
+                tiles.append((self.get_tile(zoom, tx, ty), (tx * size - left, ty * size - top)))
+        target.blits(tiles, doreturn=False)
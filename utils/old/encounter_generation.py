@@ -1,9 +1,9 @@
 import json
-import random
+from bisect import bisect_right
+from fractions import Fraction
 import sys
 import os
 import subprocess
-from dice import roll_dice
 
 # Function to load JSON data from a file
 def load_json(file_path):
@@ -17,31 +17,73 @@ def load_json(file_path):
         print(f"Error decoding JSON from file: {file_path}")
         return {}
 
-# Define the base path
+# Define the base path; the data and realms folders are at the top of the repository
 base_path = os.path.dirname(os.path.abspath(__file__))
+root_path = os.path.abspath(os.path.join(base_path, '..', '..'))
+sys.path.append(root_path)
+
+from utils.dice import stream
+
+DIFFICULTIES = ["easy", "medium", "hard", "deadly"]
+DIFFICULTY_WEIGHTS = [0.14, 0.68, 0.13, 0.05]
 
 # Load global data using the base path
-difficulty_thresholds = load_json(os.path.join(base_path, '../data/difficulty_thresholds.json'))
-challenge_rating_list = load_json(os.path.join(base_path, '../data/challenge_rating_list.json'))
+difficulty_thresholds = load_json(os.path.join(root_path, 'data', 'difficulty_thresholds.json'))
+challenge_rating_list = load_json(os.path.join(root_path, 'data', 'challenge_rating_list.json'))
+
+# CRs come as "1/8", "3" or 3 (and as {"cr": ...} in some bestiaries); compare them as numbers
+def cr_value(cr):
+    if isinstance(cr, dict):
+        cr = cr.get('cr')
+    try:
+        return float(Fraction(str(cr)))
+    except (ValueError, ZeroDivisionError):
+        return None
+
+cr_xp = {cr_value(cr_info['cr']): cr_info['xp'] for cr_info in challenge_rating_list}
 
 # Function to get XP from CR
 def get_xp_from_cr(cr):
-    for cr_info in challenge_rating_list:
-        if cr_info['cr'] == cr:
-            return cr_info['xp']
-    return 0
+    return cr_xp.get(cr_value(cr), 0)
+
+class MonsterIndex:
+    """ A realm's monsters bucketed by CR, with the buckets in XP order so the best affordable CR is a bisect. """
+
+    def __init__(self, monsters):
+        buckets = {}
+        for monster in monsters:
+            buckets.setdefault(cr_value(monster.get('cr')), []).append(monster)
+        order = sorted(buckets, key=lambda cr: (cr_xp.get(cr, 0), -1 if cr is None else cr))
+        self.crs = order
+        self.xps = [cr_xp.get(cr, 0) for cr in order]
+        self.buckets = [buckets[cr] for cr in order]
+
+    def __len__(self):
+        return sum(len(bucket) for bucket in self.buckets)
+
+    def highest_cr(self, xp_budget):
+        """ The monsters of the highest CR worth at most `xp_budget` XP, or an empty list. """
+        i = bisect_right(self.xps, xp_budget)
+        return self.buckets[i - 1] if i else []
+
+def monster_index(monsters):
+    return monsters if isinstance(monsters, MonsterIndex) else MonsterIndex(monsters)
+
+# Draws come from the "encounter" dice stream unless a Generator is passed in
+def encounter_rng(rng=None):
+    return stream("encounter").rng if rng is None else rng
 
 # Updated find_highest_cr function
-def find_highest_cr(xp_budget, monsters):
-    eligible_monsters = [monster for monster in monsters if get_xp_from_cr(monster['cr']) <= xp_budget]
-    if not eligible_monsters:
+def find_highest_cr(xp_budget, monsters, rng=None):
+    highest_cr_monsters = monster_index(monsters).highest_cr(xp_budget)
+    if not highest_cr_monsters:
         return None
-    highest_cr = max(monster['cr'] for monster in eligible_monsters)
-    highest_cr_monsters = [monster for monster in eligible_monsters if monster['cr'] == highest_cr]
-    return random.choice(highest_cr_monsters)
+    return highest_cr_monsters[int(encounter_rng(rng).random() * len(highest_cr_monsters))]
 
-def generate_encounter(xp_budget, monsters):
+def generate_encounter(xp_budget, monsters, rng=None):
     encounter = []
+    monsters = monster_index(monsters)
+    rng = encounter_rng(rng)
 
     def add_to_encounter(monster):
         encounter.append(monster)
@@ -58,35 +100,35 @@ def generate_encounter(xp_budget, monsters):
     if xp_budget >= 600:
         feasible_methods.append(4)  # Method 4 (Swarm)
 
-    method = random.choice(feasible_methods)
+    method = feasible_methods[int(rng.random() * len(feasible_methods))]
 
     if method == 1:
-        monster = find_highest_cr(xp_budget, monsters)
+        monster = find_highest_cr(xp_budget, monsters, rng)
         if monster:
             add_to_encounter(monster)
-            xp_budget *= random.uniform(0.5, 1)
+            xp_budget *= rng.uniform(0.5, 1)
 
     elif method == 2:
         pair_budget = xp_budget / 3
         for _ in range(2):
-            monster = find_highest_cr(pair_budget, monsters)
+            monster = find_highest_cr(pair_budget, monsters, rng)
             if monster:
                 add_to_encounter(monster)
 
     elif method == 3:
         minion_budget = xp_budget / 12
         for _ in range(2):
-            monster = find_highest_cr(minion_budget, monsters)
+            monster = find_highest_cr(minion_budget, monsters, rng)
             if monster:
-                for _ in range(random.randint(1, 6)):
+                for _ in range(rng.integers(1, 7)):
                     add_to_encounter(monster)
 
     elif method == 4:
         swarm_budget = xp_budget / 60
         for _ in range(3):
-            monster = find_highest_cr(swarm_budget, monsters)
+            monster = find_highest_cr(swarm_budget, monsters, rng)
             if monster:
-                for _ in range(random.randint(1, 10)):
+                for _ in range(rng.integers(1, 11)):
                     add_to_encounter(monster)
 
     return encounter
@@ -97,15 +139,25 @@ def get_party_xp_threshold(party_size, party_level, difficulty):
             return threshold[difficulty] * party_size
     return 0
 
-def generate_encounter_data(party_size, party_level, difficulty, terrain, realm, encounter_number):
-    monsters_data = load_json(os.path.join(base_path, f'../realms/{realm}.json'))
-    monsters = monsters_data.get('monster', [])
-    
+def next_encounter_number():
+    encounter_number = 1
+    while os.path.exists(os.path.join(base_path, f'Enc{encounter_number}.json')):
+        encounter_number += 1
+    return encounter_number
+
+def generate_encounter_data(party_size, party_level, difficulty, terrain, realm, encounter_number, monsters=None, rng=None):
+    # Callers that keep the realm in memory pass its monsters in
+    if monsters is None:
+        # Imported here: the repository builds on this module's MonsterIndex
+        from utils.realm_repository import get_realm
+        monsters = get_realm(realm).by_cr
+
+    rng = encounter_rng(rng)
     if difficulty == "random":
-        difficulty = random.choices(["easy", "medium", "hard", "deadly"], [0.14, 0.68, 0.13, 0.05])[0]
+        difficulty = DIFFICULTIES[rng.choice(len(DIFFICULTIES), p=DIFFICULTY_WEIGHTS)]
 
     xp_budget = get_party_xp_threshold(party_size, party_level, difficulty)
-    encounter = generate_encounter(xp_budget, monsters)
+    encounter = generate_encounter(xp_budget, monsters, rng)
 
     file_name = f'Enc{encounter_number}.json'
     file_path = os.path.join(base_path, file_name)
@@ -128,12 +180,7 @@ if __name__ == "__main__":
     terrain = sys.argv[4]
     realm = sys.argv[5]
 
-    # Find the next encounter number
-    encounter_number = 1
-    while os.path.exists(os.path.join(base_path, f'Enc{encounter_number}.json')):
-        encounter_number += 1
-
-    encounter_file_path = generate_encounter_data(party_size, party_level, difficulty, terrain, realm, encounter_number)
+    encounter_file_path = generate_encounter_data(party_size, party_level, difficulty, terrain, realm, next_encounter_number())
 
     # Run combat_gui.py and pass the realm as an argument
-    subprocess.run([sys.executable, os.path.join(base_path, '../combat_gui.py'), encounter_file_path, realm])
+    subprocess.run([sys.executable, os.path.join(root_path, 'combat_gui.py'), encounter_file_path, realm])
@@ -0,0 +1,203 @@
+# utils/realm_repository.py
+# Process-wide cache of the realm bestiaries and the monster reference data.
+#
+# Each realms/<realm>.json is parsed once and kept with its monsters indexed
+# by CR, type and environment. A file is only parsed again when its contents
+# change: the mtime and size are checked on every lookup, and when they
+# differ the bytes are hashed, so touching a file without editing it keeps
+# the cached copy. Parsed data is also saved as a pickle sidecar under
+# cache/realms, which lets a fresh process skip JSON parsing altogether.
+
+import hashlib
+import json
+import os
+import pickle
+import threading
+
+import numpy as np
+
+from utils.old.encounter_generation import MonsterIndex
+
+script_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+realms_dir = os.path.join(script_dir, "realms")
+data_dir = os.path.join(script_dir, "data")
+CACHE_DIR = os.path.join(script_dir, "cache", "realms")
+SIDECAR_VERSION = 1
+
+
+def file_stamp(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def monster_type(monster):
+    # 5etools types are either "fey" or {"type": "humanoid", "tags": [...]}
+    kind = monster.get('type')
+    return kind.get('type') if isinstance(kind, dict) else kind
+
+
+class Realm:
+    def __init__(self, name, monsters):
+        self.name = name
+        self.monsters = monsters
+        self.by_cr = MonsterIndex(monsters)
+        self.by_type = {}
+        self.by_terrain = {}
+        for monster in monsters:
+            self.by_type.setdefault(monster_type(monster), []).append(monster)
+            for terrain in monster.get('environment', []):
+                self.by_terrain.setdefault(terrain, []).append(monster)
+
+    def __len__(self):
+        return len(self.monsters)
+
+
+class TerrainRealmIndex:
+    """ Inverted index over monsters_by_cr.json: (terrain, realm) -> monster ids grouped by CR.
+
+    Monsters are numbered in file order (`monsters[i]`). Each key holds one
+    id array sorted by CR plus where each CR's run starts, so a lookup
+    touches only the monsters that can appear there.
+    """
+
+    def __init__(self, monsters_by_cr):
+        self.monsters = []
+        self.crs = []  # CR key of each monster, as written in the file
+        postings = {}
+        for cr, monsters in monsters_by_cr.items():
+            for monster in monsters:
+                monster_id = len(self.monsters)
+                self.monsters.append(monster)
+                self.crs.append(cr)
+                for terrain in set(monster.get('terrain', [])):
+                    for realm in set(monster.get('realm', [])):
+                        postings.setdefault((terrain, realm), []).append(monster_id)
+
+        # Monsters are numbered one CR at a time, so each posting list is already grouped by CR
+        self.postings = {}
+        for key, ids in postings.items():
+            ids = np.array(ids, dtype=np.int32)
+            crs = [self.crs[monster_id] for monster_id in ids]
+            starts = [i for i in range(len(crs)) if i == 0 or crs[i] != crs[i - 1]]
+            self.postings[key] = (ids, [crs[i] for i in starts], np.array(starts + [len(ids)], dtype=np.int32))
+
+    def candidates(self, terrain, realm):
+        """ (ids, CR keys, run boundaries) for a terrain and realm; the ids for CR keys[i] are ids[bounds[i]:bounds[i + 1]]. """
+        return self.postings.get((terrain, realm), (np.zeros(0, dtype=np.int32), [], np.zeros(1, dtype=np.int32)))
+
+    def sample(self, terrain, realm, probability, rng):
+        """ {CR: [monster, ...]} keeping each candidate independently with `probability`, in one vectorized draw. """
+        ids, crs, bounds = self.candidates(terrain, realm)
+        if not len(ids):
+            return {}
+        kept = np.flatnonzero(rng.random(len(ids)) <= probability)
+        counts = np.diff(np.searchsorted(kept, bounds)).tolist()
+        monsters = [self.monsters[monster_id] for monster_id in ids[kept].tolist()]
+        sampled = {}
+        start = 0
+        for cr, count in zip(crs, counts):
+            if count:
+                sampled[cr] = monsters[start:start + count]
+                start += count
+        return sampled
+
+
+class RealmRepository:
+    def __init__(self, cache_dir=CACHE_DIR, sidecar=True):
+        self.cache_dir = cache_dir
+        self.sidecar = sidecar
+        self._files = {}  # path -> (stamp, sha1, parsed data)
+        self._realms = {}  # realm name -> (sha1 of its file, Realm)
+        self._terrain_index = None  # (sha1 of monsters_by_cr.json, TerrainRealmIndex)
+        self._lock = threading.Lock()
+
+    def sidecar_path(self, path):
+        tag = hashlib.sha1(path.encode("utf-8")).hexdigest()[:8]
+        return os.path.join(self.cache_dir, f"{os.path.splitext(os.path.basename(path))[0]}_{tag}.pickle")
+
+    def read_sidecar(self, path):
+        """ The sidecar's contents, or None when it is missing, unreadable or from another version. """
+        try:
+            with open(self.sidecar_path(path), 'rb') as file:
+                cached = pickle.load(file)
+        except Exception:
+            # Truncated files, renamed classes and the like: a cache miss, and
+            # parsing the JSON again writes a fresh sidecar
+            return None
+        if not isinstance(cached, dict) or cached.get("version") != SIDECAR_VERSION:
+            return None
+        return cached
+
+    def write_sidecar(self, path, stamp, digest, data):
+        sidecar_path = self.sidecar_path(path)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(sidecar_path + ".tmp", 'wb') as file:
+                pickle.dump({"version": SIDECAR_VERSION, "stamp": stamp, "sha1": digest, "data": data},
+                            file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(sidecar_path + ".tmp", sidecar_path)
+        except OSError as e:
+            # The cache only saves time; a read-only checkout still works without it
+            print(f"Could not write realm cache {sidecar_path}: {e}")
+
+    def _load(self, path):
+        stamp = file_stamp(path)
+        cached = self._files.get(path)
+        if cached is None and self.sidecar:
+            cached = self.read_sidecar(path)
+            cached = cached and (tuple(cached["stamp"]), cached["sha1"], cached["data"])
+        if cached is not None and cached[0] == stamp:
+            self._files[path] = cached
+            return cached
+
+        with open(path, 'rb') as file:
+            raw = file.read()
+        digest = hashlib.sha1(raw).hexdigest()
+        if cached is not None and cached[1] == digest:
+            # Touched but not edited
+            cached = (stamp, digest, cached[2])
+        else:
+            cached = (stamp, digest, json.loads(raw))
+        if self.sidecar:
+            self.write_sidecar(path, stamp, digest, cached[2])
+        self._files[path] = cached
+        return cached
+
+    def load_json(self, path):
+        """ Parsed contents of a JSON file, parsed again only after the file changes. Shared; do not modify. """
+        path = os.path.abspath(path)
+        with self._lock:
+            return self._load(path)[2]
+
+    def realm(self, name):
+        """ The indexed bestiary of realms/<name>.json. """
+        path = os.path.join(realms_dir, f"{name}.json")
+        if not os.path.isfile(path):
+            print(f"File not found: {path}")
+            return Realm(name, [])
+        with self._lock:
+            _, digest, data = self._load(path)
+            cached = self._realms.get(name)
+            if cached is None or cached[0] != digest:
+                cached = (digest, Realm(name, data.get('monster', [])))
+                self._realms[name] = cached
+            return cached[1]
+
+    def monsters_by_cr(self):
+        """ data/monsters_by_cr.json: {CR: [monster, ...]} with each monster's terrains and realms. """
+        return self.load_json(os.path.join(data_dir, "monsters_by_cr.json"))
+
+    def terrain_realm_index(self):
+        """ TerrainRealmIndex over data/monsters_by_cr.json, rebuilt when the file changes. """
+        with self._lock:
+            _, digest, data = self._load(os.path.join(data_dir, "monsters_by_cr.json"))
+            if self._terrain_index is None or self._terrain_index[0] != digest:
+                self._terrain_index = (digest, TerrainRealmIndex(data))
+            return self._terrain_index[1]
+
+
+repository = RealmRepository()
+
+
+def get_realm(name):
+    return repository.realm(name)
@@ -0,0 +1,115 @@
+# utils/scenes.py
+# One long-lived pygame process for all of the game's screens.
+#
+# Each screen is a Scene: it reacts to events, advances by the frame time
+# and draws itself onto the display surface. A SceneManager owns the window,
+# the clock and a stack of scenes, so going from the menu to the map and on
+# to combat is a push onto the stack rather than a new Python interpreter,
+# and fonts, sprites and data loaded by one screen stay loaded for the next.
+
+import pygame as pg
+
+TARGET_FPS = 60
+
+
+class Scene:
+    size = (800, 600)
+    caption = "Champion"
+
+    def __init__(self):
+        self.manager = None
+
+    def enter(self, manager):
+        """ Called whenever the scene comes to the top of the stack, on push and when the scene above it is popped. """
+        self.manager = manager
+
+    def exit(self):
+        """ Called when the scene is popped or replaced. """
+
+    def handle_event(self, event):
+        pass
+
+    def update(self, dt):
+        """ Advance the scene by `dt` seconds. """
+
+    def draw(self, surface):
+        """ Draw the frame; return the rects that changed, or None to update the whole display. """
+
+
+class SceneManager:
+    def __init__(self, target_fps=TARGET_FPS):
+        pg.init()
+        pg.font.init()
+        self.target_fps = target_fps
+        self.clock = pg.time.Clock()
+        self.screen = None
+        self.scenes = []
+        self.assets = {}  # shared by every scene for the life of the process
+        self.running = False
+
+    @property
+    def scene(self):
+        return self.scenes[-1] if self.scenes else None
+
+    def asset(self, key, load):
+        """ The shared asset under `key`, calling load() the first time any scene asks for it. """
+        if key not in self.assets:
+            self.assets[key] = load()
+        return self.assets[key]
+
+    def font(self, name, size, bold=False):
+        return self.asset(("font", name, size, bold), lambda: pg.font.SysFont(name, size, bold))
+
+    def activate(self, scene):
+        size = tuple(int(n) for n in scene.size)
+        if self.screen is None or self.screen.get_size() != size:
+            self.screen = pg.display.set_mode(size)
+        pg.display.set_caption(scene.caption)
+        scene.enter(self)
+
+    def push(self, scene):
+        self.scenes.append(scene)
+        self.activate(scene)
+
+    def pop(self):
+        """ Close the top scene and return to the one below it; closing the last one ends run(). """
+        scene = self.scenes.pop()
+        scene.exit()
+        if self.scenes:
+            self.activate(self.scenes[-1])
+        else:
+            self.running = False
+        return scene
+
+    def replace(self, scene):
+        self.scenes.pop().exit()
+        self.push(scene)
+
+    def quit(self):
+        while self.scenes:
+            self.scenes.pop().exit()
+        self.running = False
+
+    def run(self, scene=None):
+        if scene is not None:
+            self.push(scene)
+        self.running = bool(self.scenes)
+        while self.running:
+            for event in pg.event.get():
+                if event.type == pg.QUIT:
+                    self.quit()
+                    break
+                self.scene.handle_event(event)
+                if not self.running:
+                    break
+            if not self.running:
+                break
+
+            self.scene.update(self.clock.get_time() / 1000)
+            rects = self.scene.draw(self.screen)
+            if rects is None:
+                pg.display.flip()
+            else:
+                pg.display.update(rects)
+            self.clock.tick(self.target_fps)
+        pg.quit()
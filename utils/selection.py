@@ -0,0 +1,83 @@
+# utils/selection.py
+# Mouse-following selection shapes shared by the map screens.
+#
+# The shapes are cube offsets computed once per radius (see utils/hex_grid)
+# and moved onto the hovered hex by one vector addition. Whole selections
+# are also kept by (type, center hex, radius, anchor hex), so a frame where
+# the mouse stays on the same hex costs a dictionary lookup.
+
+from collections import OrderedDict
+
+import numpy as np
+
+from utils import hex_grid
+
+SELECTION_CACHE_SIZE = 128
+
+
+class Selection:
+    class Type:
+        POINT = 0
+        RING = 1
+        DISK = 2
+        LINE = 3
+        SPIRAL = 4
+
+        @staticmethod
+        def to_string(selection_type):
+            if selection_type == Selection.Type.DISK:
+                return "disk"
+            elif selection_type == Selection.Type.RING:
+                return "ring"
+            elif selection_type == Selection.Type.LINE:
+                return "line"
+            elif selection_type == Selection.Type.SPIRAL:
+                return "spiral"
+            else:
+                return "point"
+
+    _cache = OrderedDict()
+
+    @staticmethod
+    def key(selection_type, cube_mouse, selection_radius, clicked_hex=None):
+        """ Cache key of a selection; inputs a shape does not use are left out so more frames share it. """
+        center = tuple(int(x) for x in np.round(cube_mouse))
+        anchor = None if clicked_hex is None else tuple(int(x) for x in np.round(clicked_hex))
+        radius = getattr(selection_radius, "value", selection_radius)
+        if selection_type in (Selection.Type.DISK, Selection.Type.RING):
+            return selection_type, center, radius, None
+        elif selection_type in (Selection.Type.LINE, Selection.Type.SPIRAL):
+            return selection_type, center, None, anchor
+        else:
+            return Selection.Type.POINT, center, None, None
+
+    @staticmethod
+    def compute(selection_type, center, radius, anchor):
+        if selection_type == Selection.Type.DISK:
+            return hex_grid.disk(center, radius)
+        elif selection_type == Selection.Type.RING:
+            return hex_grid.ring(center, radius)
+        elif selection_type == Selection.Type.LINE:
+            return hex_grid.line(anchor, center)
+        elif selection_type == Selection.Type.SPIRAL:
+            click_rad = int(np.abs(anchor).max())
+            mouse_rad = int(np.abs(center).max())
+            return hex_grid.spiral([0, 0, 0], min(click_rad, mouse_rad), max(click_rad, mouse_rad))
+        else:
+            return np.array([center], dtype=float)
+
+    @staticmethod
+    def get_selection(selection_type, cube_mouse, selection_radius, clicked_hex=None):
+        """ Cube coordinates of the selection (shared and read-only; copy before changing it). """
+        key = Selection.key(selection_type, cube_mouse, selection_radius, clicked_hex)
+        cache = Selection._cache
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+
+        selection = Selection.compute(*key)
+        selection.flags.writeable = False
+        cache[key] = selection
+        while len(cache) > SELECTION_CACHE_SIZE:
+            cache.popitem(last=False)
+        return selection
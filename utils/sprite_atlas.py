@@ -0,0 +1,125 @@
+# utils/sprite_atlas.py
+# Pre-scaled sprite atlas for the map screens, cached on disk.
+#
+# Every sprite is scaled to a hex radius once, packed into a single PNG with
+# a JSON index of where each one sits, and saved under cache/sprite_atlas.
+# The file names carry a digest of the hex radius and the source images'
+# contents, so editing an image or changing the radius builds a new atlas.
+# Later launches load the one PNG and slice subsurfaces out of it.
+
+import hashlib
+import json
+import os
+import sys
+
+import pygame as pg
+
+script_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+images_dir = os.path.join(script_dir, "images")
+ATLAS_DIR = os.path.join(script_dir, "cache", "sprite_atlas")
+
+# Terrain and item sprites that go into every atlas
+ATLAS_IMAGES = [os.path.join(images_dir, name + ".png") for name in (
+    "forest", "open", "hill", "water", "settlement", "ruin",
+    "fancyhat", "rapier", "shield", "studdedleather")]
+ATLAS_VERSION = 1
+ATLAS_WIDTH = 1024
+SPRITE_SCALE = 1.9  # longest side of a sprite, in hex radii
+PADDING = 1
+
+
+def scale_image(image, hex_radius):
+    from PIL import Image
+
+    # Calculate the new size preserving the aspect ratio
+    original_size = image.size
+    scale_ratio = (hex_radius * SPRITE_SCALE) / max(original_size)
+    new_size = tuple([int(dim * scale_ratio) for dim in original_size])
+    return image.resize(new_size, Image.Resampling.LANCZOS)
+
+
+def sprite_name(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def atlas_digest(image_paths, hex_radius):
+    """ Digest of everything an atlas depends on: the radius, the scale and each source image's bytes. """
+    sources = []
+    for path in sorted(image_paths):
+        with open(path, 'rb') as file:
+            sources.append((sprite_name(path), hashlib.sha1(file.read()).hexdigest()))
+    key = json.dumps([ATLAS_VERSION, hex_radius, SPRITE_SCALE, sources])
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+
+def atlas_paths(digest, hex_radius, cache_dir=ATLAS_DIR):
+    base = os.path.join(cache_dir, f"atlas_{hex_radius}_{digest}")
+    return base + ".png", base + ".json"
+
+
+def pack(sizes, width=ATLAS_WIDTH):
+    """ Shelf-pack (w, h) sizes into rows of at most `width` pixels; returns positions and the total height. """
+    positions = []
+    x = y = shelf_height = 0
+    for w, h in sizes:
+        if x and x + w > width:
+            x, y, shelf_height = 0, y + shelf_height + PADDING, 0
+        positions.append((x, y))
+        x += w + PADDING
+        shelf_height = max(shelf_height, h)
+    return positions, y + shelf_height
+
+
+def build_atlas(image_paths, hex_radius, cache_dir=ATLAS_DIR):
+    """ Scale and pack the images, write the atlas PNG and its index, and return the index. """
+    # PIL is only needed to build an atlas, so cached launches never import it
+    from PIL import Image
+
+    image_paths = sorted(set(map(os.path.abspath, image_paths)))
+    digest = atlas_digest(image_paths, hex_radius)
+    png_path, index_path = atlas_paths(digest, hex_radius, cache_dir)
+
+    images = [scale_image(Image.open(path).convert("RGBA"), hex_radius) for path in image_paths]
+    positions, height = pack([image.size for image in images])
+    atlas = Image.new("RGBA", (ATLAS_WIDTH, max(height, 1)), (0, 0, 0, 0))
+    index = {"version": ATLAS_VERSION, "hex_radius": hex_radius, "sprites": {}}
+    for path, image, (x, y) in zip(image_paths, images, positions):
+        atlas.paste(image, (x, y))
+        index["sprites"][sprite_name(path)] = [x, y, *image.size]
+
+    # The index is written last, so its presence means the atlas is complete
+    os.makedirs(cache_dir, exist_ok=True)
+    atlas.save(png_path + ".tmp", format="PNG")
+    os.replace(png_path + ".tmp", png_path)
+    with open(index_path + ".tmp", 'w') as file:
+        json.dump(index, file, indent=4)
+    os.replace(index_path + ".tmp", index_path)
+    return index
+
+
+def load_atlas(hex_radius, image_paths=ATLAS_IMAGES, cache_dir=ATLAS_DIR):
+    """ {sprite name: surface} for every image, building the atlas first if it is not cached. """
+    image_paths = sorted(set(map(os.path.abspath, image_paths)))
+    png_path, index_path = atlas_paths(atlas_digest(image_paths, hex_radius), hex_radius, cache_dir)
+    if os.path.isfile(index_path) and os.path.isfile(png_path):
+        with open(index_path, 'r') as file:
+            index = json.load(file)
+    else:
+        index = build_atlas(image_paths, hex_radius, cache_dir)
+
+    atlas = pg.image.load(png_path)
+    return {name: atlas.subsurface(pg.Rect(rect)) for name, rect in index["sprites"].items()}
+
+
+def load_sprites(paths, hex_radius, cache_dir=ATLAS_DIR):
+    """ Scaled surfaces for a {key: image path} dict, served from the shared atlas. """
+    atlas = load_atlas(hex_radius, list(ATLAS_IMAGES) + list(paths.values()), cache_dir)
+    return {key: atlas[sprite_name(path)] for key, path in paths.items()}
+
+
+if __name__ == "__main__":
+    # Pre-build atlases, e.g. python utils/sprite_atlas.py 30 15
+    radii = [int(radius) for radius in sys.argv[1:]] or [30]
+    for radius in radii:
+        index = build_atlas(ATLAS_IMAGES, radius)
+        print(f"Built atlas for hex radius {radius}: {len(index['sprites'])} sprites")
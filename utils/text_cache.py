@@ -0,0 +1,35 @@
+# utils/text_cache.py
+# Bounded cache of rendered text surfaces.
+#
+# Most HUD lines read the same from one frame to the next, and Font.render
+# is one of the more expensive calls in a frame, so surfaces are kept per
+# (text, colour, font) and only rendered again when the text changes.
+
+from collections import OrderedDict
+
+TEXT_CACHE_SIZE = 256
+
+
+class TextCache:
+    def __init__(self, cache_size=TEXT_CACHE_SIZE):
+        self.cache_size = cache_size
+        self._surfaces = OrderedDict()
+
+    def __len__(self):
+        return len(self._surfaces)
+
+    def clear(self):
+        self._surfaces.clear()
+
+    def render(self, font, text, colour, antialias=True):
+        """ Same as font.render(text, antialias, colour), reusing the surface while the inputs repeat. """
+        key = (text, tuple(colour), font, antialias)
+        if key in self._surfaces:
+            self._surfaces.move_to_end(key)
+            return self._surfaces[key]
+
+        surface = font.render(text, antialias, colour)
+        self._surfaces[key] = surface
+        while len(self._surfaces) > self.cache_size:
+            self._surfaces.popitem(last=False)
+        return surface